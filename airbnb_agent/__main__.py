@@ -2,6 +2,7 @@
 # pylint: disable=logging-fstring-interpolation
 
 import asyncio
+import functools
 import os
 import sys
 
@@ -13,18 +14,27 @@ import uvicorn
 
 from a2a.server.apps import A2AStarletteApplication
 from a2a.server.request_handlers import DefaultRequestHandler
-from a2a.server.tasks import InMemoryTaskStore
 from a2a.types import (
     AgentCapabilities,
     AgentCard,
     AgentSkill,
 )
+from agent_common.bounded_store import (
+    DEFAULT_IDLE_TTL_SECONDS,
+    DEFAULT_MAX_BYTES,
+    DEFAULT_MAX_ENTRIES,
+    BoundedTaskStore,
+    metrics_endpoint,
+)
+from agent_common.multiworker import DEFAULT_WORKERS, run_workers
+from agent_common.sqlite_task_store import SqliteTaskStore
 from agent_executor import (
     AirbnbAgentExecutor,
 )
 from airbnb_agent import (
     AirbnbAgent,
 )
+from bounded_checkpointer import BoundedMemorySaver
 from dotenv import load_dotenv
 from langchain_mcp_adapters.client import MultiServerMCPClient
 
@@ -45,6 +55,7 @@ app_context: dict[str, Any] = {}
 DEFAULT_HOST = "localhost"
 DEFAULT_PORT = 10002
 DEFAULT_LOG_LEVEL = "info"
+DEFAULT_COALESCE_WINDOW_MS = 50
 
 @asynccontextmanager
 async def app_lifespan(context: dict[str, Any]):
@@ -105,7 +116,18 @@ async def app_lifespan(context: dict[str, Any]):
         print("Lifespan: Clearing application context.")
         context.clear()
 
-def main(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, log_level: str = DEFAULT_LOG_LEVEL):
+def main(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    log_level: str = DEFAULT_LOG_LEVEL,
+    coalesce_window_ms: int = DEFAULT_COALESCE_WINDOW_MS,
+    store_ttl: float = DEFAULT_IDLE_TTL_SECONDS,
+    store_max_entries: int = DEFAULT_MAX_ENTRIES,
+    store_max_bytes: int = DEFAULT_MAX_BYTES,
+    task_db: str | None = None,
+    workers: int = DEFAULT_WORKERS,
+    uds: str | None = None,
+):
     """Command Line Interface to start the Airbnb Agent server."""
     # Verify an API key is set.
     # Not required if using Vertex AI APIs.
@@ -117,6 +139,28 @@ def main(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, log_level: str = DE
             "GOOGLE_GENAI_USE_VERTEXAI is not TRUE."
         )
 
+    if workers > 1:
+        # Every worker runs this function again, on its own unix socket, with
+        # its own MCP client and conversation threads.
+        run_workers(
+            functools.partial(
+                main,
+                host,
+                port,
+                log_level,
+                coalesce_window_ms,
+                store_ttl,
+                store_max_entries,
+                store_max_bytes,
+                task_db,
+            ),
+            host,
+            port,
+            workers,
+            log_level=log_level.lower(),
+        )
+        return
+
     async def run_server_async():
         async with app_lifespan(app_context):
             if not app_context.get("mcp_tools"):
@@ -126,14 +170,30 @@ def main(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, log_level: str = DE
                 )
                 # Depending on requirements, you could sys.exit(1) here
 
+            # Tasks and conversation threads evict idle and least recently
+            # used entries, so that memory stays flat on a long running server.
+            store_limits = {
+                "idle_ttl": store_ttl,
+                "max_entries": store_max_entries,
+                "max_bytes": store_max_bytes,
+            }
+
             # Initialize AirbnbAgentExecutor with preloaded tools
             airbnb_agent_executor = AirbnbAgentExecutor(
-                mcp_tools=app_context.get("mcp_tools", [])
+                mcp_tools=app_context.get("mcp_tools", []),
+                coalesce_window=coalesce_window_ms / 1000,
+                checkpointer=BoundedMemorySaver(**store_limits),
             )
 
+            if task_db:
+                # Durable tasks, shared by every server process using the same file
+                task_store = SqliteTaskStore(task_db)
+            else:
+                task_store = BoundedTaskStore(**store_limits)
+
             request_handler = DefaultRequestHandler(
                 agent_executor=airbnb_agent_executor,
-                task_store=InMemoryTaskStore(),
+                task_store=task_store,
             )
 
             # Create the A2AServer instance
@@ -143,11 +203,15 @@ def main(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, log_level: str = DE
 
             # Get the ASGI app from the A2AServer instance
             asgi_app = a2a_server.build()
+            asgi_app.add_route("/metrics", metrics_endpoint, methods=["GET"])
+            if task_db:
+                asgi_app.add_event_handler("shutdown", task_store.close)
 
             config = uvicorn.Config(
                 app=asgi_app,
                 host=host,
                 port=port,
+                uds=uds,
                 log_level=log_level.lower(),
                 lifespan="auto",
             )
@@ -213,8 +277,72 @@ def get_agent_card(host: str, port: int):
     "--port", "port", default=DEFAULT_PORT, type=int, help="Port to bind the server to."
 )
 @click.option("--log-level", "log_level", default=DEFAULT_LOG_LEVEL, help="Uvicorn log level.")
-def cli(host: str, port: int, log_level: str):
-    main(host, port, log_level)
+@click.option(
+    "--coalesce-window-ms",
+    "coalesce_window_ms",
+    default=DEFAULT_COALESCE_WINDOW_MS,
+    type=int,
+    envvar="A2A_COALESCE_WINDOW_MS",
+    help="Merge streamed chunks into one status update per window, 0 disables it.",
+)
+@click.option(
+    "--store-ttl",
+    "store_ttl",
+    default=DEFAULT_IDLE_TTL_SECONDS,
+    envvar="A2A_STORE_TTL",
+    help="Seconds after which idle tasks and conversation threads are evicted.",
+)
+@click.option(
+    "--store-max-entries",
+    "store_max_entries",
+    default=DEFAULT_MAX_ENTRIES,
+    envvar="A2A_STORE_MAX_ENTRIES",
+    help="Maximum number of entries per in-memory store, 0 for no limit.",
+)
+@click.option(
+    "--store-max-bytes",
+    "store_max_bytes",
+    default=DEFAULT_MAX_BYTES,
+    envvar="A2A_STORE_MAX_BYTES",
+    help="Maximum size in bytes per in-memory store, 0 for no limit.",
+)
+@click.option(
+    "--task-db",
+    "task_db",
+    default=None,
+    envvar="A2A_TASK_DB",
+    help="Keep tasks in this SQLite database instead of in memory.",
+)
+@click.option(
+    "--workers",
+    "workers",
+    default=DEFAULT_WORKERS,
+    type=int,
+    envvar="A2A_WORKERS",
+    help="Server processes to run; each conversation stays on one of them.",
+)
+def cli(
+    host: str,
+    port: int,
+    log_level: str,
+    coalesce_window_ms: int,
+    store_ttl: float,
+    store_max_entries: int,
+    store_max_bytes: int,
+    task_db: str | None,
+    workers: int,
+):
+    main(
+        host,
+        port,
+        log_level,
+        coalesce_window_ms,
+        store_ttl,
+        store_max_entries,
+        store_max_bytes,
+        task_db,
+        workers,
+    )
 
 if __name__ == "__main__":
-    main()
+    cli()
@@ -1,40 +1,67 @@
 # ruff: noqa: E501, G201, G202
 # pylint: disable=logging-fstring-interpolation
+import asyncio
 import logging
 
+from contextlib import aclosing
 from typing import Any, override
 
 from a2a.server.agent_execution import AgentExecutor, RequestContext
 from a2a.server.events.event_queue import EventQueue
 from a2a.types import (
     TaskArtifactUpdateEvent,
+    TaskNotCancelableError,
     TaskState,
     TaskStatus,
     TaskStatusUpdateEvent,
 )
 from a2a.utils import new_agent_text_message, new_task, new_text_artifact
+from a2a.utils.errors import ServerError
 from airbnb_agent import (
     AirbnbAgent,
 )
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from status_coalescer import (
+    DEFAULT_MAX_CHARS,
+    DEFAULT_WINDOW_SECONDS,
+    StatusCoalescer,
+)
 
 
 logger = logging.getLogger(__name__)
 
+# How long a cancel request waits for the running execution to unwind
+CANCEL_GRACE_SECONDS = 5.0
+
 
 class AirbnbAgentExecutor(AgentExecutor):
     """AirbnbAgentExecutor that uses an agent with preloaded tools."""
 
-    def __init__(self, mcp_tools: list[Any]):
+    def __init__(
+        self,
+        mcp_tools: list[Any],
+        coalesce_window: float = DEFAULT_WINDOW_SECONDS,
+        coalesce_max_chars: int = DEFAULT_MAX_CHARS,
+        checkpointer: BaseCheckpointSaver | None = None,
+    ):
         """Initializes the AirbnbAgentExecutor.
 
         Args:
             mcp_tools: A list of preloaded MCP tools for the AirbnbAgent.
+            coalesce_window: Seconds during which streamed chunks are merged
+                into one `working` status update, 0 disables coalescing.
+            coalesce_max_chars: Buffered characters that force an update.
+            checkpointer: Where the agent keeps conversation threads.
         """
         super().__init__()
         logger.info(
             f"Initializing AirbnbAgentExecutor with {len(mcp_tools) if mcp_tools else 'no'} MCP tools."
         )
-        self.agent = AirbnbAgent(mcp_tools=mcp_tools)
+        self.agent = AirbnbAgent(mcp_tools=mcp_tools, checkpointer=checkpointer)
+        self.coalesce_window = coalesce_window
+        self.coalesce_max_chars = coalesce_max_chars
+        # Running executions by task id, so that they can be cancelled
+        self._running_tasks: dict[str, tuple[asyncio.Task, EventQueue]] = {}
 
     @override
     async def execute(
@@ -51,63 +78,87 @@ class AirbnbAgentExecutor(AgentExecutor):
         if not task:
             task = new_task(context.message)
             await event_queue.enqueue_event(task)
-        # invoke the underlying agent, using streaming results
-        async for event in self.agent.stream(query, task.contextId):
-            if event["is_task_complete"]:
-                await event_queue.enqueue_event(
-                    TaskArtifactUpdateEvent(
-                        append=False,
-                        contextId=task.contextId,
-                        taskId=task.id,
-                        lastChunk=True,
-                        artifact=new_text_artifact(
-                            name="current_result",
-                            description="Result of request to agent.",
-                            text=event["content"],
-                        ),
-                    )
-                )
-                await event_queue.enqueue_event(
-                    TaskStatusUpdateEvent(
-                        status=TaskStatus(state=TaskState.completed),
-                        final=True,
-                        contextId=task.contextId,
-                        taskId=task.id,
-                    )
-                )
-            elif event["require_user_input"]:
-                await event_queue.enqueue_event(
-                    TaskStatusUpdateEvent(
-                        status=TaskStatus(
-                            state=TaskState.input_required,
-                            message=new_agent_text_message(
-                                event["content"],
-                                task.contextId,
-                                task.id,
-                            ),
-                        ),
-                        final=True,
-                        contextId=task.contextId,
-                        taskId=task.id,
-                    )
-                )
-            else:
-                await event_queue.enqueue_event(
-                    TaskStatusUpdateEvent(
-                        status=TaskStatus(
-                            state=TaskState.working,
-                            message=new_agent_text_message(
-                                event["content"],
-                                task.contextId,
-                                task.id,
-                            ),
-                        ),
-                        final=False,
-                        contextId=task.contextId,
-                        taskId=task.id,
-                    )
-                )
+        self._running_tasks[task.id] = (asyncio.current_task(), event_queue)
+        # Streamed chunks go through the coalescer, it is flushed before the
+        # final events so that they stay in order.
+        coalescer = StatusCoalescer(
+            event_queue,
+            task.contextId,
+            task.id,
+            window=self.coalesce_window,
+            max_chars=self.coalesce_max_chars,
+        )
+        try:
+            # invoke the underlying agent, using streaming results. aclosing()
+            # unwinds the LangGraph run, including an in-flight tool call, as
+            # soon as the execution is cancelled.
+            async with aclosing(self.agent.stream(query, task.contextId)) as stream:
+                async for event in stream:
+                    if event["is_task_complete"]:
+                        await coalescer.flush()
+                        await event_queue.enqueue_event(
+                            TaskArtifactUpdateEvent(
+                                append=False,
+                                contextId=task.contextId,
+                                taskId=task.id,
+                                lastChunk=True,
+                                artifact=new_text_artifact(
+                                    name="current_result",
+                                    description="Result of request to agent.",
+                                    text=event["content"],
+                                ),
+                            )
+                        )
+                        await event_queue.enqueue_event(
+                            TaskStatusUpdateEvent(
+                                status=TaskStatus(state=TaskState.completed),
+                                final=True,
+                                contextId=task.contextId,
+                                taskId=task.id,
+                            )
+                        )
+                    elif event["require_user_input"]:
+                        await coalescer.flush()
+                        await event_queue.enqueue_event(
+                            TaskStatusUpdateEvent(
+                                status=TaskStatus(
+                                    state=TaskState.input_required,
+                                    message=new_agent_text_message(
+                                        event["content"],
+                                        task.contextId,
+                                        task.id,
+                                    ),
+                                ),
+                                final=True,
+                                contextId=task.contextId,
+                                taskId=task.id,
+                            )
+                        )
+                    else:
+                        await coalescer.add(event["content"])
+        finally:
+            coalescer.close()
+            self._running_tasks.pop(task.id, None)
 
     @override
     async def cancel(self, context: RequestContext, event_queue: EventQueue) -> None:
-        raise Exception("cancel not supported")
+        """Cancels the running LangGraph execution and reports it as canceled."""
+        running = self._running_tasks.pop(context.task_id, None)
+        if running is None or running[0].done():
+            logger.debug(f"Cancellation requested for inactive airbnb task: {context.task_id}")
+            raise ServerError(error=TaskNotCancelableError())
+
+        logger.info(f"Cancelling active airbnb task: {context.task_id}")
+        running_task, running_queue = running
+        # Published on the queue of the running execution, so both its
+        # subscribers and the queue tapped for this cancel request see it.
+        await running_queue.enqueue_event(
+            TaskStatusUpdateEvent(
+                status=TaskStatus(state=TaskState.canceled),
+                final=True,
+                contextId=context.context_id,
+                taskId=context.task_id,
+            )
+        )
+        running_task.cancel()
+        await asyncio.wait({running_task}, timeout=CANCEL_GRACE_SECONDS)
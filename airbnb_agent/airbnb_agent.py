@@ -14,6 +14,7 @@ from langchain_core.runnables.config import (
 )
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_google_vertexai import ChatVertexAI
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.prebuilt import create_react_agent
 from pydantic import BaseModel
@@ -46,11 +47,17 @@ class AirbnbAgent:
 
     SUPPORTED_CONTENT_TYPES = ["text", "text/plain"]
 
-    def __init__(self, mcp_tools: list[Any]):  # Modified to accept mcp_tools
+    def __init__(
+        self,
+        mcp_tools: list[Any],  # Modified to accept mcp_tools
+        checkpointer: BaseCheckpointSaver | None = None,
+    ):
         """Initializes the Airbnb agent.
 
         Args:
             mcp_tools: A list of preloaded MCP (Model Context Protocol) tools.
+            checkpointer: Where conversation threads are kept, defaults to
+                the unbounded module-level MemorySaver.
         """
         logger.info("Initializing AirbnbAgent with preloaded MCP tools...")
         try:
@@ -75,6 +82,7 @@ class AirbnbAgent:
             )
             raise
 
+        self.checkpointer = checkpointer or memory
         self.mcp_tools = mcp_tools
         if not self.mcp_tools:
             raise ValueError("No MCP tools provided to AirbnbAgent")
@@ -87,7 +95,7 @@ class AirbnbAgent:
             airbnb_agent_runnable = create_react_agent(
                 self.model,
                 tools=self.mcp_tools,  # Use preloaded tools
-                checkpointer=memory,
+                checkpointer=self.checkpointer,
                 prompt=self.SYSTEM_INSTRUCTION,
                 response_format=(self.RESPONSE_FORMAT_INSTRUCTION, ResponseFormat),
             )
@@ -267,7 +275,7 @@ class AirbnbAgent:
         agent_runnable = create_react_agent(
             self.model,
             tools=self.mcp_tools,  # Use preloaded tools
-            checkpointer=memory,
+            checkpointer=self.checkpointer,
             prompt=self.SYSTEM_INSTRUCTION,
             response_format=(
                 self.RESPONSE_FORMAT_INSTRUCTION,
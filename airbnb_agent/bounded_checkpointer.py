@@ -0,0 +1,90 @@
+# ruff: noqa: E501, G201, G202
+# pylint: disable=logging-fstring-interpolation
+from collections.abc import Sequence
+from typing import Any
+
+from agent_common.bounded_store import (
+    DEFAULT_IDLE_TTL_SECONDS,
+    DEFAULT_MAX_BYTES,
+    DEFAULT_MAX_ENTRIES,
+    LruIndex,
+)
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+
+class BoundedMemorySaver(MemorySaver):
+    """A MemorySaver that drops idle and least recently used threads.
+
+    Entries are conversation threads; a thread's size is the serialized size
+    of its checkpoints and channel values, which MemorySaver keeps anyway.
+    """
+
+    def __init__(
+        self,
+        idle_ttl: float = DEFAULT_IDLE_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        super().__init__()
+        self._index = LruIndex("checkpoints", idle_ttl, max_entries, max_bytes)
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        self._evict()
+        checkpoint_tuple = super().get_tuple(config)
+        if checkpoint_tuple is not None:
+            self._index.touch(config["configurable"]["thread_id"])
+        return checkpoint_tuple
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = next_config["configurable"]["thread_id"]
+        checkpoint_ns = next_config["configurable"]["checkpoint_ns"]
+        saved, saved_metadata, _ = self.storage[thread_id][checkpoint_ns][
+            checkpoint["id"]
+        ]
+        size = len(saved[1]) + len(saved_metadata[1])
+        for channel, version in new_versions.items():
+            size += len(self.blobs[(thread_id, checkpoint_ns, channel, version)][1])
+        self._index.touch(thread_id, self._index.size_of(thread_id) + size)
+        self._evict()
+        return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        super().put_writes(config, writes, task_id, task_path)
+        self._index.touch(config["configurable"]["thread_id"])
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        self._index.discard(thread_id)
+
+    def _evict(self) -> None:
+        thread_ids = set(self._index.evict())
+        if not thread_ids:
+            return
+        # One pass over writes and blobs for all evicted threads, instead of
+        # one per thread as in delete_thread().
+        for thread_id in thread_ids:
+            self.storage.pop(thread_id, None)
+        for key in [k for k in self.writes if k[0] in thread_ids]:
+            del self.writes[key]
+        for key in [k for k in self.blobs if k[0] in thread_ids]:
+            del self.blobs[key]
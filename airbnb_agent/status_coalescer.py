@@ -0,0 +1,115 @@
+# ruff: noqa: E501, G201, G202
+# pylint: disable=logging-fstring-interpolation
+import asyncio
+import logging
+import time
+
+from a2a.server.events.event_queue import EventQueue
+from a2a.types import (
+    TaskState,
+    TaskStatus,
+    TaskStatusUpdateEvent,
+)
+from a2a.utils import new_agent_text_message
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_SECONDS = 0.05
+DEFAULT_MAX_CHARS = 2048
+
+
+class StatusCoalescer:
+    """Merges streamed text chunks into fewer `working` status updates.
+
+    A chunk is published right away when nothing was published during the
+    last `window` seconds, so the first token is never delayed. Chunks that
+    arrive within the window are buffered and published together when the
+    window closes or once `max_chars` are buffered. Call `flush()` before
+    publishing a final event so that the order of events is preserved.
+    """
+
+    def __init__(
+        self,
+        event_queue: EventQueue,
+        context_id: str,
+        task_id: str,
+        window: float = DEFAULT_WINDOW_SECONDS,
+        max_chars: int = DEFAULT_MAX_CHARS,
+    ):
+        self.event_queue = event_queue
+        self.context_id = context_id
+        self.task_id = task_id
+        self.window = window
+        self.max_chars = max_chars
+        self._buffer: list[str] = []
+        self._buffered_chars = 0
+        self._last_publish = float("-inf")
+        self._timer: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        self.chunks_received = 0
+        self.events_published = 0
+
+    async def add(self, text: str) -> None:
+        """Adds a chunk of text, publishing it now or within the window."""
+        async with self._lock:
+            self.chunks_received += 1
+            self._buffer.append(text)
+            self._buffered_chars += len(text)
+            elapsed = time.monotonic() - self._last_publish
+            if elapsed >= self.window or self._buffered_chars >= self.max_chars:
+                self._cancel_timer()
+                await self._publish()
+            elif self._timer is None:
+                self._timer = asyncio.create_task(
+                    self._publish_later(self.window - elapsed)
+                )
+
+    async def flush(self) -> None:
+        """Publishes whatever is buffered."""
+        async with self._lock:
+            self._cancel_timer()
+            await self._publish()
+
+    def close(self) -> None:
+        """Drops the pending timer without publishing, e.g. on cancellation."""
+        self._cancel_timer()
+        if self.chunks_received:
+            logger.debug(
+                f"Coalesced {self.chunks_received} chunks into {self.events_published} status updates for task {self.task_id}"
+            )
+
+    async def _publish_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        async with self._lock:
+            self._timer = None
+            await self._publish()
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    async def _publish(self) -> None:
+        if not self._buffer:
+            return
+        text = "".join(self._buffer)
+        self._buffer.clear()
+        self._buffered_chars = 0
+        self._last_publish = time.monotonic()
+        self.events_published += 1
+        await self.event_queue.enqueue_event(
+            TaskStatusUpdateEvent(
+                status=TaskStatus(
+                    state=TaskState.working,
+                    message=new_agent_text_message(
+                        text,
+                        self.context_id,
+                        self.task_id,
+                    ),
+                ),
+                final=False,
+                contextId=self.context_id,
+                taskId=self.task_id,
+            )
+        )
@@ -0,0 +1,134 @@
+"""
+Copyright 2025 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import uuid
+
+import pytest
+
+
+pytest.importorskip('pytest_benchmark')
+pytest.importorskip('a2a')
+
+from a2a.server.events.event_queue import EventQueue
+from a2a.server.tasks import TaskUpdater
+from a2a.types import (
+    Message,
+    Part,
+    Role,
+    Task,
+    TaskState,
+    TaskStatus,
+    TextPart,
+)
+
+
+# Events per benchmark round, well below the EventQueue bound of 1024.
+EVENTS_PER_ROUND = 200
+
+
+def make_message(role: Role, text: str) -> Message:
+    return Message(
+        role=role,
+        messageId=str(uuid.uuid4()),
+        taskId='task-1',
+        contextId='context-1',
+        parts=[Part(root=TextPart(text=text))],
+    )
+
+
+def make_task(history_length: int) -> Task:
+    history = [
+        make_message(
+            Role.user if i % 2 == 0 else Role.agent,
+            f'Turn {i}: what is the weather like in Seattle, WA this weekend?',
+        )
+        for i in range(history_length)
+    ]
+    return Task(
+        id='task-1',
+        contextId='context-1',
+        status=TaskStatus(state=TaskState.working),
+        history=history,
+    )
+
+
+async def drain(queue: EventQueue) -> int:
+    count = 0
+    while not queue.queue.empty():
+        await queue.dequeue_event(no_wait=True)
+        queue.task_done()
+        count += 1
+    return count
+
+
+def test_update_status_working(benchmark, run_async):
+    queue = EventQueue()
+    updater = TaskUpdater(queue, 'task-1', 'context-1')
+    parts = [Part(root=TextPart(text='Using tool: get_forecast...'))]
+
+    async def emit():
+        for _ in range(EVENTS_PER_ROUND):
+            await updater.update_status(
+                TaskState.working, message=updater.new_agent_message(parts)
+            )
+        return await drain(queue)
+
+    assert benchmark(run_async, emit) == EVENTS_PER_ROUND
+
+
+def test_add_artifact(benchmark, run_async):
+    queue = EventQueue()
+    updater = TaskUpdater(queue, 'task-1', 'context-1')
+    parts = [Part(root=TextPart(text='Sunny with a high of 75F. ' * 40))]
+
+    async def emit():
+        for _ in range(EVENTS_PER_ROUND):
+            await updater.add_artifact(parts)
+        return await drain(queue)
+
+    assert benchmark(run_async, emit) == EVENTS_PER_ROUND
+
+
+def test_enqueue_with_tapped_child(benchmark, run_async):
+    # `tasks/resubscribe` and `tasks/cancel` tap the queue, every event is
+    # then copied to the child queue as well.
+    queue = EventQueue()
+    child = queue.tap()
+    updater = TaskUpdater(queue, 'task-1', 'context-1')
+
+    async def emit():
+        for _ in range(EVENTS_PER_ROUND):
+            await updater.update_status(TaskState.working)
+        await drain(child)
+        return await drain(queue)
+
+    assert benchmark(run_async, emit) == EVENTS_PER_ROUND
+
+
+@pytest.mark.parametrize('history_length', [10, 100, 1000])
+def test_task_serialization(benchmark, history_length):
+    task = make_task(history_length)
+    benchmark.group = f'task_json[{history_length}]'
+    payload = benchmark(task.model_dump_json, exclude_none=True)
+    assert payload.count('messageId') == history_length
+
+
+@pytest.mark.parametrize('history_length', [10, 100, 1000])
+def test_task_deserialization(benchmark, history_length):
+    payload = make_task(history_length).model_dump_json(exclude_none=True)
+    benchmark.group = f'task_json[{history_length}]'
+    task = benchmark(Task.model_validate_json, payload)
+    assert len(task.history) == history_length
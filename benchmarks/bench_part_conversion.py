@@ -0,0 +1,106 @@
+"""
+Copyright 2025 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import base64
+import os
+
+import pytest
+
+
+pytest.importorskip('pytest_benchmark')
+pytest.importorskip('a2a')
+pytest.importorskip('google.adk')
+
+from a2a.types import FilePart, FileWithBytes, Part, TextPart
+from agent_common.blob_store import get_blob_store
+from conftest import load_agent_module
+from google.genai import types
+
+
+# Every ADK agent carries its own copy of the converters.
+EXECUTORS = {
+    'weather': ('weather_agent', 'weather_executor'),
+    'quote': ('quote_agent', 'quote_executor'),
+    'calendar': ('calendar_agent', 'agent_executor'),
+}
+
+CONTEXT_ID = 'bench-context'
+
+PAYLOADS = {
+    'text': None,
+    'file_16k': 16 * 1024,
+    'file_4m': 4 * 1024 * 1024,
+}
+
+
+@pytest.fixture(params=EXECUTORS.keys())
+def executor_module(request):
+    return load_agent_module(*EXECUTORS[request.param])
+
+
+@pytest.fixture(autouse=True)
+def blob_base_url():
+    # Set by each agent's __main__ to its public URL; nothing spills without.
+    get_blob_store().base_url = 'http://localhost:10001/'
+
+
+def make_a2a_part(size: int | None) -> Part:
+    if size is None:
+        return Part(root=TextPart(text='What is the weather in LA, CA? ' * 8))
+    return Part(
+        root=FilePart(
+            file=FileWithBytes(
+                bytes=base64.b64encode(os.urandom(size)).decode(),
+                mimeType='image/png',
+            )
+        )
+    )
+
+
+def make_genai_part(size: int | None) -> types.Part:
+    if size is None:
+        return types.Part(text='Sunny with a high of 75F. ' * 8)
+    return types.Part(
+        inline_data=types.Blob(data=os.urandom(size), mime_type='image/png')
+    )
+
+
+@pytest.mark.parametrize('payload', PAYLOADS.keys())
+def test_a2a_to_genai(benchmark, executor_module, payload):
+    part = make_a2a_part(PAYLOADS[payload])
+    benchmark.group = f'a2a_to_genai[{payload}]'
+    result = benchmark(executor_module.convert_a2a_part_to_genai, part, CONTEXT_ID)
+    assert result.text or result.inline_data or result.file_data
+
+
+@pytest.mark.parametrize('payload', PAYLOADS.keys())
+def test_genai_to_a2a(benchmark, executor_module, payload):
+    part = make_genai_part(PAYLOADS[payload])
+    benchmark.group = f'genai_to_a2a[{payload}]'
+    result = benchmark(executor_module.convert_genai_part_to_a2a, part, CONTEXT_ID)
+    assert result is not None
+
+
+def test_a2a_to_genai_spilled(benchmark, executor_module):
+    # A 4 MiB payload that was spilled to the blob store on a previous hop.
+    spilled = executor_module.convert_genai_part_to_a2a(
+        make_genai_part(PAYLOADS['file_4m']), CONTEXT_ID
+    )
+    benchmark.group = 'a2a_to_genai[file_4m]'
+    result = benchmark(
+        executor_module.convert_a2a_part_to_genai, spilled, CONTEXT_ID
+    )
+    assert len(result.inline_data.data) == PAYLOADS['file_4m']
@@ -0,0 +1,106 @@
+"""
+Copyright 2025 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import uuid
+
+import pytest
+
+
+pytest.importorskip('pytest_benchmark')
+pytest.importorskip('a2a')
+
+from a2a.server.tasks import InMemoryTaskStore
+from a2a.types import (
+    Message,
+    Part,
+    Role,
+    Task,
+    TaskState,
+    TaskStatus,
+    TextPart,
+)
+from agent_common.sqlite_task_store import SqliteTaskStore
+
+
+# Status updates per task, as a tool-using agent emits while working.
+UPDATES_PER_TASK = 20
+TASKS_PER_ROUND = 20
+HISTORY_LENGTH = 10
+
+def make_task(task_id: str) -> Task:
+    history = [
+        Message(
+            role=Role.user if i % 2 == 0 else Role.agent,
+            messageId=str(uuid.uuid4()),
+            taskId=task_id,
+            contextId='context-1',
+            parts=[
+                Part(
+                    root=TextPart(
+                        text=f'Turn {i}: what is the weather like in Seattle, WA?'
+                    )
+                )
+            ],
+        )
+        for i in range(HISTORY_LENGTH)
+    ]
+    return Task(
+        id=task_id,
+        contextId='context-1',
+        status=TaskStatus(state=TaskState.submitted),
+        history=history,
+    )
+
+
+@pytest.fixture(params=['in_memory', 'sqlite', 'sqlite_unbatched'])
+def task_store(request, tmp_path, run_async):
+    if request.param == 'in_memory':
+        yield InMemoryTaskStore()
+        return
+    store = SqliteTaskStore(
+        tmp_path / 'tasks.db',
+        flush_interval=0 if request.param == 'sqlite_unbatched' else 0.05,
+    )
+    yield store
+    run_async(store.close)
+
+
+def test_task_lifecycle(benchmark, run_async, task_store):
+    """Saves and reads back tasks through submitted, working and completed."""
+
+    async def lifecycle():
+        for _ in range(TASKS_PER_ROUND):
+            task = make_task(str(uuid.uuid4()))
+            await task_store.save(task)
+            for _ in range(UPDATES_PER_TASK):
+                task = await task_store.get(task.id)
+                task.status = TaskStatus(state=TaskState.working)
+                await task_store.save(task)
+            task.status = TaskStatus(state=TaskState.completed)
+            await task_store.save(task)
+
+    benchmark(run_async, lifecycle)
+
+
+def test_get_completed(benchmark, run_async, task_store):
+    """Reads a task that is no longer buffered, as tasks/get does."""
+    task = make_task('task-1')
+    task.status = TaskStatus(state=TaskState.completed)
+    run_async(lambda: task_store.save(task))
+
+    result = benchmark(run_async, lambda: task_store.get('task-1'))
+
+    assert result.id == 'task-1'
@@ -0,0 +1,73 @@
+"""
+Copyright 2025 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import importlib.util
+import os
+import sys
+
+from pathlib import Path
+
+import pytest
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(scope='session', autouse=True)
+def blob_dir(tmp_path_factory):
+    """Keeps spilled blobs out of the shared default location.
+
+    The blob store reads A2A_BLOB_DIR when first used, which is always
+    inside a benchmark, so setting it for the session is early enough.
+    """
+    if os.getenv('A2A_BLOB_DIR'):
+        yield Path(os.environ['A2A_BLOB_DIR'])
+        return
+    path = tmp_path_factory.mktemp('blobs')
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv('A2A_BLOB_DIR', str(path))
+        yield path
+
+
+def load_agent_module(agent_dir: str, module: str):
+    """Imports `<agent_dir>/<module>.py` the way `uv run .` would.
+
+    The agents are plain script directories with clashing module names
+    (e.g. two `agent_executor.py`), so each one is loaded under a unique name
+    with its own directory on `sys.path`.
+    """
+    name = f'{agent_dir}.{module}'
+    if name in sys.modules:
+        return sys.modules[name]
+    path = ROOT / agent_dir / f'{module}.py'
+    sys.path.insert(0, str(path.parent))
+    try:
+        spec = importlib.util.spec_from_file_location(name, path)
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[name] = mod
+        spec.loader.exec_module(mod)
+    finally:
+        sys.path.remove(str(path.parent))
+    return mod
+
+
+@pytest.fixture
+def run_async():
+    """Runs a coroutine factory to completion on a dedicated event loop."""
+    loop = asyncio.new_event_loop()
+    yield lambda factory: loop.run_until_complete(factory())
+    loop.close()
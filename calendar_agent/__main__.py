@@ -1,3 +1,4 @@
+import functools
 import logging, os, json
 
 import click
@@ -5,25 +6,53 @@ import uvicorn
 
 from a2a.server.apps import A2AStarletteApplication
 from a2a.server.request_handlers import DefaultRequestHandler
-from a2a.server.tasks import InMemoryTaskStore
 from a2a.types import (
     AgentCapabilities,
     AgentCard,
     AgentSkill,
 )
+from agent_common.blob_store import ROUTE, blob_endpoint, get_blob_store
+from agent_common.bounded_adk_services import (
+    BoundedArtifactService,
+    BoundedMemoryService,
+)
+from agent_common.bounded_store import (
+    DEFAULT_IDLE_TTL_SECONDS,
+    DEFAULT_MAX_BYTES,
+    DEFAULT_MAX_ENTRIES,
+    BoundedTaskStore,
+    metrics_endpoint,
+)
+from agent_common.multiworker import DEFAULT_WORKERS, run_workers
+from agent_common.sqlite_task_store import SqliteTaskStore
 from calendar_agent import (
     create_calendar_agent,
 )
 from agent_executor import (
     CalendarExecutor,
 )
+from calendar_client import close_calendar_client
+from calendar_prefetch import DEFAULT_PREFETCH_DAYS, CalendarPrefetcher
+from fair_queue import DEFAULT_MAX_CONCURRENT_EXECUTIONS, FairQueue, parse_weights
 from dotenv import load_dotenv
-from google.adk.artifacts import InMemoryArtifactService
-from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
 
-from oauth2_middleware import OAuth2Middleware
+from oauth2_middleware import (
+    OAuth2CallContextBuilder,
+    OAuth2Middleware,
+    validator_from_env,
+)
+from rate_limit import (
+    DEFAULT_BURST,
+    DEFAULT_RATE_PER_SECOND,
+    RateLimitMiddleware,
+    TokenBucketLimiter,
+)
+from session_service import (
+    DEFAULT_PARTITION_MAX_BYTES,
+    DEFAULT_PARTITION_MAX_SESSIONS,
+    CalendarSessionService,
+)
 
 
 load_dotenv()
@@ -34,7 +63,33 @@ DEFAULT_HOST = 'localhost'
 DEFAULT_PORT = 10004
 
 
-def main(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+def validate_weights(ctx, param, value: str | None) -> str | None:
+    """Reports invalid --user-weights at startup rather than on a request."""
+    try:
+        parse_weights(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from e
+    return value
+
+
+def main(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    stream_partial: bool = False,
+    store_ttl: float = DEFAULT_IDLE_TTL_SECONDS,
+    store_max_entries: int = DEFAULT_MAX_ENTRIES,
+    store_max_bytes: int = DEFAULT_MAX_BYTES,
+    task_db: str | None = None,
+    prefetch_days: int = DEFAULT_PREFETCH_DAYS,
+    rate_limit: float = DEFAULT_RATE_PER_SECOND,
+    rate_burst: int = DEFAULT_BURST,
+    max_concurrent: int = DEFAULT_MAX_CONCURRENT_EXECUTIONS,
+    user_weights: str | None = None,
+    session_quota: int = DEFAULT_PARTITION_MAX_SESSIONS,
+    session_quota_bytes: int = DEFAULT_PARTITION_MAX_BYTES,
+    workers: int = DEFAULT_WORKERS,
+    uds: str | None = None,
+):
     # Verify an API key is set.
     # Not required if using Vertex AI APIs.
     if os.getenv('GOOGLE_GENAI_USE_VERTEXAI') != 'TRUE' and not os.getenv(
@@ -45,6 +100,47 @@ def main(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
             'GOOGLE_GENAI_USE_VERTEXAI is not TRUE.'
         )
 
+    if workers > 1:
+        # Users are rate limited once, before their requests are dispatched,
+        # instead of by each worker.
+        def limit_users(dispatcher):
+            if rate_limit:
+                dispatcher = RateLimitMiddleware(
+                    dispatcher, TokenBucketLimiter(rate_limit, rate_burst)
+                )
+            return OAuth2Middleware(
+                dispatcher,
+                validator=validator_from_env(),
+                required_scopes=os.getenv('OAUTH2_REQUIRED_SCOPES', '').split(),
+            )
+
+        # Every worker runs this function again, on its own unix socket, with
+        # its share of the executions run at once.
+        run_workers(
+            functools.partial(
+                main,
+                host,
+                port,
+                stream_partial,
+                store_ttl,
+                store_max_entries,
+                store_max_bytes,
+                task_db,
+                prefetch_days,
+                0,
+                rate_burst,
+                max(1, max_concurrent // workers) if max_concurrent else 0,
+                user_weights,
+                session_quota,
+                session_quota_bytes,
+            ),
+            host,
+            port,
+            workers,
+            middleware=limit_users,
+        )
+        return
+
     skill = AgentSkill(
         id='calendar_events_retrieval',
         name='Calendar events retrieval',
@@ -78,38 +174,216 @@ def main(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
         }
     )
 
+    # Every in-memory store evicts idle and least recently used entries, so
+    # that memory stays flat on a long running server.
+    store_limits = {
+        'idle_ttl': store_ttl,
+        'max_entries': store_max_entries,
+        'max_bytes': store_max_bytes,
+    }
+    prefetcher = CalendarPrefetcher(days=prefetch_days)
     adk_agent = create_calendar_agent()
     runner = Runner(
         app_name=agent_card.name,
         agent=adk_agent,
-        artifact_service=InMemoryArtifactService(),
-        session_service=InMemorySessionService(),
-        memory_service=InMemoryMemoryService(),
+        artifact_service=BoundedArtifactService(**store_limits),
+        session_service=CalendarSessionService(
+            on_session_removed=prefetcher.cancel,
+            partition_max_sessions=session_quota,
+            partition_max_bytes=session_quota_bytes,
+            **store_limits,
+        ),
+        memory_service=BoundedMemoryService(**store_limits),
+    )
+    agent_executor = CalendarExecutor(
+        runner,
+        agent_card,
+        stream_partial=stream_partial,
+        prefetcher=prefetcher,
+        fair_queue=FairQueue(max_concurrent, parse_weights(user_weights)),
     )
-    agent_executor = CalendarExecutor(runner, agent_card)
+
+    if task_db:
+        # Durable tasks, shared by every server process using the same file
+        task_store = SqliteTaskStore(task_db)
+    else:
+        task_store = BoundedTaskStore(**store_limits)
 
     request_handler = DefaultRequestHandler(
-        agent_executor=agent_executor, task_store=InMemoryTaskStore()
+        agent_executor=agent_executor, task_store=task_store
     )
 
     server = A2AStarletteApplication(
-        agent_card=agent_card, http_handler=request_handler
+        agent_card=agent_card,
+        http_handler=request_handler,
+        context_builder=OAuth2CallContextBuilder(),
     )
 
-    # Adding the middleware to inspect the OAuth token, actual authorization is not done in this demo
     app = server.build()
-    app.add_middleware(OAuth2Middleware)
+    app.add_route('/metrics', metrics_endpoint, methods=['GET'])
+    # Large file parts are handed to clients as URLs of this route
+    get_blob_store().base_url = agent_card.url
+    app.add_route(ROUTE, blob_endpoint, methods=['GET'])
+    app.add_event_handler('shutdown', prefetcher.close)
+    app.add_event_handler('shutdown', close_calendar_client)
+    if task_db:
+        app.add_event_handler('shutdown', task_store.close)
+    # Per-user limits apply to authenticated requests, so this middleware is
+    # added first to run inside the OAuth2 one.
+    if rate_limit:
+        app.add_middleware(
+            RateLimitMiddleware, limiter=TokenBucketLimiter(rate_limit, rate_burst)
+        )
+    # Bearer tokens are validated with their issuer, see validator_from_env,
+    # and the results cached.
+    token_validator = validator_from_env()
+    app.add_event_handler('shutdown', token_validator.aclose)
+    app.add_middleware(
+        OAuth2Middleware,
+        validator=token_validator,
+        required_scopes=os.getenv('OAUTH2_REQUIRED_SCOPES', '').split(),
+    )
 
     # await uvicorn.Server(uvicorn.Config(app=app, host=host, port=port)).serve()
-    uvicorn.run(app, host=host, port=port)
+    uvicorn.run(app, host=host, port=port, uds=uds)
 
 
 @click.command()
 @click.option('--host', 'host', default=DEFAULT_HOST)
 @click.option('--port', 'port', default=DEFAULT_PORT)
-def cli(host: str, port: int):
-    main(host, port)
+@click.option(
+    '--stream-partial',
+    'stream_partial',
+    is_flag=True,
+    envvar='A2A_STREAM_PARTIAL',
+    help='Stream partial model output as artifact chunks over message/stream.',
+)
+@click.option(
+    '--store-ttl',
+    'store_ttl',
+    default=DEFAULT_IDLE_TTL_SECONDS,
+    envvar='A2A_STORE_TTL',
+    help='Seconds after which idle tasks, sessions and artifacts are evicted.',
+)
+@click.option(
+    '--store-max-entries',
+    'store_max_entries',
+    default=DEFAULT_MAX_ENTRIES,
+    envvar='A2A_STORE_MAX_ENTRIES',
+    help='Maximum number of entries per in-memory store, 0 for no limit.',
+)
+@click.option(
+    '--store-max-bytes',
+    'store_max_bytes',
+    default=DEFAULT_MAX_BYTES,
+    envvar='A2A_STORE_MAX_BYTES',
+    help='Maximum size in bytes per in-memory store, 0 for no limit.',
+)
+@click.option(
+    '--task-db',
+    'task_db',
+    default=None,
+    envvar='A2A_TASK_DB',
+    help='Keep tasks in this SQLite database instead of in memory.',
+)
+@click.option(
+    '--prefetch-days',
+    'prefetch_days',
+    default=DEFAULT_PREFETCH_DAYS,
+    envvar='A2A_CALENDAR_PREFETCH_DAYS',
+    help='Days of events to sync when a new token arrives, 0 to disable.',
+)
+@click.option(
+    '--rate-limit',
+    'rate_limit',
+    default=DEFAULT_RATE_PER_SECOND,
+    envvar='A2A_RATE_LIMIT',
+    help=(
+        'Sustained requests per second allowed per user, 0 for no limit; '
+        'applied once in front of all the --workers.'
+    ),
+)
+@click.option(
+    '--rate-burst',
+    'rate_burst',
+    default=DEFAULT_BURST,
+    envvar='A2A_RATE_BURST',
+    help='Requests a user may make at once above the sustained rate.',
+)
+@click.option(
+    '--max-concurrent',
+    'max_concurrent',
+    default=DEFAULT_MAX_CONCURRENT_EXECUTIONS,
+    envvar='A2A_MAX_CONCURRENT',
+    help=(
+        'Agent executions run at once, fairly between users; 0 for no limit. '
+        'Split evenly between the --workers, at least one each.'
+    ),
+)
+@click.option(
+    '--user-weights',
+    'user_weights',
+    default=None,
+    envvar='A2A_USER_WEIGHTS',
+    callback=validate_weights,
+    help='Fair share weights by token subject, e.g. "alice=2,bob=0.5".',
+)
+@click.option(
+    '--session-quota',
+    'session_quota',
+    default=DEFAULT_PARTITION_MAX_SESSIONS,
+    envvar='A2A_SESSION_QUOTA',
+    help='Sessions kept per user, 0 for no limit.',
+)
+@click.option(
+    '--session-quota-bytes',
+    'session_quota_bytes',
+    default=DEFAULT_PARTITION_MAX_BYTES,
+    envvar='A2A_SESSION_QUOTA_BYTES',
+    help='Size in bytes of the sessions kept per user, 0 for no limit.',
+)
+@click.option(
+    '--workers',
+    'workers',
+    default=DEFAULT_WORKERS,
+    envvar='A2A_WORKERS',
+    help='Server processes to run; each conversation stays on one of them.',
+)
+def cli(
+    host: str,
+    port: int,
+    stream_partial: bool,
+    store_ttl: float,
+    store_max_entries: int,
+    store_max_bytes: int,
+    task_db: str | None,
+    prefetch_days: int,
+    rate_limit: float,
+    rate_burst: int,
+    max_concurrent: int,
+    user_weights: str | None,
+    session_quota: int,
+    session_quota_bytes: int,
+    workers: int,
+):
+    main(
+        host,
+        port,
+        stream_partial,
+        store_ttl,
+        store_max_entries,
+        store_max_bytes,
+        task_db,
+        prefetch_days,
+        rate_limit,
+        rate_burst,
+        max_concurrent,
+        user_weights,
+        session_quota,
+        session_quota_bytes,
+        workers,
+    )
 
 
 if __name__ == '__main__':
-    main()
+    cli()
@@ -1,9 +1,11 @@
+import asyncio
+import base64
+import binascii
 import logging, json
+import uuid
 
-from typing import TYPE_CHECKING
-
+from contextlib import aclosing
 from datetime import datetime
-import time
 
 from a2a.server.agent_execution import AgentExecutor
 from a2a.server.agent_execution.context import RequestContext
@@ -11,94 +13,128 @@ from a2a.server.events.event_queue import EventQueue
 from a2a.server.tasks import TaskUpdater
 from a2a.types import (
     AgentCard,
+    Artifact,
     FilePart,
     FileWithBytes,
     FileWithUri,
     Part,
+    TaskArtifactUpdateEvent,
+    TaskNotCancelableError,
     TaskState,
     TextPart,
-    UnsupportedOperationError,
 )
 from a2a.utils.errors import ServerError
+from agent_common.blob_store import get_blob_store
+from calendar_prefetch import CalendarPrefetcher
+from fair_queue import FairQueue
 from google.adk import Runner
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.genai import types
-from google.adk.events import Event, EventActions
-
-
-if TYPE_CHECKING:
-    from google.adk.sessions.session import Session
 
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 # Constants
+# Sessions of requests without an authenticated user
 DEFAULT_USER_ID = 'self'
+# How long a cancel request waits for the running execution to unwind
+CANCEL_GRACE_SECONDS = 5.0
 
 
 class CalendarExecutor(AgentExecutor):
     """An AgentExecutor that runs an ADK-based Agent for calendar."""
 
-    def __init__(self, runner: Runner, card: AgentCard):
+    def __init__(
+        self,
+        runner: Runner,
+        card: AgentCard,
+        stream_partial: bool = False,
+        prefetcher: CalendarPrefetcher | None = None,
+        fair_queue: FairQueue | None = None,
+    ):
         self.runner = runner
         self._card = card
-        # Track active sessions for potential cancellation
-        self._active_sessions: set[str] = set()
+        # Warms the calendar cache while the model works out its first call
+        self._prefetcher = prefetcher
+        # Shares the execution slots fairly between the calling users
+        self._fair_queue = fair_queue or FairQueue(max_concurrent=0)
+        # Stream partial model output (SSE run mode) as artifact chunks
+        self._run_config = RunConfig(
+            streaming_mode=(
+                StreamingMode.SSE if stream_partial else StreamingMode.NONE
+            )
+        )
+        # Running executions by task id, so that they can be cancelled
+        self._running_tasks: dict[str, tuple[asyncio.Task, TaskUpdater]] = {}
 
     async def _process_request(
         self,
         new_message: types.Content,
+        user_id: str,
         session_id: str,
         access_token: str,
         task_updater: TaskUpdater,
     ) -> None:
-        session_obj = await self._upsert_session(session_id)
-        # Update session_id with the ID from the resolved session object.
-        # (it may be the same as the one passed in if it already exists)
-        session_id = session_obj.id
-
-        logger.debug(f'Initial state: {session_obj.state}')
-
-        # Track this session as active
-        self._active_sessions.add(session_id)
-
-        # Inject OAuth token into the session state
-        state_changes={
-            "calendar_access_token": access_token
-        }
-        actions_with_update = EventActions(state_delta=state_changes)
-        current_time = time.time()
-        system_event = Event(
-            invocation_id="token_update",
-            author="user", # Or 'agent', 'tool' etc.
-            actions=actions_with_update,
-            timestamp=current_time
-            # content might be None or represent the action taken
-        )
-        await self.runner.session_service.append_event(session_obj, system_event)
-        updated_session = await self.runner.session_service.get_session(
-            app_name=self.runner.app_name,
-            user_id=DEFAULT_USER_ID,
-            session_id=session_id,
+        # Get or create the session and inject the OAuth token into its state
+        # in a single step. The state is only written when the token changed,
+        # and no history event is recorded for it. The tools cache events by
+        # the user id, the token's subject, which outlives the token itself.
+        session_id, token_changed = (
+            await self.runner.session_service.upsert_session(
+                app_name=self.runner.app_name,
+                user_id=user_id,
+                session_id=session_id,
+                state_delta={
+                    'calendar_access_token': access_token,
+                    'calendar_user': user_id,
+                },
+            )
         )
-        logger.debug(f'Updated state: {updated_session.state}')
-        print("`append_event` called with explicit state delta.")
-
-        try:
-            async for event in self.runner.run_async(
+        if token_changed:
+            logger.debug(f'Calendar access token updated for session {session_id}')
+            if self._prefetcher:
+                self._prefetcher.prefetch(user_id, session_id, access_token)
+
+        # Partial text is appended to this artifact as it arrives and then
+        # replaced by the complete final response.
+        artifact_id = str(uuid.uuid4())
+        streamed = False
+        # aclosing() unwinds the ADK run, including an in-flight tool call,
+        # as soon as the execution is cancelled.
+        async with aclosing(
+            self.runner.run_async(
                 session_id=session_id,
-                user_id=DEFAULT_USER_ID,
+                user_id=user_id,
                 new_message=new_message,
-            ):
+                run_config=self._run_config,
+            )
+        ) as events:
+            async for event in events:
                 # logger.debug('Event: %s', event)
+                if event.partial:
+                    chunk = [
+                        convert_genai_part_to_a2a(part, task_updater.context_id)
+                        for part in (event.content.parts if event.content else [])
+                        if part.text
+                    ]
+                    if chunk:
+                        logger.debug('Yielding partial response')
+                        await self._add_artifact_chunk(
+                            task_updater, artifact_id, chunk, append=streamed
+                        )
+                        streamed = True
+                    continue
                 if event.is_final_response():
                     parts = [
-                        convert_genai_part_to_a2a(part)
+                        convert_genai_part_to_a2a(part, task_updater.context_id)
                         for part in event.content.parts
                         if (part.text or part.file_data or part.inline_data)
                     ]
                     logger.debug('Yielding final response: %s', parts)
-                    await task_updater.add_artifact(parts)
+                    await self._add_artifact_chunk(
+                        task_updater, artifact_id, parts, last_chunk=True
+                    )
                     await task_updater.update_status(
                         TaskState.completed, final=True
                     )
@@ -109,7 +145,7 @@ class CalendarExecutor(AgentExecutor):
                         TaskState.working,
                         message=task_updater.new_agent_message(
                             [
-                                convert_genai_part_to_a2a(part)
+                                convert_genai_part_to_a2a(part, task_updater.context_id)
                                 for part in event.content.parts
                                 if (
                                     part.text
@@ -121,9 +157,6 @@ class CalendarExecutor(AgentExecutor):
                     )
                 else:
                     logger.debug('Skipping event')
-        finally:
-            # Remove from active sessions when done
-            self._active_sessions.discard(session_id)
 
     async def execute(
         self,
@@ -134,110 +167,163 @@ class CalendarExecutor(AgentExecutor):
         logger.debug(f'Message parts in the Request Context: {context.message.parts}')
         # Run the agent until either complete or the task is suspended.
         updater = TaskUpdater(event_queue, context.task_id, context.context_id)
-        # Immediately notify that the task is submitted.
-        if not context.current_task:
-            await updater.update_status(TaskState.submitted)
-        await updater.update_status(TaskState.working)
-
-        parts=[
-            convert_a2a_part_to_genai(part)
-            for part in context.message.parts
-        ]
-        logger.debug(f'parts from the conversion: {parts}')
-
-        # Extract the OAuth Access Token from the request headers received by the A2A Server
-        access_token=context.call_context.state['headers']['authorization'].split(' ')[1]
-        logger.debug(f'access_token: {access_token}')
-
-        await self._process_request(
-            types.UserContent(
-                parts=[
-                    f'{convert_a2a_part_to_genai(part)} Time now is {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
+        self._running_tasks[context.task_id] = (asyncio.current_task(), updater)
+        try:
+            # Immediately notify that the task is submitted.
+            if not context.current_task:
+                await updater.update_status(TaskState.submitted)
+            await updater.update_status(TaskState.working)
+
+            try:
+                parts = [
+                    convert_a2a_part_to_genai(part, context.context_id)
                     for part in context.message.parts
-                ],
-            ),
-            context.context_id,
-            access_token,
-            updater,
-        )
+                ]
+            except ValueError as e:
+                # e.g. a blob URL that expired or is another conversation's
+                await updater.failed(
+                    message=updater.new_agent_message(
+                        [Part(root=TextPart(text=str(e)))]
+                    )
+                )
+                return
+            logger.debug(f'parts from the conversion: {parts}')
+
+            # Extract the OAuth Access Token from the request headers received by the A2A Server
+            access_token=context.call_context.state['headers']['authorization'].split(' ')[1]
+            logger.debug(f'access_token: {access_token}')
+
+            # Sessions are partitioned by the subject of the validated token,
+            # the user name OAuth2CallContextBuilder gives the call context.
+            user = context.call_context.user
+            user_id = user.user_name if user.is_authenticated else DEFAULT_USER_ID
+            # Turns of one conversation run one at a time; waiting for that
+            # happens before taking, if the server is busy, the user's fair
+            # turn for an execution slot.
+            async with (
+                self.runner.session_service.session_lock(
+                    self.runner.app_name, user_id, context.context_id
+                ),
+                self._fair_queue.slot(user_id),
+            ):
+                await self._process_request(
+                    types.UserContent(
+                        parts=[
+                            f'{part} Time now is {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
+                            for part in parts
+                        ],
+                    ),
+                    user_id,
+                    context.context_id,
+                    access_token,
+                    updater,
+                )
+        finally:
+            self._running_tasks.pop(context.task_id, None)
         logger.debug('[calendar] execute exiting')
 
     async def cancel(self, context: RequestContext, event_queue: EventQueue):
         """Cancel the execution for the given context.
 
-        Currently logs the cancellation attempt as the underlying ADK runner
-        doesn't support direct cancellation of ongoing tasks.
+        Cancels the running ADK invocation, including any in-flight tool call,
+        and reports the task as canceled.
         """
-        session_id = context.context_id
-        if session_id in self._active_sessions:
-            logger.info(
-                f'Cancellation requested for active calendar session: {session_id}'
-            )
-            # TODO: Implement proper cancellation when ADK supports it
-            self._active_sessions.discard(session_id)
-        else:
+        running = self._running_tasks.pop(context.task_id, None)
+        if running is None or running[0].done():
             logger.debug(
-                f'Cancellation requested for inactive calendar session: {session_id}'
+                f'Cancellation requested for inactive calendar task: {context.task_id}'
             )
+            raise ServerError(error=TaskNotCancelableError())
+
+        logger.info(f'Cancelling active calendar task: {context.task_id}')
+        task, updater = running
+        # Stopped first, as it could still publish its own final status
+        # while canceled is published.
+        task.cancel()
+        await asyncio.wait({task}, timeout=CANCEL_GRACE_SECONDS)
+        if task.done() and not task.cancelled():
+            # It finished before the cancellation reached it.
+            raise ServerError(error=TaskNotCancelableError())
+        # Published on the queue of the running execution, so both its
+        # subscribers and the queue tapped for this cancel request see it.
+        await updater.update_status(TaskState.canceled, final=True)
+
+    async def _add_artifact_chunk(
+        self,
+        task_updater: TaskUpdater,
+        artifact_id: str,
+        parts: list[Part],
+        append: bool = False,
+        last_chunk: bool = False,
+    ) -> None:
+        """Publishes a chunk of the response artifact.
 
-        raise ServerError(error=UnsupportedOperationError())
-
-    async def _upsert_session(self, session_id: str) -> 'Session':
-        """Retrieves a session if it exists, otherwise creates a new one.
-
-        Ensures that async session service methods are properly awaited.
+        Unlike `TaskUpdater.add_artifact`, this sets `append` and `lastChunk`
+        so that streaming clients can assemble the artifact incrementally.
         """
-        session = await self.runner.session_service.get_session(
-            app_name=self.runner.app_name,
-            user_id=DEFAULT_USER_ID,
-            session_id=session_id,
-        )
-        if session is None:
-            session = await self.runner.session_service.create_session(
-                app_name=self.runner.app_name,
-                user_id=DEFAULT_USER_ID,
-                session_id=session_id,
+        await task_updater.event_queue.enqueue_event(
+            TaskArtifactUpdateEvent(
+                taskId=task_updater.task_id,
+                contextId=task_updater.context_id,
+                append=append,
+                lastChunk=last_chunk,
+                artifact=Artifact(artifactId=artifact_id, parts=parts),
             )
-        return session
+        )
 
 
-def convert_a2a_part_to_genai(part: Part) -> types.Part:
+def convert_a2a_part_to_genai(part: Part, context_id: str) -> types.Part:
     """Convert a single A2A Part type into a Google Gen AI Part type.
 
     Args:
         part: The A2A Part to convert
+        context_id: The conversation the part was sent in
 
     Returns:
         The equivalent Google Gen AI Part
 
     Raises:
-        ValueError: If the part type is not supported
+        ValueError: If the part type is not supported, or the part refers
+            to a blob that is not one of this conversation
     """
     part = part.root
     if isinstance(part, TextPart):
         return types.Part(text=part.text)
     if isinstance(part, FilePart):
         if isinstance(part.file, FileWithUri):
+            blob_store = get_blob_store()
+            if blob_store.owns(part.file.uri):
+                # Spilled blobs are inlined straight from the memory-mapped
+                # view rather than fetched back over HTTP.
+                return types.Part(
+                    inline_data=types.Blob(
+                        data=bytes(blob_store.view(part.file.uri, context_id)),
+                        mime_type=part.file.mimeType,
+                    )
+                )
             return types.Part(
                 file_data=types.FileData(
-                    file_uri=part.file.uri, mime_type=part.file.mime_type
+                    file_uri=part.file.uri, mime_type=part.file.mimeType
                 )
             )
         if isinstance(part.file, FileWithBytes):
             return types.Part(
                 inline_data=types.Blob(
-                    data=part.file.bytes, mime_type=part.file.mime_type
+                    # a2b_base64 accepts the str as is, saving an ASCII copy
+                    data=binascii.a2b_base64(part.file.bytes),
+                    mime_type=part.file.mimeType,
                 )
             )
         raise ValueError(f'Unsupported file type: {type(part.file)}')
     raise ValueError(f'Unsupported part type: {type(part)}')
 
 
-def convert_genai_part_to_a2a(part: types.Part) -> Part:
+def convert_genai_part_to_a2a(part: types.Part, context_id: str) -> Part:
     """Convert a single Google Gen AI Part type into an A2A Part type.
 
     Args:
         part: The Google Gen AI Part to convert
+        context_id: The conversation the part is sent in
 
     Returns:
         The equivalent A2A Part
@@ -251,15 +337,28 @@ def convert_genai_part_to_a2a(part: types.Part) -> Part:
         return FilePart(
             file=FileWithUri(
                 uri=part.file_data.file_uri,
-                mime_type=part.file_data.mime_type,
+                mimeType=part.file_data.mime_type,
             )
         )
     if part.inline_data:
+        blob_store = get_blob_store()
+        if blob_store.should_spill(len(part.inline_data.data)):
+            # Large payloads are handed off as a URL the client can fetch
+            # instead of being base64 encoded into every event and kept in
+            # the task store.
+            return Part(
+                root=FilePart(
+                    file=FileWithUri(
+                        uri=blob_store.put(part.inline_data.data, context_id),
+                        mimeType=part.inline_data.mime_type,
+                    )
+                )
+            )
         return Part(
             root=FilePart(
                 file=FileWithBytes(
-                    bytes=part.inline_data.data,
-                    mime_type=part.inline_data.mime_type,
+                    bytes=base64.b64encode(part.inline_data.data).decode(),
+                    mimeType=part.inline_data.mime_type,
                 )
             )
         )
@@ -12,8 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from datetime import datetime
-import os, json, requests
+from datetime import UTC, datetime
+import heapq
+import logging
+import os, json
+
+import httpx
 
 from google.adk.agents import LlmAgent
 from dotenv import load_dotenv
@@ -24,9 +28,19 @@ from google.adk.tools import ToolContext
 
 from google.oauth2.credentials import Credentials
 
+from calendar_cache import get_calendar_cache, parse_time
+from calendar_client import get_calendar_client
+from event_projection import project_event
+
+logger = logging.getLogger(__name__)
+
 # Load environment variables from .env file
 load_dotenv()
 
+# Print the tool context state (which holds the access token) and the events
+# returned to the model, for debugging.
+VERBOSE = os.getenv('A2A_CALENDAR_VERBOSE', '').lower() in ('1', 'true')
+
 
 def update_time(callback_context: CallbackContext):
   # get current date time
@@ -35,18 +49,36 @@ def update_time(callback_context: CallbackContext):
   callback_context.state["_time"] = formatted_time
 
 
-def list_calendar_events(
+def _time_range(start_time: str, end_time: str) -> tuple[str, str]:
+  """Returns the time range of a tool call as RFC3339 times.
+
+  Times without an offset are taken as UTC and dates as their midnight.
+
+  Raises:
+      ValueError: If a time is not ISO 8601 or the range is empty.
+  """
+  times = []
+  for value in (start_time, end_time):
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+      parsed = parsed.replace(tzinfo=UTC)
+    times.append(parsed)
+  if times[1] <= times[0]:
+    raise ValueError(f"end_time {end_time} is not after start_time {start_time}")
+  return times[0].isoformat(), times[1].isoformat()
+
+
+async def list_calendar_events(
     start_time: str,
     end_time: str,
     limit: int,
     tool_context: ToolContext,
 ) -> list[dict]:
-  """Search for calendar events.
+  """Search for events in the user's primary calendar.
 
   Example:
 
-      flights = get_calendar_events(
-          calendar_id='joedoe@gmail.com',
+      events = list_calendar_events(
           start_time='2024-09-17T06:00:00',
           end_time='2024-09-17T12:00:00',
           limit=10
@@ -54,56 +86,170 @@ def list_calendar_events(
       # Returns up to 10 calendar events between 6:00 AM and 12:00 PM on
       September 17, 2024.
 
+  Use list_events_in_calendars to search other calendars.
+
   Args:
-      calendar_id (str): the calendar ID to search for events.
       start_time (str): The start of the time range (format is
         YYYY-MM-DDTHH:MM:SS).
       end_time (str): The end of the time range (format is YYYY-MM-DDTHH:MM:SS).
       limit (int): The maximum number of results to return.
 
   Returns:
-      list[dict]: A list of events that match the search criteria.
+      list[dict]: A list of events that match the search criteria, each with
+        its title, start, end, location, number of attendees and status.
   """
-  # TODO: Instead of using the request module against a hard coded URL, should use the Google API module
-
   # Check if the tokes were already in the session state, which means the user
   # has already gone through the OAuth flow and successfully authenticated and
   # authorized the tool to access their calendar.
-  print(f'calendar_agent: {tool_context.state}')
-  if "calendar_access_token" in tool_context.state:
-    print(f'calendar_agent: {tool_context.state["calendar_access_token"]}')
-  
-    # Example: List events from the primary calendar
-    url = "https://www.googleapis.com/calendar/v3/calendars/primary/events"
-
-    headers = {
-        "Authorization": f"Bearer {tool_context.state["calendar_access_token"]}",
-        "Content-Type": "application/json"
-    }
-
-    try:
-        response = requests.get(
-           url, 
-           headers=headers, 
-           params={
-            "timeMin": start_time+'Z',
-            "timeMax": end_time+'Z',
-            "maxResults": limit
-          }
-        )
-        response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-
-        events = response.json()
-        print(json.dumps(events, indent=2))
-
-    except requests.exceptions.RequestException as e:
-        print(f"Error: {e}")
-    except json.JSONDecodeError as e:
-        print(f"Error decoding JSON: {e}")
+  if VERBOSE:
+    print(f'calendar_agent: {tool_context.state}')
+  if "calendar_access_token" not in tool_context.state:
+    return [{"error": "The user has not authorized access to their calendar."}]
+
+  try:
+    time_min, time_max = _time_range(start_time, end_time)
+  except ValueError as e:
+    return [{"error": f"Invalid time range: {e}"}]
+
+  try:
+    # Served from the user's synced events where possible; otherwise only the
+    # changes since the last sync are fetched, on the shared connection pool.
+    events = await get_calendar_cache().list_events(
+        tool_context.state["calendar_access_token"],
+        tool_context.state["calendar_user"],
+        "primary",
+        time_min=time_min,
+        time_max=time_max,
+        limit=limit,
+    )
+  except (httpx.HTTPError, ValueError) as e:
+    # ValueError includes json.JSONDecodeError.
+    logger.warning("Failed to list calendar events: %s", e)
+    return [{"error": f"Failed to list calendar events: {e}"}]
 
+  # Only the fields the model needs, which keeps the prompt small.
+  events = [project_event(event) for event in events]
+  if VERBOSE:
+    print(json.dumps(events, indent=2))
   return events
 
 
+async def list_events_in_calendars(
+    calendar_ids: list[str],
+    start_time: str,
+    end_time: str,
+    limit: int,
+    tool_context: ToolContext,
+) -> list[dict]:
+  """Search for events in several calendars at once.
+
+  The calendars are queried in parallel and their events returned together,
+  ordered by start time.
+
+  Args:
+      calendar_ids (list[str]): the calendar IDs to search, e.g.
+        ["primary", "team@example.com"].
+      start_time (str): The start of the time range (format is
+        YYYY-MM-DDTHH:MM:SS).
+      end_time (str): The end of the time range (format is YYYY-MM-DDTHH:MM:SS).
+      limit (int): The maximum number of results to return in total.
+
+  Returns:
+      list[dict]: The matching events, each with the calendarId it was found
+        in, followed by an error entry for each calendar that could not be
+        read.
+  """
+  if "calendar_access_token" not in tool_context.state:
+    return [{"error": "The user has not authorized access to their calendar."}]
+
+  try:
+    time_min, time_max = _time_range(start_time, end_time)
+  except ValueError as e:
+    return [{"error": f"Invalid time range: {e}"}]
+
+  try:
+    events, errors = await get_calendar_cache().list_events_in_calendars(
+        tool_context.state["calendar_access_token"],
+        tool_context.state["calendar_user"],
+        calendar_ids,
+        time_min=time_min,
+        time_max=time_max,
+        limit=limit,
+    )
+  except (httpx.HTTPError, ValueError) as e:
+    logger.warning("Failed to list calendar events: %s", e)
+    return [{"error": f"Failed to list calendar events: {e}"}]
+
+  events = [project_event(event) for event in events]
+  if VERBOSE:
+    print(json.dumps(events, indent=2))
+  return events + [
+      {"calendarId": calendar_id, "error": f"Failed to list calendar events: {e}"}
+      for calendar_id, e in errors.items()
+  ]
+
+
+async def get_busy_times(
+    calendar_ids: list[str],
+    start_time: str,
+    end_time: str,
+    tool_context: ToolContext,
+) -> dict:
+  """Find when any of several calendars is busy, e.g. to find a free slot.
+
+  Args:
+      calendar_ids (list[str]): the calendar IDs to check, e.g.
+        ["primary", "team@example.com"].
+      start_time (str): The start of the time range (format is
+        YYYY-MM-DDTHH:MM:SS).
+      end_time (str): The end of the time range (format is YYYY-MM-DDTHH:MM:SS).
+
+  Returns:
+      dict: "busy", the busy intervals of all the calendars combined, in
+        order and without overlaps, and "errors", the calendars that could
+        not be read.
+  """
+  if "calendar_access_token" not in tool_context.state:
+    return {"error": "The user has not authorized access to their calendar."}
+
+  try:
+    time_min, time_max = _time_range(start_time, end_time)
+  except ValueError as e:
+    return {"error": f"Invalid time range: {e}"}
+
+  try:
+    calendars = await get_calendar_client().free_busy(
+        tool_context.state["calendar_access_token"],
+        list(dict.fromkeys(calendar_ids)),
+        time_min=time_min,
+        time_max=time_max,
+    )
+  except (httpx.HTTPError, json.JSONDecodeError) as e:
+    logger.warning("Failed to get busy times: %s", e)
+    return {"error": f"Failed to get busy times: {e}"}
+
+  # Each calendar's intervals are sorted, so merging them is enough to
+  # coalesce the overlapping ones in a single pass.
+  busy = []
+  for interval in heapq.merge(
+      *(calendar.get("busy", []) for calendar in calendars.values()),
+      key=lambda interval: parse_time(interval["start"]),
+  ):
+    if busy and parse_time(interval["start"]) <= parse_time(busy[-1]["end"]):
+      if parse_time(interval["end"]) > parse_time(busy[-1]["end"]):
+        busy[-1]["end"] = interval["end"]
+    else:
+      busy.append(dict(interval))
+  return {
+      "busy": busy,
+      "errors": {
+          calendar_id: calendar["errors"]
+          for calendar_id, calendar in calendars.items()
+          if calendar.get("errors")
+      },
+  }
+
+
 def create_calendar_agent() -> LlmAgent:
     """Constructs the ADK agent."""
     return LlmAgent(
@@ -118,6 +264,11 @@ def create_calendar_agent() -> LlmAgent:
         The user want to query the calendar events.
         Use list_calendar_events to search for calendar events.
 
+        Scenario2:
+        The user asks about several calendars at once.
+        Use list_events_in_calendars with all of their calendarIds in a single call,
+        or get_busy_times with all of them to find when everyone is free.
+
 
         Current user:
         <User>
@@ -126,5 +277,7 @@ def create_calendar_agent() -> LlmAgent:
       """,
       tools=[
         list_calendar_events,
+        list_events_in_calendars,
+        get_busy_times,
       ]
     )
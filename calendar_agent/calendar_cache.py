@@ -0,0 +1,412 @@
+import asyncio
+import bisect
+import hashlib
+import heapq
+import itertools
+import logging
+import math
+import time
+
+from collections import Counter
+from collections.abc import Iterator
+from datetime import UTC, datetime
+from typing import Any
+
+import httpx
+
+from agent_common.bounded_store import LruIndex
+from calendar_client import CalendarClient, get_calendar_client
+from event_projection import EVENT_FIELDS
+
+
+logger = logging.getLogger(__name__)
+
+# New windows are widened to whole days and at least this many of them, so
+# that follow-up questions about nearby days are served from the cache.
+DEFAULT_WINDOW_DAYS = 7
+# Windows synced more recently than this are served without any API call
+DEFAULT_FRESH_SECONDS = 30.0
+DEFAULT_IDLE_TTL_SECONDS = 3600.0
+DEFAULT_MAX_CALENDARS = 1000
+# Synced windows kept per calendar, the least recently synced are dropped
+MAX_WINDOWS_PER_CALENDAR = 8
+# Calendars synced at once by a multi-calendar query
+DEFAULT_MAX_CONCURRENT_CALENDARS = 8
+# Events fields the cache itself relies on
+REQUIRED_FIELDS = ('id', 'status', 'start', 'end')
+
+_DAY_SECONDS = 24 * 3600
+# Responses after which the cached events must not be served to the token
+_DENIED = (
+    httpx.codes.UNAUTHORIZED,
+    httpx.codes.FORBIDDEN,
+    httpx.codes.NOT_FOUND,
+)
+
+
+def parse_time(value: str | dict[str, str]) -> float:
+    """Parses an RFC3339 time, or an event start/end, to a POSIX timestamp.
+
+    Times without an offset and all-day dates are taken as UTC.
+    """
+    if isinstance(value, dict):
+        value = value.get('dateTime') or value['date']
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=UTC)
+    return parsed.timestamp()
+
+
+def format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, UTC).isoformat().replace('+00:00', 'Z')
+
+
+def _token_key(access_token: str) -> str:
+    """Identifies an access token without keeping the token itself."""
+    return hashlib.sha256(access_token.encode()).hexdigest()[:32]
+
+
+class IntervalIndex:
+    """Events indexed by their [start, end) interval, ordered by start time.
+
+    Overlap queries bisect the start times. Events that start before the
+    queried window are found by looking back by the longest event duration,
+    which is recomputed from the count of each duration when the longest
+    event goes away.
+    """
+
+    def __init__(self):
+        self._events: dict[str, dict[str, Any]] = {}
+        self._spans: dict[str, tuple[float, float]] = {}
+        self._starts: list[tuple[float, str]] = []
+        self._durations: Counter[float] = Counter()
+        self._max_duration = 0.0
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def upsert(self, event: dict[str, Any]) -> None:
+        self.remove(event['id'])
+        start, end = parse_time(event['start']), parse_time(event['end'])
+        self._events[event['id']] = event
+        self._spans[event['id']] = (start, end)
+        bisect.insort(self._starts, (start, event['id']))
+        self._durations[end - start] += 1
+        self._max_duration = max(self._max_duration, end - start)
+
+    def remove(self, event_id: str) -> None:
+        span = self._spans.pop(event_id, None)
+        if span is None:
+            return
+        del self._events[event_id]
+        del self._starts[bisect.bisect_left(self._starts, (span[0], event_id))]
+        duration = span[1] - span[0]
+        self._durations[duration] -= 1
+        if not self._durations[duration]:
+            del self._durations[duration]
+            if duration == self._max_duration:
+                self._max_duration = max(self._durations, default=0.0)
+
+    def overlapping(self, start: float, end: float) -> Iterator[dict[str, Any]]:
+        """Yields the events that intersect [start, end) by start time."""
+        low = bisect.bisect_left(self._starts, (start - self._max_duration,))
+        high = bisect.bisect_left(self._starts, (end,))
+        for _, event_id in self._starts[low:high]:
+            if self._spans[event_id][1] > start:
+                yield self._events[event_id]
+
+
+class _SyncedWindow:
+    def __init__(self, start: float, end: float):
+        self.start = start
+        self.end = end
+        self.sync_token: str | None = None
+        self.etag: str | None = None
+        self.synced_at = 0.0
+
+    def covers(self, start: float, end: float) -> bool:
+        return self.start <= start and end <= self.end
+
+
+class _CalendarState:
+    def __init__(self):
+        self.index = IntervalIndex()
+        self.windows: list[_SyncedWindow] = []
+        self.lock = asyncio.Lock()
+        # The access token the calendar was last synced with
+        self.token_key: str | None = None
+
+
+class CalendarSyncCache:
+    """Per user and calendar event cache kept up to date by incremental sync.
+
+    The first query of a time window fetches the whole (widened) window and
+    keeps the Calendar API's sync token for it. Later queries inside any
+    synced window are answered from an interval index, after fetching only
+    the changes since the last sync with that token, conditionally on the
+    ETag of the previous response. Windows synced less than `fresh_for`
+    seconds ago are served without any call at all.
+
+    Calendars are cached by user, the authenticated subject, so that they
+    outlive the user's access tokens. The events cached with another token
+    are only served again after a sync with the new one succeeded: a token
+    that may not read the calendar drops it from the cache.
+
+    Calendars are evicted when idle or over `max_calendars`, as the other
+    bounded stores are.
+    """
+
+    def __init__(
+        self,
+        client: CalendarClient | None = None,
+        fields: str | None = None,
+        window_days: int = DEFAULT_WINDOW_DAYS,
+        fresh_for: float = DEFAULT_FRESH_SECONDS,
+        idle_ttl: float = DEFAULT_IDLE_TTL_SECONDS,
+        max_calendars: int = DEFAULT_MAX_CALENDARS,
+    ):
+        self._client = client
+        if fields:
+            missing = [f for f in REQUIRED_FIELDS if f not in fields.split(',')]
+            fields = ','.join([fields, *missing])
+        self.fields = fields
+        self.window_days = window_days
+        self.fresh_for = fresh_for
+        self._calendars: dict[tuple[str, str], _CalendarState] = {}
+        self._lru = LruIndex('calendar_cache', idle_ttl, max_calendars)
+        self.full_syncs = 0
+        self.delta_syncs = 0
+        self.local_hits = 0
+
+    @property
+    def client(self) -> CalendarClient:
+        return self._client or get_calendar_client()
+
+    async def list_events(
+        self,
+        access_token: str,
+        user_key: str,
+        calendar_id: str = 'primary',
+        *,
+        time_min: str,
+        time_max: str,
+        limit: int,
+    ) -> list[dict[str, Any]]:
+        """Returns up to `limit` events of [time_min, time_max) by start time.
+
+        Raises:
+            httpx.HTTPStatusError: If the API responds with an error.
+        """
+        start, end = parse_time(time_min), parse_time(time_max)
+        calendar = await self.sync(
+            access_token, user_key, calendar_id, start=start, end=end
+        )
+        return list(itertools.islice(calendar.index.overlapping(start, end), limit))
+
+    async def list_events_in_calendars(
+        self,
+        access_token: str,
+        user_key: str,
+        calendar_ids: list[str],
+        *,
+        time_min: str,
+        time_max: str,
+        limit: int,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENT_CALENDARS,
+    ) -> tuple[list[dict[str, Any]], dict[str, httpx.HTTPError]]:
+        """Returns up to `limit` events of several calendars by start time.
+
+        The calendars are synced concurrently, at most `max_concurrency` at
+        a time, and their events merged lazily, so that merging stops once
+        `limit` events are found. Every calendar is synced regardless of
+        `limit`, as any of them may hold the earliest events; the syncs are
+        cheap after the first one, being deltas or local hits. Each event is
+        tagged with its calendarId; events shared by several of the
+        calendars are returned once.
+
+        Returns:
+            The events, and the error of each calendar that failed to sync.
+        """
+        calendar_ids = list(dict.fromkeys(calendar_ids))
+        start, end = parse_time(time_min), parse_time(time_max)
+        slots = asyncio.Semaphore(max_concurrency)
+
+        async def sync_one(calendar_id: str) -> _CalendarState:
+            async with slots:
+                return await self.sync(
+                    access_token, user_key, calendar_id, start=start, end=end
+                )
+
+        results = await asyncio.gather(
+            *(sync_one(calendar_id) for calendar_id in calendar_ids),
+            return_exceptions=True,
+        )
+        streams = []
+        errors = {}
+        for calendar_id, result in zip(calendar_ids, results):
+            if isinstance(result, httpx.HTTPError):
+                errors[calendar_id] = result
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                streams.append(_by_start(calendar_id, result, start, end))
+        events = []
+        seen = set()
+        for _, event_id, calendar_id, event in heapq.merge(*streams):
+            if event_id in seen:
+                continue
+            seen.add(event_id)
+            events.append({**event, 'calendarId': calendar_id})
+            if len(events) >= limit:
+                break
+        return events, errors
+
+    async def sync(
+        self,
+        access_token: str,
+        user_key: str,
+        calendar_id: str,
+        *,
+        start: float,
+        end: float,
+    ) -> _CalendarState:
+        """Makes sure that [start, end) of a calendar is cached and current.
+
+        Args:
+            access_token: The OAuth2 access token of the user.
+            user_key: The user, the subject of the token, that the calendar
+                is cached for.
+            calendar_id: The calendar to sync.
+            start: The start of the window, a POSIX timestamp.
+            end: The end of the window, a POSIX timestamp.
+
+        Raises:
+            httpx.HTTPStatusError: If the API responds with an error.
+        """
+        key = (user_key, calendar_id)
+        for evicted in self._lru.evict():
+            self._calendars.pop(evicted, None)
+        calendar = self._calendars.setdefault(key, _CalendarState())
+        self._lru.touch(key)
+        token_key = _token_key(access_token)
+        # Concurrent queries of one calendar share a single sync.
+        async with calendar.lock:
+            window = next((w for w in calendar.windows if w.covers(start, end)), None)
+            try:
+                if window is None:
+                    await self._full_sync(
+                        access_token, calendar_id, calendar, start, end
+                    )
+                elif (
+                    calendar.token_key != token_key
+                    or time.monotonic() - window.synced_at >= self.fresh_for
+                ):
+                    await self._delta_sync(access_token, calendar_id, calendar, window)
+                else:
+                    self.local_hits += 1
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code in _DENIED and (
+                    self._calendars.get(key) is calendar
+                ):
+                    del self._calendars[key]
+                    self._lru.discard(key)
+                raise
+            calendar.token_key = token_key
+        return calendar
+
+    async def _full_sync(
+        self,
+        access_token: str,
+        calendar_id: str,
+        calendar: _CalendarState,
+        start: float,
+        end: float,
+        window: _SyncedWindow | None = None,
+    ) -> None:
+        if window is None:
+            day_start = math.floor(start / _DAY_SECONDS) * _DAY_SECONDS
+            day_end = math.ceil(end / _DAY_SECONDS) * _DAY_SECONDS
+            window = _SyncedWindow(
+                day_start,
+                max(day_end, day_start + self.window_days * _DAY_SECONDS),
+            )
+            calendar.windows.append(window)
+            if len(calendar.windows) > MAX_WINDOWS_PER_CALENDAR:
+                calendar.windows.remove(
+                    min(calendar.windows, key=lambda w: w.synced_at)
+                )
+        self.full_syncs += 1
+        events, window.sync_token, window.etag = await self.client.sync_events(
+            access_token,
+            calendar_id,
+            time_min=format_time(window.start),
+            time_max=format_time(window.end),
+            fields=self.fields,
+        )
+        window.synced_at = time.monotonic()
+        # Events of the window that are gone were deleted while unsynced.
+        fetched = {event['id'] for event in events}
+        for event in list(calendar.index.overlapping(window.start, window.end)):
+            if event['id'] not in fetched:
+                calendar.index.remove(event['id'])
+        self._apply(calendar, events)
+
+    async def _delta_sync(
+        self,
+        access_token: str,
+        calendar_id: str,
+        calendar: _CalendarState,
+        window: _SyncedWindow,
+    ) -> None:
+        if window.sync_token is None:
+            await self._full_sync(
+                access_token, calendar_id, calendar, window.start, window.end, window
+            )
+            return
+        self.delta_syncs += 1
+        try:
+            result = await self.client.sync_events(
+                access_token,
+                calendar_id,
+                sync_token=window.sync_token,
+                fields=self.fields,
+                etag=window.etag,
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != httpx.codes.GONE:
+                raise
+            logger.info('Sync token of %s expired, syncing it again', calendar_id)
+            await self._full_sync(
+                access_token, calendar_id, calendar, window.start, window.end, window
+            )
+            return
+        window.synced_at = time.monotonic()
+        if result is None:
+            return
+        events, window.sync_token, window.etag = result
+        self._apply(calendar, events)
+
+    def _apply(self, calendar: _CalendarState, events: list[dict[str, Any]]) -> None:
+        for event in events:
+            if event.get('status') == 'cancelled':
+                calendar.index.remove(event['id'])
+            elif 'start' in event and 'end' in event:
+                calendar.index.upsert(event)
+
+
+def _by_start(
+    calendar_id: str, calendar: _CalendarState, start: float, end: float
+) -> Iterator[tuple[float, str, str, dict[str, Any]]]:
+    for event in calendar.index.overlapping(start, end):
+        yield parse_time(event['start']), event['id'], calendar_id, event
+
+
+_calendar_cache: CalendarSyncCache | None = None
+
+
+def get_calendar_cache() -> CalendarSyncCache:
+    """Returns the process wide calendar cache."""
+    global _calendar_cache
+    if _calendar_cache is None:
+        _calendar_cache = CalendarSyncCache(fields=EVENT_FIELDS)
+    return _calendar_cache
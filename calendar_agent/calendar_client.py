@@ -0,0 +1,261 @@
+import asyncio
+import importlib.util
+import logging
+import os
+
+from collections.abc import AsyncIterator
+from typing import Any
+from urllib.parse import quote
+
+import httpx
+
+
+logger = logging.getLogger(__name__)
+
+# Overridable with GOOGLE_CALENDAR_API_URL, e.g. to use fake_calendar_api.py
+CALENDAR_API_URL = 'https://www.googleapis.com/calendar/v3'
+# The Calendar API returns at most 2500 events per page
+MAX_PAGE_SIZE = 2500
+DEFAULT_TIMEOUT_SECONDS = 10.0
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+# freeBusy accepts at most 50 calendars per query
+MAX_FREE_BUSY_CALENDARS = 50
+
+# HTTP/2 multiplexes concurrent requests over one connection. It needs the
+# `h2` package that the `httpx[http2]` dependency installs; the client falls
+# back to HTTP/1.1 where it is missing.
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+
+
+class CalendarClient:
+    """An async Google Calendar API client on a shared keep-alive pool.
+
+    One client serves every user; the access token is passed per call.
+    `client`, if given, is used instead of the pool, with its own base URL.
+    """
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        client: httpx.AsyncClient | None = None,
+    ):
+        self._client = client or httpx.AsyncClient(
+            base_url=base_url
+            or os.getenv('GOOGLE_CALENDAR_API_URL', CALENDAR_API_URL),
+            http2=HTTP2_AVAILABLE,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+
+    async def iter_events(
+        self,
+        access_token: str,
+        calendar_id: str = 'primary',
+        *,
+        time_min: str,
+        time_max: str,
+        limit: int,
+        fields: str | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Yields the events of a calendar in start time order.
+
+        Pages are requested as needed and no more than `limit` events are
+        fetched. Recurring events are expanded into their instances.
+
+        Args:
+            access_token: The OAuth2 access token of the user.
+            calendar_id: The calendar to read, "primary" by default.
+            time_min: Lower bound (exclusive) of the event end times, RFC3339.
+            time_max: Upper bound (exclusive) of the event start times, RFC3339.
+            limit: The maximum number of events to yield.
+            fields: A partial response selector applied to each event, e.g.
+                "id,summary,start,end", to download only those fields.
+
+        Raises:
+            httpx.HTTPStatusError: If the API responds with an error.
+        """
+        params: dict[str, Any] = {
+            'timeMin': time_min,
+            'timeMax': time_max,
+            'singleEvents': 'true',
+            'orderBy': 'startTime',
+        }
+        if fields:
+            params['fields'] = f'nextPageToken,items({fields})'
+        path = f'/calendars/{quote(calendar_id, safe="")}/events'
+        headers = {'Authorization': f'Bearer {access_token}'}
+        remaining = limit
+        while remaining > 0:
+            params['maxResults'] = min(remaining, MAX_PAGE_SIZE)
+            response = await self._client.get(path, params=params, headers=headers)
+            response.raise_for_status()
+            page = response.json()
+            for event in page.get('items', [])[:remaining]:
+                remaining -= 1
+                yield event
+            params['pageToken'] = page.get('nextPageToken')
+            if not params['pageToken']:
+                return
+
+    async def list_events(
+        self,
+        access_token: str,
+        calendar_id: str = 'primary',
+        *,
+        time_min: str,
+        time_max: str,
+        limit: int,
+        fields: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Returns up to `limit` events of a calendar, see `iter_events`."""
+        return [
+            event
+            async for event in self.iter_events(
+                access_token,
+                calendar_id,
+                time_min=time_min,
+                time_max=time_max,
+                limit=limit,
+                fields=fields,
+            )
+        ]
+
+    async def sync_events(
+        self,
+        access_token: str,
+        calendar_id: str = 'primary',
+        *,
+        sync_token: str | None = None,
+        time_min: str | None = None,
+        time_max: str | None = None,
+        fields: str | None = None,
+        etag: str | None = None,
+    ) -> tuple[list[dict[str, Any]], str | None, str | None] | None:
+        """Runs a full or an incremental sync of a calendar.
+
+        Without `sync_token`, all events of the time window are fetched. With
+        it, only the events changed since the sync that returned the token
+        are, including deleted ones (status "cancelled"). Recurring events
+        are expanded into their instances either way.
+
+        Args:
+            access_token: The OAuth2 access token of the user.
+            calendar_id: The calendar to sync.
+            sync_token: The token of the previous sync, if any.
+            time_min: Lower bound of a full sync, RFC3339.
+            time_max: Upper bound of a full sync, RFC3339.
+            fields: A partial response selector applied to each event.
+            etag: The ETag of the previous response, to skip unchanged data.
+
+        Returns:
+            The events, the token for the next incremental sync and the ETag
+            of the response, or None if nothing changed since `etag`.
+
+        Raises:
+            httpx.HTTPStatusError: If the API responds with an error, with
+                status 410 if the sync token expired and a full sync is needed.
+        """
+        params: dict[str, Any] = {
+            'singleEvents': 'true',
+            'maxResults': MAX_PAGE_SIZE,
+        }
+        if sync_token:
+            params['syncToken'] = sync_token
+        else:
+            params['timeMin'] = time_min
+            params['timeMax'] = time_max
+        if fields:
+            params['fields'] = f'etag,nextPageToken,nextSyncToken,items({fields})'
+        path = f'/calendars/{quote(calendar_id, safe="")}/events'
+        headers = {'Authorization': f'Bearer {access_token}'}
+        if etag:
+            headers['If-None-Match'] = etag
+        events = []
+        while True:
+            response = await self._client.get(path, params=params, headers=headers)
+            if response.status_code == httpx.codes.NOT_MODIFIED:
+                return None
+            response.raise_for_status()
+            page = response.json()
+            events.extend(page.get('items', []))
+            params['pageToken'] = page.get('nextPageToken')
+            if not params['pageToken']:
+                response_etag = response.headers.get('etag', page.get('etag'))
+                return events, page.get('nextSyncToken'), response_etag
+            # The ETag only applies to the first page.
+            headers.pop('If-None-Match', None)
+
+    async def free_busy(
+        self,
+        access_token: str,
+        calendar_ids: list[str],
+        *,
+        time_min: str,
+        time_max: str,
+    ) -> dict[str, dict[str, Any]]:
+        """Returns the busy intervals of several calendars.
+
+        Calendars beyond the per-query limit of the API are queried
+        concurrently in further requests.
+
+        Returns:
+            The freeBusy result of each calendar: its "busy" intervals and,
+            if it could not be read, its "errors".
+
+        Raises:
+            httpx.HTTPStatusError: If the API responds with an error.
+        """
+        headers = {'Authorization': f'Bearer {access_token}'}
+
+        async def query(ids: list[str]) -> dict[str, dict[str, Any]]:
+            response = await self._client.post(
+                '/freeBusy',
+                json={
+                    'timeMin': time_min,
+                    'timeMax': time_max,
+                    'items': [{'id': calendar_id} for calendar_id in ids],
+                },
+                headers=headers,
+            )
+            response.raise_for_status()
+            return response.json().get('calendars', {})
+
+        results = await asyncio.gather(
+            *(
+                query(calendar_ids[i : i + MAX_FREE_BUSY_CALENDARS])
+                for i in range(0, len(calendar_ids), MAX_FREE_BUSY_CALENDARS)
+            )
+        )
+        return {
+            calendar_id: calendar
+            for result in results
+            for calendar_id, calendar in result.items()
+        }
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_calendar_client: CalendarClient | None = None
+
+
+def get_calendar_client() -> CalendarClient:
+    """Returns the process wide calendar client."""
+    global _calendar_client
+    if _calendar_client is None:
+        _calendar_client = CalendarClient()
+    return _calendar_client
+
+
+async def close_calendar_client() -> None:
+    """Closes the process wide calendar client, e.g. on server shutdown."""
+    global _calendar_client
+    if _calendar_client is not None:
+        await _calendar_client.aclose()
+        _calendar_client = None
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import time
+
+import httpx
+
+from calendar_cache import CalendarSyncCache, get_calendar_cache
+
+
+logger = logging.getLogger(__name__)
+
+# Days ahead of now that are synced as soon as a new token arrives
+DEFAULT_PREFETCH_DAYS = 7
+# Prefetches running at once, the others wait for a slot
+DEFAULT_MAX_CONCURRENT_PREFETCHES = 8
+
+_DAY_SECONDS = 24 * 3600
+
+
+class CalendarPrefetcher:
+    """Warms the calendar cache in the background for new access tokens.
+
+    A prefetch syncs the next `days` of the user's primary calendar, so that
+    the first list_calendar_events call of a session is served locally
+    instead of waiting for the Calendar API. At most one prefetch runs per
+    session: a newer token replaces the running one, and `cancel` stops it
+    when the session goes away.
+    """
+
+    def __init__(
+        self,
+        cache: CalendarSyncCache | None = None,
+        days: int = DEFAULT_PREFETCH_DAYS,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENT_PREFETCHES,
+    ):
+        self._cache = cache
+        self.days = days
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._tasks: dict[tuple[str, str], asyncio.Task] = {}
+
+    @property
+    def cache(self) -> CalendarSyncCache:
+        return self._cache or get_calendar_cache()
+
+    def prefetch(self, user_id: str, session_id: str, access_token: str) -> None:
+        """Starts syncing the upcoming events of a token, without waiting."""
+        if self.days <= 0:
+            return
+        self.cancel(user_id, session_id)
+        key = (user_id, session_id)
+        task = asyncio.create_task(self._prefetch(user_id, access_token))
+        self._tasks[key] = task
+
+        def forget(done: asyncio.Task) -> None:
+            if self._tasks.get(key) is done:
+                del self._tasks[key]
+
+        task.add_done_callback(forget)
+
+    def cancel(self, user_id: str, session_id: str) -> None:
+        task = self._tasks.pop((user_id, session_id), None)
+        if task is not None:
+            task.cancel()
+
+    async def close(self) -> None:
+        """Cancels every running prefetch, e.g. on server shutdown."""
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _prefetch(self, user_id: str, access_token: str) -> None:
+        async with self._slots:
+            start = time.time()
+            try:
+                await self.cache.sync(
+                    access_token,
+                    user_id,
+                    'primary',
+                    start=start,
+                    end=start + self.days * _DAY_SECONDS,
+                )
+            except httpx.HTTPError as e:
+                # The tool call reports errors to the user, if it is made.
+                logger.debug('Calendar prefetch failed: %s', e)
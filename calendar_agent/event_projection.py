@@ -0,0 +1,31 @@
+from typing import Any
+
+
+# The event fields requested from the Calendar API: what project_event
+# needs, plus what the calendar cache relies on. Attendee emails are the
+# smallest selection that still allows counting them.
+EVENT_FIELDS = 'id,status,summary,start,end,location,attendees(email)'
+
+
+def _event_time(value: dict[str, str] | None) -> str | None:
+    if not value:
+        return None
+    return value.get('dateTime') or value.get('date')
+
+
+def project_event(event: dict[str, Any]) -> dict[str, Any]:
+    """Reduces a Calendar API event to the compact form given to the model.
+
+    Only the title, start, end, location, number of attendees and status
+    are kept; empty values are left out.
+    """
+    compact = {
+        'title': event.get('summary'),
+        'start': _event_time(event.get('start')),
+        'end': _event_time(event.get('end')),
+        'location': event.get('location'),
+        'attendees': len(event.get('attendees', [])),
+        'status': event.get('status'),
+        'calendarId': event.get('calendarId'),
+    }
+    return {key: value for key, value in compact.items() if value}
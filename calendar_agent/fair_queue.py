@@ -0,0 +1,109 @@
+import asyncio
+import heapq
+import itertools
+import math
+
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+
+# Agent executions running at once, the others wait in the fair queue
+DEFAULT_MAX_CONCURRENT_EXECUTIONS = 16
+# Users whose finish times are kept before the stale ones are dropped
+MAX_TRACKED_USERS = 10_000
+
+
+def parse_weights(spec: str | None) -> dict[str, float]:
+    """Parses "alice=2,bob=0.5" into a map of token subjects to weights.
+
+    Raises:
+        ValueError: If a weight is not a positive number, as a user of
+            weight 0 or less would never wait behind anyone.
+    """
+    weights = {}
+    for item in (spec or '').split(','):
+        if item.strip():
+            user, _, weight = item.rpartition('=')
+            user, weight = user.strip(), float(weight)
+            if not 0 < weight < math.inf:
+                raise ValueError(f'Weight of "{user}" must be a positive number')
+            weights[user] = weight
+    return weights
+
+
+class FairQueue:
+    """Admits at most `max_concurrent` executions, fairly between users.
+
+    When all slots are taken, waiting executions are started in weighted
+    fair queuing order: every execution gets a virtual finish time of
+    max(virtual clock, its user's previous finish time) + 1 / weight, and
+    the earliest finishes first. A user with many queued executions thus
+    only delays their own, while a user with weight 2 gets twice the
+    share of one with weight 1.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT_EXECUTIONS,
+        weights: dict[str, float] | None = None,
+    ):
+        self.max_concurrent = max_concurrent
+        self.weights = weights or {}
+        self.running = 0
+        self._virtual_time = 0.0
+        self._last_finish: dict[str, float] = {}
+        # (finish time, sequence, user, future) of the waiting executions
+        self._waiting: list[tuple[float, int, str, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self, user: str) -> AsyncIterator[None]:
+        """Waits for the turn of an execution of `user`, and holds a slot."""
+        finish = (
+            max(self._virtual_time, self._last_finish.get(user, 0.0))
+            + 1 / self.weights.get(user, 1.0)
+        )
+        self._last_finish[user] = finish
+        if self.max_concurrent and (
+            self.running >= self.max_concurrent or self._waiting
+        ):
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(
+                self._waiting, (finish, next(self._sequence), user, future)
+            )
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # The slot was handed over just as we were cancelled.
+                    self._release()
+                raise
+        else:
+            self.running += 1
+            self._virtual_time = finish
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        self.running -= 1
+        while self._waiting:
+            finish, _, _, future = heapq.heappop(self._waiting)
+            if future.done():
+                continue
+            self.running += 1
+            self._virtual_time = finish
+            future.set_result(None)
+            break
+        if not self._waiting and not self.running:
+            # Idle: no finish time matters any more.
+            self._last_finish.clear()
+            self._virtual_time = 0.0
+        elif len(self._last_finish) > MAX_TRACKED_USERS:
+            # Finish times in the past count as much as none at all.
+            self._last_finish = {
+                user: finish
+                for user, finish in self._last_finish.items()
+                if finish > self._virtual_time
+            }
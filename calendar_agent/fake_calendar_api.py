@@ -0,0 +1,307 @@
+"""A local fake of the Google Calendar API events endpoints.
+
+Serves events.list (time windows, pagination, partial responses, sync
+tokens and ETags), events.insert, events.patch, events.delete and freeBusy
+from memory, plus /_stats with counters of the list calls, so that the calendar
+agent can be run and measured without a Google account:
+
+    uv run fake_calendar_api.py --seed 200 --calendar primary --calendar team
+    GOOGLE_CALENDAR_API_URL=http://localhost:8089/calendar/v3 uv run .
+
+Any bearer token is accepted. Recurring events are not supported.
+"""
+
+import hashlib
+import random
+import re
+import uuid
+
+from collections import Counter
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import click
+import uvicorn
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+
+DEFAULT_HOST = 'localhost'
+DEFAULT_PORT = 8089
+DEFAULT_PAGE_SIZE = 250
+API_PREFIX = '/calendar/v3'
+
+
+def _parse_time(value: dict[str, str] | str) -> datetime:
+    if isinstance(value, dict):
+        value = value.get('dateTime') or value['date']
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)
+
+
+def _select_fields(item: dict[str, Any], fields: list[str]) -> dict[str, Any]:
+    return {field: item[field] for field in fields if field in item}
+
+
+class FakeCalendar:
+    """In-memory calendars with a change log for incremental sync.
+
+    Every change bumps a sequence number; a sync token is the sequence
+    number it was issued at, so an incremental list returns the events
+    changed after it, deleted ones included as "cancelled".
+    """
+
+    def __init__(self):
+        self.events: dict[str, dict[str, dict[str, Any]]] = {}
+        self.changed_at: dict[tuple[str, str], int] = {}
+        self.sequence = 0
+        self.stats: Counter[str] = Counter()
+
+    def put(self, calendar_id: str, event: dict[str, Any]) -> dict[str, Any]:
+        self.sequence += 1
+        event.setdefault('id', uuid.uuid4().hex)
+        event.setdefault('status', 'confirmed')
+        event['kind'] = 'calendar#event'
+        event['etag'] = f'"{self.sequence}"'
+        event['updated'] = datetime.now(UTC).isoformat()
+        self.events.setdefault(calendar_id, {})[event['id']] = event
+        self.changed_at[calendar_id, event['id']] = self.sequence
+        return event
+
+    def seed(self, calendar_id: str, count: int, days: int = 30) -> None:
+        now = datetime.now(UTC).replace(minute=0, second=0, microsecond=0)
+        rng = random.Random(f'{calendar_id}:{count}')
+        for i in range(count):
+            start = now + timedelta(hours=rng.randrange(-24, days * 24))
+            self.put(
+                calendar_id,
+                {
+                    'summary': f'Event {i}',
+                    'location': rng.choice(['', 'Room 1', 'Room 2', 'Online']),
+                    'start': {'dateTime': start.isoformat()},
+                    'end': {
+                        'dateTime': (
+                            start + timedelta(minutes=rng.choice([30, 60, 90]))
+                        ).isoformat()
+                    },
+                    'attendees': [
+                        {'email': f'guest{j}@example.com'}
+                        for j in range(rng.randrange(0, 5))
+                    ],
+                },
+            )
+
+    def list(self, calendar_id: str, params) -> tuple[dict[str, Any], bool]:
+        """Returns the events.list response and whether it was incremental."""
+        events = self.events.get(calendar_id, {})
+        sync_token = params.get('syncToken')
+        if sync_token is not None:
+            since = int(sync_token)
+            items = [
+                event
+                for event in events.values()
+                if self.changed_at[calendar_id, event['id']] > since
+            ]
+        else:
+            time_min = params.get('timeMin')
+            time_max = params.get('timeMax')
+            items = [
+                event
+                for event in events.values()
+                if event['status'] != 'cancelled'
+                and (not time_min or _parse_time(event['end']) > _parse_time(time_min))
+                and (
+                    not time_max or _parse_time(event['start']) < _parse_time(time_max)
+                )
+            ]
+        items.sort(key=lambda event: _parse_time(event['start']))
+        offset = int(params.get('pageToken') or 0)
+        page_size = int(params.get('maxResults') or DEFAULT_PAGE_SIZE)
+        page = items[offset : offset + page_size]
+        body: dict[str, Any] = {
+            'kind': 'calendar#events',
+            'summary': calendar_id,
+            'items': page,
+        }
+        if offset + page_size < len(items):
+            body['nextPageToken'] = str(offset + page_size)
+        else:
+            body['nextSyncToken'] = str(self.sequence)
+        return body, sync_token is not None
+
+
+def _apply_fields(body: dict[str, Any], fields: str | None) -> dict[str, Any]:
+    """Applies a `fields` selector such as `nextPageToken,items(id,start)`."""
+    if not fields:
+        return body
+    selected = {}
+    for name, sub in re.findall(r'(\w+)(?:\(([^)]*)\))?', fields):
+        if name not in body:
+            continue
+        if sub and name == 'items':
+            subfields = [f.split('(')[0] for f in sub.split(',')]
+            selected[name] = [_select_fields(item, subfields) for item in body[name]]
+        else:
+            selected[name] = body[name]
+    return selected
+
+
+def create_app(calendar: FakeCalendar | None = None) -> Starlette:
+    calendar = calendar or FakeCalendar()
+
+    def unauthorized(request: Request) -> Response | None:
+        if not request.headers.get('authorization', '').startswith('Bearer '):
+            return JSONResponse(
+                {'error': {'code': 401, 'message': 'Login Required.'}},
+                status_code=401,
+            )
+        return None
+
+    async def list_events(request: Request) -> Response:
+        if denied := unauthorized(request):
+            return denied
+        calendar_id = request.path_params['calendar_id']
+        if calendar_id not in calendar.events and calendar_id != 'primary':
+            return JSONResponse(
+                {'error': {'code': 404, 'message': 'Not Found'}}, status_code=404
+            )
+        params = request.query_params
+        sync_token = params.get('syncToken')
+        if sync_token is not None and (
+            not sync_token.isdigit() or int(sync_token) > calendar.sequence
+        ):
+            calendar.stats['gone'] += 1
+            return JSONResponse(
+                {'error': {'code': 410, 'message': 'Sync token is no longer valid.'}},
+                status_code=410,
+            )
+        body, incremental = calendar.list(calendar_id, params)
+        # The ETag identifies the whole response, so an unchanged delta is 304.
+        etag = '"{}"'.format(
+            hashlib.sha256(repr((sorted(params.multi_items()), body)).encode())
+            .hexdigest()[:16]
+        )
+        body['etag'] = etag
+        if request.headers.get('if-none-match') == etag:
+            calendar.stats['not_modified'] += 1
+            return Response(status_code=304, headers={'ETag': etag})
+        calendar.stats['delta' if incremental else 'full'] += 1
+        return JSONResponse(
+            _apply_fields(body, params.get('fields')), headers={'ETag': etag}
+        )
+
+    async def insert_event(request: Request) -> Response:
+        if denied := unauthorized(request):
+            return denied
+        event = await request.json()
+        event.pop('id', None)
+        return JSONResponse(calendar.put(request.path_params['calendar_id'], event))
+
+    async def patch_event(request: Request) -> Response:
+        if denied := unauthorized(request):
+            return denied
+        calendar_id = request.path_params['calendar_id']
+        event = calendar.events.get(calendar_id, {}).get(
+            request.path_params['event_id']
+        )
+        if event is None:
+            return JSONResponse({'error': {'code': 404}}, status_code=404)
+        event.update(await request.json())
+        return JSONResponse(calendar.put(calendar_id, event))
+
+    async def delete_event(request: Request) -> Response:
+        if denied := unauthorized(request):
+            return denied
+        calendar_id = request.path_params['calendar_id']
+        event = calendar.events.get(calendar_id, {}).get(
+            request.path_params['event_id']
+        )
+        if event is None:
+            return JSONResponse({'error': {'code': 404}}, status_code=404)
+        event['status'] = 'cancelled'
+        calendar.put(calendar_id, event)
+        return Response(status_code=204)
+
+    async def free_busy(request: Request) -> Response:
+        if denied := unauthorized(request):
+            return denied
+        query = await request.json()
+        time_min, time_max = query['timeMin'], query['timeMax']
+        calendars = {}
+        for item in query.get('items', []):
+            if item['id'] not in calendar.events:
+                calendars[item['id']] = {
+                    'busy': [],
+                    'errors': [{'domain': 'global', 'reason': 'notFound'}],
+                }
+                continue
+            body, _ = calendar.list(
+                item['id'],
+                {'timeMin': time_min, 'timeMax': time_max, 'maxResults': 2500},
+            )
+            calendars[item['id']] = {
+                'busy': [
+                    {
+                        'start': event['start'].get('dateTime'),
+                        'end': event['end'].get('dateTime'),
+                    }
+                    for event in body['items']
+                    if event['start'].get('dateTime')
+                ]
+            }
+        calendar.stats['free_busy'] += 1
+        return JSONResponse(
+            {
+                'kind': 'calendar#freeBusy',
+                'timeMin': time_min,
+                'timeMax': time_max,
+                'calendars': calendars,
+            }
+        )
+
+    async def stats(request: Request) -> Response:
+        return JSONResponse(dict(calendar.stats))
+
+    events_path = API_PREFIX + '/calendars/{calendar_id}/events'
+    app = Starlette(
+        routes=[
+            Route(events_path, list_events, methods=['GET']),
+            Route(events_path, insert_event, methods=['POST']),
+            Route(events_path + '/{event_id}', patch_event, methods=['PATCH']),
+            Route(events_path + '/{event_id}', delete_event, methods=['DELETE']),
+            Route(API_PREFIX + '/freeBusy', free_busy, methods=['POST']),
+            Route('/_stats', stats, methods=['GET']),
+        ]
+    )
+    app.state.calendar = calendar
+    return app
+
+
+@click.command()
+@click.option('--host', 'host', default=DEFAULT_HOST)
+@click.option('--port', 'port', default=DEFAULT_PORT)
+@click.option(
+    '--seed',
+    'seed',
+    default=0,
+    help='Number of random events to create in each calendar.',
+)
+@click.option(
+    '--calendar',
+    'calendar_ids',
+    multiple=True,
+    default=['primary'],
+    help='Calendar to create, may be given several times.',
+)
+def cli(host: str, port: int, seed: int, calendar_ids: tuple[str, ...]):
+    calendar = FakeCalendar()
+    for calendar_id in calendar_ids:
+        calendar.seed(calendar_id, seed)
+    uvicorn.run(create_app(calendar), host=host, port=port)
+
+
+if __name__ == '__main__':
+    cli()
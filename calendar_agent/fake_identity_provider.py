@@ -0,0 +1,142 @@
+"""A local fake OAuth2 identity provider for the calendar agent.
+
+Issues access tokens and validates them the three ways OAuth2Middleware
+can: Google-style tokeninfo, RFC 7662 introspection and a JWKS for JWT
+access tokens. /_stats counts the validation calls, e.g. to check that the
+agent caches them:
+
+    uv run fake_identity_provider.py
+    curl -d sub=alice -d scope=calendar localhost:8090/token
+    OAUTH2_TOKENINFO_URL=http://localhost:8090/tokeninfo uv run .
+
+With `-d format=jwt`, /token issues a signed JWT instead of an opaque
+token; validate those with OAUTH2_JWKS_URL=http://localhost:8090/jwks.json
+and OAUTH2_ISSUER=http://localhost:8090.
+
+With `-d sub=`, the token has neither a subject nor an email, as Google
+access tokens issued without the openid scope.
+"""
+
+import secrets
+import time
+
+from collections import Counter
+
+import click
+import uvicorn
+
+from authlib.jose import JsonWebKey, jwt
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+
+DEFAULT_HOST = 'localhost'
+DEFAULT_PORT = 8090
+DEFAULT_EXPIRES_IN = 3600
+KEY_ID = 'fake-idp-1'
+
+
+def create_app(issuer: str) -> Starlette:
+    key = JsonWebKey.generate_key(
+        'RSA', 2048, is_private=True, options={'kid': KEY_ID}
+    )
+    # Opaque access tokens and their claims
+    tokens: dict[str, dict] = {}
+    stats: Counter[str] = Counter()
+
+    def active_claims(token: str) -> dict | None:
+        claims = tokens.get(token)
+        if claims is None or claims['exp'] <= time.time():
+            return None
+        return claims
+
+    async def issue_token(request: Request) -> Response:
+        form = await request.form()
+        expires_in = int(form.get('expires_in', DEFAULT_EXPIRES_IN))
+        sub = form.get('sub', 'user')
+        claims = {
+            'iss': issuer,
+            'aud': form.get('aud', 'calendar-agent'),
+            'azp': form.get('aud', 'calendar-agent'),
+            'scope': form.get('scope', ''),
+            'exp': int(time.time()) + expires_in,
+        }
+        if sub:
+            claims['sub'] = sub
+            claims['email'] = f'{sub}@example.com'
+        if form.get('format') == 'jwt':
+            token = jwt.encode({'alg': 'RS256', 'kid': KEY_ID}, claims, key).decode()
+        else:
+            token = secrets.token_urlsafe(32)
+            tokens[token] = claims
+        return JSONResponse(
+            {
+                'access_token': token,
+                'token_type': 'Bearer',
+                'expires_in': expires_in,
+                'scope': claims['scope'],
+            }
+        )
+
+    async def revoke(request: Request) -> Response:
+        form = await request.form()
+        tokens.pop(form.get('token'), None)
+        return Response(status_code=200)
+
+    async def tokeninfo(request: Request) -> Response:
+        stats['tokeninfo'] += 1
+        claims = active_claims(request.query_params.get('access_token', ''))
+        if claims is None:
+            return JSONResponse(
+                {
+                    'error': 'invalid_token',
+                    'error_description': 'Invalid Value',
+                },
+                status_code=400,
+            )
+        return JSONResponse(
+            {
+                **claims,
+                'exp': str(claims['exp']),
+                'expires_in': str(claims['exp'] - int(time.time())),
+            }
+        )
+
+    async def introspect(request: Request) -> Response:
+        stats['introspect'] += 1
+        form = await request.form()
+        claims = active_claims(form.get('token', ''))
+        if claims is None:
+            return JSONResponse({'active': False})
+        return JSONResponse({'active': True, 'client_id': claims['aud'], **claims})
+
+    async def jwks(request: Request) -> Response:
+        stats['jwks'] += 1
+        return JSONResponse({'keys': [key.as_dict(is_private=False)]})
+
+    async def get_stats(request: Request) -> Response:
+        return JSONResponse(dict(stats))
+
+    return Starlette(
+        routes=[
+            Route('/token', issue_token, methods=['POST']),
+            Route('/revoke', revoke, methods=['POST']),
+            Route('/tokeninfo', tokeninfo, methods=['GET']),
+            Route('/introspect', introspect, methods=['POST']),
+            Route('/jwks.json', jwks, methods=['GET']),
+            Route('/_stats', get_stats, methods=['GET']),
+        ]
+    )
+
+
+@click.command()
+@click.option('--host', 'host', default=DEFAULT_HOST)
+@click.option('--port', 'port', default=DEFAULT_PORT)
+def cli(host: str, port: int):
+    uvicorn.run(create_app(f'http://{host}:{port}'), host=host, port=port)
+
+
+if __name__ == '__main__':
+    cli()
@@ -1,60 +1,432 @@
-import logging, json
+import asyncio
+import hashlib
+import logging
 import os
+import time
+
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
 from typing import Any
-from a2a.types import AgentCard
-from starlette.applications import Starlette
-from starlette.responses import JSONResponse, PlainTextResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+
+import httpx
+
+from a2a.auth.user import UnauthenticatedUser as A2AUnauthenticatedUser
+from a2a.auth.user import User as A2AUser
+from a2a.server.apps import CallContextBuilder
+from a2a.server.context import ServerCallContext
+from agent_common.bounded_store import LruIndex
+from starlette.authentication import (
+    AuthCredentials,
+    SimpleUser,
+    UnauthenticatedUser,
+)
+from starlette.datastructures import Headers
 from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
+GOOGLE_TOKENINFO_URL = 'https://oauth2.googleapis.com/tokeninfo'
+# The agent card and the metrics are served without a token
+DEFAULT_PUBLIC_PATHS = ('/.well-known/agent.json', '/metrics')
+# Validated tokens are trusted for this long at most, or until they expire
+DEFAULT_CACHE_TTL_SECONDS = 300.0
+DEFAULT_CACHE_MAX_ENTRIES = 10_000
+# Rejected tokens are remembered briefly, so retries do not hit the issuer
+INVALID_TOKEN_CACHE_SECONDS = 30.0
+DEFAULT_TIMEOUT_SECONDS = 10.0
+# A JWKS is fetched again after this long, or for an unknown key id
+JWKS_CACHE_SECONDS = 3600.0
+JWKS_MIN_REFRESH_SECONDS = 60.0
+
+
+class TokenValidationError(Exception):
+    """The bearer token is invalid, expired or was not issued for us."""
+
+
+class TokenValidator(ABC):
+    """Checks an access token with its issuer and returns its claims.
+
+    Claims use the JWT names where they exist: `sub`, `scope` (space
+    separated) and `exp` (POSIX seconds).
+    """
+
+    def __init__(self, client: httpx.AsyncClient | None = None):
+        self._client = client or httpx.AsyncClient(timeout=DEFAULT_TIMEOUT_SECONDS)
+
+    @abstractmethod
+    async def validate(self, token: str) -> dict[str, Any]:
+        """Returns the claims of a valid token.
+
+        Raises:
+            TokenValidationError: If the issuer rejects the token.
+            httpx.HTTPError: If the issuer could not be asked.
+        """
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+class TokenInfoValidator(TokenValidator):
+    """Validates Google access tokens with the tokeninfo endpoint."""
+
+    def __init__(
+        self,
+        url: str = GOOGLE_TOKENINFO_URL,
+        audience: str | None = None,
+        client: httpx.AsyncClient | None = None,
+    ):
+        super().__init__(client)
+        self.url = url
+        self.audience = audience
+
+    async def validate(self, token: str) -> dict[str, Any]:
+        response = await self._client.get(self.url, params={'access_token': token})
+        if response.status_code == httpx.codes.BAD_REQUEST:
+            raise TokenValidationError('invalid or expired token')
+        response.raise_for_status()
+        claims = response.json()
+        if self.audience and self.audience not in (
+            claims.get('aud'),
+            claims.get('azp'),
+        ):
+            raise TokenValidationError('token was issued for another client')
+        if 'exp' in claims:
+            claims['exp'] = int(claims['exp'])
+        return claims
+
+
+class IntrospectionValidator(TokenValidator):
+    """Validates access tokens with an RFC 7662 introspection endpoint."""
+
+    def __init__(
+        self,
+        url: str,
+        client_id: str | None = None,
+        client_secret: str | None = None,
+        client: httpx.AsyncClient | None = None,
+    ):
+        super().__init__(client)
+        self.url = url
+        self.auth = (client_id, client_secret or '') if client_id else None
+
+    async def validate(self, token: str) -> dict[str, Any]:
+        response = await self._client.post(
+            self.url,
+            data={'token': token, 'token_type_hint': 'access_token'},
+            auth=self.auth,
+        )
+        response.raise_for_status()
+        claims = response.json()
+        if not claims.get('active'):
+            raise TokenValidationError('token is not active')
+        return claims
+
+
+class JwksValidator(TokenValidator):
+    """Validates JWT access tokens locally with the issuer's signing keys.
+
+    The JSON Web Key Set is fetched once and cached; it is fetched again
+    when a token names a key that is not in it, e.g. after a key rotation.
+    """
+
+    def __init__(
+        self,
+        jwks_url: str,
+        issuer: str | None = None,
+        audience: str | None = None,
+        client: httpx.AsyncClient | None = None,
+    ):
+        # authlib is installed with google-adk.
+        from authlib.jose import JsonWebKey, jwt
+
+        super().__init__(client)
+        self.jwks_url = jwks_url
+        self._import_key_set = JsonWebKey.import_key_set
+        self._jwt = jwt
+        self._claims_options = {'exp': {'essential': True}}
+        if issuer:
+            self._claims_options['iss'] = {'essential': True, 'value': issuer}
+        if audience:
+            self._claims_options['aud'] = {'essential': True, 'value': audience}
+        self._key_set = None
+        self._fetched_at = 0.0
+        self._fetching = asyncio.Lock()
+
+    async def validate(self, token: str) -> dict[str, Any]:
+        from authlib.jose.errors import JoseError
+
+        key_set = await self._keys()
+        try:
+            try:
+                claims = self._jwt.decode(
+                    token, key_set, claims_options=self._claims_options
+                )
+            except ValueError:
+                # An unknown key id: the issuer may have rotated its keys.
+                key_set = await self._keys(refresh=True)
+                claims = self._jwt.decode(
+                    token, key_set, claims_options=self._claims_options
+                )
+            claims.validate()
+        except (JoseError, ValueError) as e:
+            raise TokenValidationError(str(e)) from e
+        return dict(claims)
+
+    async def _keys(self, refresh: bool = False):
+        async with self._fetching:
+            age = time.monotonic() - self._fetched_at
+            if (
+                self._key_set is None
+                or age > JWKS_CACHE_SECONDS
+                or (refresh and age > JWKS_MIN_REFRESH_SECONDS)
+            ):
+                response = await self._client.get(self.jwks_url)
+                response.raise_for_status()
+                self._key_set = self._import_key_set(response.json())
+                self._fetched_at = time.monotonic()
+            return self._key_set
+
+
+def validator_from_env() -> TokenValidator:
+    """Builds the token validator configured by the OAUTH2_* variables.
+
+    OAUTH2_JWKS_URL selects local JWT validation, OAUTH2_INTROSPECTION_URL
+    token introspection; otherwise tokens are checked with OAUTH2_TOKENINFO_URL,
+    Google's tokeninfo endpoint by default.
+    """
+    audience = os.getenv('OAUTH2_AUDIENCE')
+    if jwks_url := os.getenv('OAUTH2_JWKS_URL'):
+        return JwksValidator(jwks_url, os.getenv('OAUTH2_ISSUER'), audience)
+    if introspection_url := os.getenv('OAUTH2_INTROSPECTION_URL'):
+        return IntrospectionValidator(
+            introspection_url,
+            os.getenv('OAUTH2_CLIENT_ID'),
+            os.getenv('OAUTH2_CLIENT_SECRET'),
+        )
+    return TokenInfoValidator(
+        os.getenv('OAUTH2_TOKENINFO_URL', GOOGLE_TOKENINFO_URL), audience
+    )
+
+
+def token_key(token: str) -> str:
+    """The key of a token in caches, which never hold the token itself."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class OAuth2User(SimpleUser):
+    """The user of a validated bearer token.
+
+    `identity` is the subject of the token, what per-user state is keyed
+    on. Tokens without one, e.g. Google access tokens issued without the
+    openid scope, each get an identity of their own from the token key,
+    rather than all sharing an empty one.
+    """
+
+    def __init__(self, claims: dict[str, Any], key: str):
+        super().__init__(claims.get('email') or claims.get('sub') or '')
+        self.claims = claims
+        self._key = key
+
+    @property
+    def identity(self) -> str:
+        sub = self.claims.get('sub')
+        return sub if isinstance(sub, str) and sub else f'token:{self._key}'
+
+
+class _A2AOAuth2User(A2AUser):
+    def __init__(self, user: OAuth2User):
+        self._user = user
+
+    @property
+    def is_authenticated(self) -> bool:
+        return True
+
+    @property
+    def user_name(self) -> str:
+        return self._user.identity
 
-class OAuth2Middleware(BaseHTTPMiddleware):
-    """Starlette middleware that authenticates A2A access using an OAuth2 bearer token."""
-    def __init__(self, app: Starlette, agent_card: AgentCard = None, public_paths: list[str] = None):
-        super().__init__(app)
-        self.agent_card = agent_card
-        self.public_paths = set(public_paths or [])
 
-        # Use app state for this demonstration (simplicity)
-        self.a2a_auth = {}
+class OAuth2CallContextBuilder(CallContextBuilder):
+    """Builds A2A call contexts whose user name is the `OAuth2User.identity`.
 
-    
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path
+    Otherwise the same as the default builder, which uses the display name,
+    an email address that tokens need not have.
+    """
 
-        # TODO: Additional token validation and authorization to be done here
-        auth_header = request.headers.get('Authorization')
-        if not auth_header:
-            logger.debug(f'No access token yet')
-            return await call_next(request)
+    def build(self, request: Request) -> ServerCallContext:
+        user = request.scope.get('user')
+        state = {'headers': dict(request.headers)}
+        if 'auth' in request.scope:
+            state['auth'] = request.auth
+        return ServerCallContext(
+            user=(
+                _A2AOAuth2User(user)
+                if isinstance(user, OAuth2User)
+                else A2AUnauthenticatedUser()
+            ),
+            state=state,
+        )
 
-        access_token = auth_header.split('Bearer ')[1]
 
+class _Validation:
+    def __init__(
+        self,
+        expires_at: float,
+        claims: dict[str, Any] | None = None,
+        error: str | None = None,
+    ):
+        self.expires_at = expires_at
+        self.claims = claims
+        self.error = error
+
+
+class OAuth2Middleware:
+    """ASGI middleware that authenticates A2A access using an OAuth2 bearer token.
+
+    Tokens are validated with the issuer once and the result is cached,
+    keyed by a hash of the token, for `cache_ttl` seconds or until the token
+    expires, so later requests cost a dictionary lookup. Concurrent first
+    requests with one token share a single validation. Requests to
+    `public_paths` are passed through as anonymous, without looking at their
+    headers.
+
+    Authenticated requests carry an `OAuth2User` in `scope['user']` and the
+    token scopes in `scope['auth']`, as Starlette's AuthenticationMiddleware
+    sets them. `OAuth2CallContextBuilder` passes them on to the A2A call
+    context.
+
+    Unlike a BaseHTTPMiddleware, the request, and any SSE response, is passed
+    through as is, without extra tasks or queues.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        validator: TokenValidator | None = None,
+        public_paths: Iterable[str] = DEFAULT_PUBLIC_PATHS,
+        required_scopes: Iterable[str] = (),
+        cache_ttl: float = DEFAULT_CACHE_TTL_SECONDS,
+        cache_max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+    ):
+        self.app = app
+        self.validator = validator or validator_from_env()
+        self.public_paths = frozenset(public_paths)
+        self.required_scopes = frozenset(required_scopes)
+        self.cache_ttl = cache_ttl
+        self._validations: dict[str, _Validation] = {}
+        self._index = LruIndex('auth_tokens', cache_ttl, cache_max_entries)
+        self._pending: dict[str, asyncio.Future] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        if scope['path'] in self.public_paths:
+            scope['user'] = UnauthenticatedUser()
+            scope['auth'] = AuthCredentials()
+            await self.app(scope, receive, send)
+            return
+
+        authorization = Headers(scope=scope).get('authorization', '')
+        scheme, _, token = authorization.partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            await self._unauthorized('missing bearer token', scope)(
+                scope, receive, send
+            )
+            return
+
+        key = token_key(token)
         try:
-            logger.debug(f'access token received: {access_token}')
+            claims = await self.authenticate(token, key)
+        except TokenValidationError as e:
+            await self._unauthorized(str(e), scope)(scope, receive, send)
+            return
+        except httpx.HTTPError as e:
+            logger.warning('Token validation failed: %s', e)
+            await JSONResponse(
+                {'error': 'authorization server unavailable'}, status_code=503
+            )(scope, receive, send)
+            return
+
+        scopes = claims.get('scope', '').split()
+        if not self.required_scopes.issubset(scopes):
+            await self._forbidden('insufficient scope', scope)(scope, receive, send)
+            return
+
+        scope['user'] = OAuth2User(claims, key)
+        scope['auth'] = AuthCredentials(scopes)
+        await self.app(scope, receive, send)
 
-        except Exception as e:
-            return self._forbidden(f'Authentication failed: {e}', request)
+    async def authenticate(
+        self, token: str, key: str | None = None
+    ) -> dict[str, Any]:
+        """Returns the claims of a token, validating it if not cached.
+
+        Raises:
+            TokenValidationError: If the token is not valid.
+            httpx.HTTPError: If the issuer could not be asked.
+        """
+        key = key or token_key(token)
+        validation = self._validations.get(key)
+        if validation is not None and validation.expires_at > time.time():
+            self._index.touch(key)
+            if validation.error is not None:
+                raise TokenValidationError(validation.error)
+            return validation.claims
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._validate(key, token))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        # Shielded, so that a client going away does not fail the others.
+        return await asyncio.shield(pending)
+
+    async def _validate(self, key: str, token: str) -> dict[str, Any]:
+        now = time.time()
+        try:
+            claims = await self.validator.validate(token)
+        except TokenValidationError as e:
+            self._remember(
+                key, _Validation(now + INVALID_TOKEN_CACHE_SECONDS, error=str(e))
+            )
+            raise
+        expires_at = now + self.cache_ttl
+        if claims.get('exp'):
+            expires_at = min(expires_at, float(claims['exp']))
+        self._remember(key, _Validation(expires_at, claims=claims))
+        return claims
 
-        # Allow public paths and anonymous access
-        if path in self.public_paths or not self.a2a_auth:
-            return await call_next(request)
+    def _remember(self, key: str, validation: _Validation) -> None:
+        self._validations[key] = validation
+        self._index.touch(key)
+        for evicted in self._index.evict():
+            self._validations.pop(evicted, None)
 
-        return await call_next(request)
-    
-    
-    def _forbidden(self, reason: str, request: Request):
-        accept_header = request.headers.get('accept', '')
+    def _forbidden(self, reason: str, scope: Scope) -> Response:
+        accept_header = Headers(scope=scope).get('accept', '')
         if 'text/event-stream' in accept_header:
-            return PlainTextResponse(f'error forbidden: {reason}', status_code=403, media_type='text/event-stream')
-        return JSONResponse({ 'error': 'forbidden', 'reason': reason }, status_code=403)
+            return PlainTextResponse(
+                f'error forbidden: {reason}',
+                status_code=403,
+                media_type='text/event-stream',
+            )
+        return JSONResponse({'error': 'forbidden', 'reason': reason}, status_code=403)
 
-    
-    def _unauthorized(self, reason: str, request: Request):
-        accept_header = request.headers.get('accept', '')
+    def _unauthorized(self, reason: str, scope: Scope) -> Response:
+        headers = {'WWW-Authenticate': 'Bearer'}
+        accept_header = Headers(scope=scope).get('accept', '')
         if 'text/event-stream' in accept_header:
-            return PlainTextResponse(f'error unauthorized: {reason}', status_code=401, media_type='text/event-stream')
-        return JSONResponse({ 'error': 'unauthorized', 'reason': reason }, status_code=401)
\ No newline at end of file
+            return PlainTextResponse(
+                f'error unauthorized: {reason}',
+                status_code=401,
+                media_type='text/event-stream',
+                headers=headers,
+            )
+        return JSONResponse(
+            {'error': 'unauthorized', 'reason': reason},
+            status_code=401,
+            headers=headers,
+        )
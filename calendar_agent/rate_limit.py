@@ -0,0 +1,96 @@
+import json
+import math
+import time
+
+from agent_common.bounded_store import DEFAULT_MAX_ENTRIES, LruIndex
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+# Sustained requests per second per user, 0 for no limit
+DEFAULT_RATE_PER_SECOND = 2.0
+# Requests a user can make at once after being idle
+DEFAULT_BURST = 20
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets, refilled at `rate` per second up to `burst`.
+
+    Buckets are dropped once idle long enough to be full again, and the
+    least recently used ones beyond `max_keys`.
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE_PER_SECOND,
+        burst: int = DEFAULT_BURST,
+        max_keys: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.rate = rate
+        self.burst = burst
+        # Key -> (tokens, monotonic time of the last refill)
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._index = LruIndex('rate_limits', burst / rate, max_keys)
+
+    def acquire(self, key: str) -> float:
+        """Takes a token from the bucket of `key`.
+
+        Returns:
+            0 if a token was taken, otherwise the seconds until one is
+            available.
+        """
+        now = time.monotonic()
+        tokens, last = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            wait = 0.0
+        else:
+            self._buckets[key] = (tokens, now)
+            wait = (1 - tokens) / self.rate
+        self._index.touch(key)
+        for evicted in self._index.evict():
+            self._buckets.pop(evicted, None)
+        return wait
+
+
+class RateLimitMiddleware:
+    """ASGI middleware that rate limits requests per authenticated user.
+
+    Must run inside OAuth2Middleware, which sets `scope['user']`; users are
+    told apart by `OAuth2User.identity`, the token subject. Anonymous
+    requests, i.e. those to public paths, are not limited. Requests over
+    the limit get a 429 with a Retry-After header.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: TokenBucketLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        user = scope.get('user') if scope['type'] == 'http' else None
+        if user is None or not user.is_authenticated:
+            await self.app(scope, receive, send)
+            return
+        wait = self.limiter.acquire(user.identity)
+        if not wait:
+            await self.app(scope, receive, send)
+            return
+        retry_after = math.ceil(wait)
+        await send(
+            {
+                'type': 'http.response.start',
+                'status': 429,
+                'headers': [
+                    (b'content-type', b'application/json'),
+                    (b'retry-after', str(retry_after).encode()),
+                ],
+            }
+        )
+        await send(
+            {
+                'type': 'http.response.body',
+                'body': json.dumps(
+                    {'error': 'rate limited', 'retry_after': retry_after}
+                ).encode(),
+            }
+        )
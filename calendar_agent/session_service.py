@@ -0,0 +1,170 @@
+import asyncio
+
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from agent_common.bounded_adk_services import BoundedSessionService
+from google.adk.events import Event
+from google.adk.sessions import Session
+
+
+# Sessions kept per user, the user's least recently used are dropped first
+DEFAULT_PARTITION_MAX_SESSIONS = 100
+# Serialized event bytes kept per user, 0 for no limit
+DEFAULT_PARTITION_MAX_BYTES = 0
+
+
+class _Partition:
+    """The sessions of one user, in LRU order, with their sizes and locks."""
+
+    def __init__(self):
+        self.sizes: OrderedDict[str, int] = OrderedDict()
+        self.bytes = 0
+        self.locks: dict[str, asyncio.Lock] = {}
+
+    def touch(self, session_id: str, size: int | None = None) -> None:
+        previous = self.sizes.pop(session_id, 0)
+        size = previous if size is None else size
+        self.sizes[session_id] = size
+        self.bytes += size - previous
+
+    def discard(self, session_id: str) -> None:
+        self.bytes -= self.sizes.pop(session_id, 0)
+        lock = self.locks.get(session_id)
+        if lock is not None and not lock.locked():
+            del self.locks[session_id]
+
+
+class CalendarSessionService(BoundedSessionService):
+    """A bounded in-memory session service with a fused upsert-with-state-delta.
+
+    Sessions are partitioned by user, i.e. by the subject of the validated
+    token. Besides the limits shared by all users, each partition has its
+    own quota of sessions and bytes, so that one user reaching it only
+    evicts their own sessions, and its own per-session locks, so that
+    concurrent turns only ever wait for the same user's same session. All
+    lookups are dictionary lookups.
+
+    `on_session_removed(user_id, session_id)` is called for every session
+    that is deleted or evicted, to release whatever was started for it.
+    """
+
+    def __init__(
+        self,
+        *,
+        on_session_removed: Callable[[str, str], None] | None = None,
+        partition_max_sessions: int = DEFAULT_PARTITION_MAX_SESSIONS,
+        partition_max_bytes: int = DEFAULT_PARTITION_MAX_BYTES,
+        **limits: Any,
+    ):
+        super().__init__(**limits)
+        self._on_session_removed = on_session_removed
+        self.partition_max_sessions = partition_max_sessions
+        self.partition_max_bytes = partition_max_bytes
+        self._partitions: dict[tuple[str, str], _Partition] = {}
+
+    def session_lock(
+        self, app_name: str, user_id: str, session_id: str
+    ) -> asyncio.Lock:
+        """Returns the lock that serializes the turns of a session."""
+        partition = self._partitions.setdefault((app_name, user_id), _Partition())
+        return partition.locks.setdefault(session_id, asyncio.Lock())
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: dict[str, Any] | None = None,
+        session_id: str | None = None,
+    ) -> Session:
+        session = await super().create_session(
+            app_name=app_name,
+            user_id=user_id,
+            state=state,
+            session_id=session_id,
+        )
+        await self._touch_partition(app_name, user_id, session.id, size=0)
+        return session
+
+    async def get_session(
+        self, *, app_name: str, user_id: str, session_id: str, config=None
+    ) -> Session | None:
+        session = await super().get_session(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            config=config,
+        )
+        if session is not None:
+            await self._touch_partition(app_name, user_id, session_id)
+        return session
+
+    async def delete_session(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        await super().delete_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+        self._removed(app_name, user_id, session_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await super().append_event(session=session, event=event)
+        partition = self._partitions.get((session.app_name, session.user_id))
+        if partition and session.id in partition.sizes and not event.partial:
+            size = partition.sizes[session.id]
+            if self.partition_max_bytes:
+                size += len(event.model_dump_json(exclude_none=True))
+            await self._touch_partition(
+                session.app_name, session.user_id, session.id, size
+            )
+        return event
+
+    async def _touch_partition(
+        self, app_name: str, user_id: str, session_id: str, size: int | None = None
+    ) -> None:
+        partition = self._partitions.setdefault((app_name, user_id), _Partition())
+        partition.touch(session_id, size)
+        # Over quota, the user's own least recently used sessions go first.
+        while len(partition.sizes) > 1 and (
+            (
+                self.partition_max_sessions
+                and len(partition.sizes) > self.partition_max_sessions
+            )
+            or (
+                self.partition_max_bytes
+                and partition.bytes > self.partition_max_bytes
+            )
+        ):
+            await self.delete_session(
+                app_name=app_name,
+                user_id=user_id,
+                session_id=next(iter(partition.sizes)),
+            )
+
+    def _removed(self, app_name: str, user_id: str, session_id: str) -> None:
+        partition = self._partitions.get((app_name, user_id))
+        if partition is not None:
+            partition.discard(session_id)
+            if not partition.sizes and not partition.locks:
+                del self._partitions[app_name, user_id]
+        if self._on_session_removed:
+            self._on_session_removed(user_id, session_id)
+
+    async def upsert_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        state_delta: dict[str, Any],
+    ) -> tuple[str, bool]:
+        session_id, changed = await super().upsert_session(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            state_delta=state_delta,
+        )
+        await self._touch_partition(app_name, user_id, session_id)
+        return session_id, changed
@@ -0,0 +1 @@
+"""Server infrastructure shared by the A2A agents."""
@@ -0,0 +1,337 @@
+import hashlib
+import hmac
+import logging
+import mmap
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+
+from pathlib import Path
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+
+
+logger = logging.getLogger(__name__)
+
+# Inline payloads above this size are spilled to disk and passed by URI.
+DEFAULT_SPILL_THRESHOLD = 256 * 1024
+# Blobs not written or read for this long are deleted
+DEFAULT_TTL_SECONDS = 24 * 3600.0
+# The oldest blobs are deleted while the store is larger than this
+DEFAULT_MAX_BYTES = 1024**3
+# Garbage collection runs at most this often, after a write
+COLLECT_INTERVAL_SECONDS = 60.0
+# Route the blobs are served on by every agent
+ROUTE = '/blobs/{scope}/{digest}'
+
+_HEX = re.compile(r'^[0-9a-f]+$')
+# Key of the URL signatures, shared by the processes using one directory
+_SECRET_FILE = '.secret'
+_CHUNK_SIZE = 256 * 1024
+
+
+class BlobNotFoundError(ValueError):
+    """A blob URI that is unknown, expired or not part of the conversation."""
+
+
+def scope_for(context_id: str) -> str:
+    """The directory of the blobs of a conversation."""
+    return hashlib.sha256(context_id.encode()).hexdigest()[:32]
+
+
+class BlobStore:
+    """A local content-addressed store for large file part payloads.
+
+    Blobs are stored once per SHA-256 digest and conversation, and handed
+    to clients as `{base_url}blobs/{scope}/{digest}?expires=...&sig=...`
+    URLs served by `blob_endpoint`, so tasks and sessions only keep a short
+    reference instead of the base64 encoded payload. The route does not
+    authenticate the caller; instead a URL is signed with the store secret
+    and only served until it expires, `ttl` seconds after it was issued.
+    A URL is only read back for the conversation it was created in. Blobs
+    expire `ttl` seconds after their last use, and the least recently used
+    go first when the store holds more than `max_bytes`.
+
+    The secret is `A2A_BLOB_SECRET` if set, e.g. for agents on several
+    hosts, else one generated in `root` for every process using it.
+
+    Nothing is spilled until `base_url`, the public URL of the agent, is
+    set.
+    """
+
+    def __init__(
+        self,
+        root: str | None = None,
+        threshold: int | None = None,
+        ttl: float | None = None,
+        max_bytes: int | None = None,
+        base_url: str | None = None,
+    ):
+        self.root = Path(
+            root
+            or os.getenv('A2A_BLOB_DIR')
+            or Path(tempfile.gettempdir()) / 'a2a-blobs'
+        ).resolve()
+        self.threshold = (
+            threshold
+            if threshold is not None
+            else int(
+                os.getenv('A2A_BLOB_SPILL_THRESHOLD', DEFAULT_SPILL_THRESHOLD)
+            )
+        )
+        self.ttl = (
+            ttl
+            if ttl is not None
+            else float(os.getenv('A2A_BLOB_TTL', DEFAULT_TTL_SECONDS))
+        )
+        self.max_bytes = (
+            max_bytes
+            if max_bytes is not None
+            else int(os.getenv('A2A_BLOB_MAX_BYTES', DEFAULT_MAX_BYTES))
+        )
+        self.base_url = base_url
+        self.root.mkdir(parents=True, exist_ok=True)
+        secret = os.getenv('A2A_BLOB_SECRET')
+        self._secret = secret.encode() if secret else self._load_secret()
+        self._last_collect = 0.0
+        self._collect_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str | None:
+        return self._base_url
+
+    @base_url.setter
+    def base_url(self, url: str | None) -> None:
+        self._base_url = url
+        self._prefix = url.rstrip('/') + '/blobs/' if url else None
+
+    def should_spill(self, size: int) -> bool:
+        return (
+            self._prefix is not None
+            and self.threshold > 0
+            and size > self.threshold
+        )
+
+    def put(self, data: bytes | memoryview, context_id: str) -> str:
+        """Stores `data` for a conversation if not already there.
+
+        Returns:
+            The URL the blob is served at.
+        """
+        if self._prefix is None:
+            raise RuntimeError('The blob store has no base_url to serve from')
+        scope = scope_for(context_id)
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.root / scope / digest
+        try:
+            # Refreshed, so that garbage collection keeps the blob.
+            os.utime(path)
+        except FileNotFoundError:
+            # Write to a temporary name first so readers never see a partial blob.
+            tmp_path = path.with_name(f'{digest}.{os.getpid()}.tmp')
+            try:
+                f = open(tmp_path, 'wb')
+            except FileNotFoundError:
+                # New conversation, or its empty directory was just collected
+                path.parent.mkdir(exist_ok=True)
+                f = open(tmp_path, 'wb')
+            with f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            logger.debug('Spilled %d bytes to %s', len(data), path)
+        self._maybe_collect()
+        expires = int(time.time() + (self.ttl or DEFAULT_TTL_SECONDS))
+        signature = self._sign(scope, digest, expires)
+        return f'{self._prefix}{scope}/{digest}?expires={expires}&sig={signature}'
+
+    def verify(self, scope: str, digest: str, expires: str, signature: str) -> bool:
+        """Whether a blob URL was issued by this store and has not expired."""
+        try:
+            expires_at = int(expires)
+        except ValueError:
+            return False
+        if expires_at < time.time():
+            return False
+        return hmac.compare_digest(
+            self._sign(scope, digest, expires_at).encode(), signature.encode()
+        )
+
+    def owns(self, uri: str) -> bool:
+        """Whether `uri` points into this store."""
+        return self._prefix is not None and uri.startswith(self._prefix)
+
+    def view(self, uri: str, context_id: str) -> memoryview:
+        """Returns a read-only, memory-mapped view of the blob at `uri`.
+
+        The mapping stays alive for as long as the view is referenced.
+
+        Raises:
+            BlobNotFoundError: If the blob does not exist (any more) or
+                belongs to another conversation.
+        """
+        if not self.owns(uri):
+            raise BlobNotFoundError(f'Not a blob store URI: {uri}')
+        path = uri[len(self._prefix) :].partition('?')[0]
+        scope, _, digest = path.partition('/')
+        if scope != scope_for(context_id):
+            raise BlobNotFoundError(f'{uri} is not part of this conversation')
+        f = self.open_blob(scope, digest)
+        if f is None:
+            raise BlobNotFoundError(f'{uri} does not exist or has expired')
+        with f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b'')
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def open_blob(self, scope: str, digest: str):
+        """Opens a blob for reading; None if it does not exist."""
+        path = self._path(scope, digest)
+        if path is None:
+            return None
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        os.utime(f.fileno())
+        return f
+
+    def _sign(self, scope: str, digest: str, expires: int) -> str:
+        message = f'{scope}/{digest}/{expires}'.encode()
+        return hmac.new(self._secret, message, hashlib.sha256).hexdigest()
+
+    def _load_secret(self) -> bytes:
+        path = self.root / _SECRET_FILE
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            pass
+        tmp_path = path.with_name(f'{_SECRET_FILE}.{os.getpid()}.tmp')
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, 'wb') as f:
+            f.write(secrets.token_bytes(32))
+        try:
+            # Linked only if no other process got there first.
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp_path)
+        return path.read_bytes()
+
+    def _path(self, scope: str, digest: str) -> Path | None:
+        # Only names the store itself creates, never a path outside it.
+        if len(digest) != 64 or not _HEX.match(digest) or not _HEX.match(scope):
+            return None
+        return self.root / scope / digest
+
+    def _maybe_collect(self) -> None:
+        now = time.monotonic()
+        if now - self._last_collect < COLLECT_INTERVAL_SECONDS:
+            return
+        self._last_collect = now
+        threading.Thread(
+            target=self.collect, name='blob-store-gc', daemon=True
+        ).start()
+
+    def collect(self) -> int:
+        """Deletes expired blobs, then the oldest over `max_bytes`.
+
+        Safe to run from several processes sharing the directory.
+
+        Returns:
+            The number of blobs deleted.
+        """
+        if not self._collect_lock.acquire(blocking=False):
+            return 0
+        try:
+            return self._collect()
+        finally:
+            self._collect_lock.release()
+
+    def _collect(self) -> int:
+        expired_before = time.time() - self.ttl if self.ttl else None
+        blobs = []
+        deleted = 0
+        for scope_dir in self.root.iterdir():
+            if not scope_dir.is_dir():
+                continue
+            for path in scope_dir.iterdir():
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                if expired_before is not None and stat.st_mtime < expired_before:
+                    deleted += _unlink(path)
+                else:
+                    blobs.append((stat.st_mtime, stat.st_size, path))
+            try:
+                scope_dir.rmdir()
+            except OSError:
+                pass  # Not empty
+        total = sum(size for _, size, _ in blobs)
+        if self.max_bytes and total > self.max_bytes:
+            for _, size, path in sorted(blobs):
+                if total <= self.max_bytes:
+                    break
+                deleted += _unlink(path)
+                total -= size
+        if deleted:
+            logger.info('Deleted %d blobs from %s', deleted, self.root)
+        return deleted
+
+
+def _unlink(path: Path) -> int:
+    try:
+        path.unlink()
+        return 1
+    except FileNotFoundError:
+        return 0
+
+
+_blob_store: BlobStore | None = None
+
+
+def get_blob_store() -> BlobStore:
+    """Returns the process wide blob store."""
+    global _blob_store
+    if _blob_store is None:
+        _blob_store = BlobStore()
+    return _blob_store
+
+
+def _read_chunks(f):
+    with f:
+        while chunk := f.read(_CHUNK_SIZE):
+            yield chunk
+
+
+async def blob_endpoint(request: Request) -> Response:
+    """Serves a blob of the process wide store, see `ROUTE`.
+
+    Only URLs signed by the store are served, until they expire.
+    """
+    blob_store = get_blob_store()
+    scope, digest = request.path_params['scope'], request.path_params['digest']
+    if not blob_store.verify(
+        scope,
+        digest,
+        request.query_params.get('expires', ''),
+        request.query_params.get('sig', ''),
+    ):
+        return PlainTextResponse('Forbidden', status_code=403)
+    f = blob_store.open_blob(scope, digest)
+    if f is None:
+        return PlainTextResponse('Not found', status_code=404)
+    return StreamingResponse(
+        # Streamed from the open file, which survives garbage collection.
+        _read_chunks(f),
+        media_type='application/octet-stream',
+        headers={
+            'content-length': str(os.fstat(f.fileno()).st_size),
+            'cache-control': 'private, max-age=3600, immutable',
+        },
+    )
@@ -0,0 +1,343 @@
+import re
+import time
+
+from datetime import datetime
+from typing import Any
+
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.events import Event
+from google.adk.memory import BaseMemoryService
+from google.adk.memory.base_memory_service import SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+from google.adk.sessions import InMemorySessionService, Session
+from google.adk.sessions.state import State
+from google.adk.version import __version__ as adk_version
+from google.genai import types
+from pydantic import PrivateAttr
+
+from agent_common.bounded_store import (
+    DEFAULT_IDLE_TTL_SECONDS,
+    DEFAULT_MAX_BYTES,
+    DEFAULT_MAX_ENTRIES,
+    LruIndex,
+)
+
+
+# BoundedSessionService.upsert_session, and dropping the state of a user
+# whose last session is gone, work on the storage of InMemorySessionService,
+# which is not part of its API. It is only known to be laid out the same way
+# in these versions.
+SUPPORTED_ADK_VERSIONS = ('1.3.',)
+
+if not adk_version.startswith(SUPPORTED_ADK_VERSIONS):
+    raise ImportError(
+        f'google-adk {adk_version} is not supported by the bounded session '
+        f'service, which needs one of {", ".join(SUPPORTED_ADK_VERSIONS)}x'
+    )
+
+
+class BoundedSessionService(InMemorySessionService):
+    """An InMemorySessionService that evicts idle and least recently used sessions.
+
+    A session's size is the serialized size of its events, which is only
+    computed when `max_bytes` is set. Evicted sessions are removed with
+    `delete_session`, so subclasses see every session that goes.
+    """
+
+    def __init__(
+        self,
+        idle_ttl: float = DEFAULT_IDLE_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        super().__init__()
+        self._index = LruIndex('sessions', idle_ttl, max_entries, max_bytes)
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: dict[str, Any] | None = None,
+        session_id: str | None = None,
+    ) -> Session:
+        session = await super().create_session(
+            app_name=app_name,
+            user_id=user_id,
+            state=state,
+            session_id=session_id,
+        )
+        await self._touch(app_name, user_id, session.id, size=0)
+        return session
+
+    async def get_session(
+        self, *, app_name: str, user_id: str, session_id: str, config=None
+    ) -> Session | None:
+        await self._evict()
+        session = await super().get_session(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            config=config,
+        )
+        if session is not None:
+            self._index.touch((app_name, user_id, session_id))
+        return session
+
+    async def delete_session(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        await super().delete_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+        self._index.discard((app_name, user_id, session_id))
+        user_sessions = self.sessions.get(app_name, {}).get(user_id)
+        if user_sessions is not None and not user_sessions:
+            # Nothing refers to the user state once all sessions are gone.
+            del self.sessions[app_name][user_id]
+            self.user_state.get(app_name, {}).pop(user_id, None)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await super().append_event(session=session, event=event)
+        key = (session.app_name, session.user_id, session.id)
+        if key in self._index and not event.partial:
+            size = self._index.size_of(key)
+            if self._index.max_bytes:
+                size += len(event.model_dump_json(exclude_none=True))
+            await self._touch(*key, size=size)
+        return event
+
+    async def upsert_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        state_delta: dict[str, Any],
+    ) -> tuple[str, bool]:
+        """Gets or creates a session and merges `state_delta` into its state.
+
+        This replaces the get_session / create_session / append_event round
+        trips: the stored session is updated in place, without deep copying
+        it and without recording a history event, and only keys whose value
+        actually changed are written.
+
+        Returns:
+            The session id and whether the state changed.
+        """
+        await self._evict()
+        sessions = self.sessions.setdefault(app_name, {}).setdefault(user_id, {})
+        session = sessions.get(session_id)
+        if session is None:
+            session = Session(
+                app_name=app_name,
+                user_id=user_id,
+                id=session_id,
+                state={},
+                last_update_time=time.time(),
+            )
+            sessions[session_id] = session
+
+        changed = False
+        for key, value in state_delta.items():
+            if key.startswith(State.TEMP_PREFIX):
+                continue
+            if key.startswith(State.APP_PREFIX):
+                target = self.app_state.setdefault(app_name, {})
+                key = key.removeprefix(State.APP_PREFIX)
+            elif key.startswith(State.USER_PREFIX):
+                target = self.user_state.setdefault(app_name, {}).setdefault(
+                    user_id, {}
+                )
+                key = key.removeprefix(State.USER_PREFIX)
+            else:
+                target = session.state
+            if key not in target or target[key] != value:
+                target[key] = value
+                changed = True
+
+        if changed:
+            session.last_update_time = time.time()
+        await self._touch(app_name, user_id, session.id, size=None)
+        return session.id, changed
+
+    async def _touch(
+        self, app_name: str, user_id: str, session_id: str, size: int | None
+    ) -> None:
+        self._index.touch((app_name, user_id, session_id), size)
+        await self._evict()
+
+    async def _evict(self) -> None:
+        """Deletes the sessions due for eviction."""
+        for app_name, user_id, session_id in self._index.evict():
+            await self.delete_session(
+                app_name=app_name, user_id=user_id, session_id=session_id
+            )
+
+
+class BoundedArtifactService(InMemoryArtifactService):
+    """An InMemoryArtifactService that evicts idle and least recently used artifacts.
+
+    Entries are artifacts with all of their versions; an artifact's size is
+    the total size of its inline data.
+    """
+
+    _index: LruIndex = PrivateAttr()
+
+    def __init__(
+        self,
+        idle_ttl: float = DEFAULT_IDLE_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        super().__init__()
+        self._index = LruIndex('artifacts', idle_ttl, max_entries, max_bytes)
+
+    async def save_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        artifact: types.Part,
+    ) -> int:
+        version = await super().save_artifact(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            filename=filename,
+            artifact=artifact,
+        )
+        key = _artifact_key(app_name, user_id, session_id, filename)
+        size = self._index.size_of(key)
+        if artifact.inline_data and artifact.inline_data.data:
+            size += len(artifact.inline_data.data)
+        self._index.touch(key, size)
+        await self._evict()
+        return version
+
+    async def load_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: int | None = None,
+    ) -> types.Part | None:
+        await self._evict()
+        artifact = await super().load_artifact(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            filename=filename,
+            version=version,
+        )
+        if artifact is not None:
+            self._index.touch(
+                _artifact_key(app_name, user_id, session_id, filename)
+            )
+        return artifact
+
+    async def delete_artifact(
+        self, *, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> None:
+        await super().delete_artifact(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            filename=filename,
+        )
+        self._index.discard(
+            _artifact_key(app_name, user_id, session_id, filename)
+        )
+
+    async def _evict(self) -> None:
+        for app_name, user_id, session_id, filename in self._index.evict():
+            await super().delete_artifact(
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id,
+                filename=filename,
+            )
+
+
+def _artifact_key(
+    app_name: str, user_id: str, session_id: str, filename: str
+) -> tuple[str, str, str, str]:
+    # Artifacts in the user namespace are shared by all sessions of the user.
+    if filename.startswith('user:'):
+        session_id = ''
+    return app_name, user_id, session_id, filename
+
+
+def _words(text: str) -> set[str]:
+    return {word.lower() for word in re.findall(r'[A-Za-z]+', text)}
+
+
+class BoundedMemoryService(BaseMemoryService):
+    """A keyword matching memory service that forgets the oldest remembered sessions.
+
+    Searches like InMemoryMemoryService. Entries are sessions added to
+    memory, refreshed whenever a session is added again; a session's size
+    is the length of its remembered text.
+    """
+
+    def __init__(
+        self,
+        idle_ttl: float = DEFAULT_IDLE_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self._index = LruIndex('memory', idle_ttl, max_entries, max_bytes)
+        # (app name, user id) -> session id -> events with content
+        self._session_events: dict[tuple[str, str], dict[str, list[Event]]] = {}
+
+    async def add_session_to_memory(self, session: Session):
+        events = [
+            event
+            for event in session.events
+            if event.content and event.content.parts
+        ]
+        user_key = (session.app_name, session.user_id)
+        self._session_events.setdefault(user_key, {})[session.id] = events
+        size = sum(
+            len(part.text or '')
+            for event in events
+            for part in event.content.parts
+        )
+        self._index.touch((*user_key, session.id), size)
+        self._evict()
+
+    async def search_memory(
+        self, *, app_name: str, user_id: str, query: str
+    ) -> SearchMemoryResponse:
+        self._evict()
+        words_in_query = set(query.lower().split())
+        response = SearchMemoryResponse()
+        for events in self._session_events.get((app_name, user_id), {}).values():
+            for event in events:
+                words_in_event = _words(
+                    ' '.join(part.text for part in event.content.parts if part.text)
+                )
+                if words_in_query & words_in_event:
+                    response.memories.append(
+                        MemoryEntry(
+                            content=event.content,
+                            author=event.author,
+                            timestamp=datetime.fromtimestamp(
+                                event.timestamp
+                            ).isoformat(),
+                        )
+                    )
+        return response
+
+    def _evict(self) -> None:
+        for app_name, user_id, session_id in self._index.evict():
+            user_sessions = self._session_events.get((app_name, user_id))
+            if user_sessions is None:
+                continue
+            user_sessions.pop(session_id, None)
+            if not user_sessions:
+                del self._session_events[app_name, user_id]
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import time
+
+from collections import OrderedDict
+from collections.abc import Hashable
+
+from a2a.server.tasks.task_store import TaskStore
+from a2a.types import Task
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IDLE_TTL_SECONDS = 3600.0
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_MAX_BYTES = 0
+
+EVICTION_REASONS = ('ttl', 'entries', 'bytes')
+
+
+class EvictionStats:
+    """Size and eviction counters of a bounded store, served on /metrics."""
+
+    def __init__(self, store: str):
+        self.store = store
+        self.entries = 0
+        self.bytes = 0
+        self.evictions = dict.fromkeys(EVICTION_REASONS, 0)
+
+
+_stats_registry: list[EvictionStats] = []
+
+
+class LruIndex:
+    """Tracks the last access time and size of store keys in LRU order.
+
+    Stores `touch()` a key on every access and remove the keys returned by
+    `evict()`: keys idle for longer than `idle_ttl` seconds, then the least
+    recently used ones while there are more than `max_entries` keys or more
+    than `max_bytes` in total, always keeping the most recently used key.
+    A limit of 0 disables it. Because keys are kept in access order, eviction
+    only ever looks at the evicted keys.
+    """
+
+    def __init__(
+        self,
+        store: str,
+        idle_ttl: float = DEFAULT_IDLE_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.idle_ttl = idle_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: OrderedDict[Hashable, tuple[float, int]] = OrderedDict()
+        self.stats = EvictionStats(store)
+        _stats_registry.append(self.stats)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def size_of(self, key: Hashable) -> int:
+        entry = self._entries.get(key)
+        return entry[1] if entry else 0
+
+    def touch(self, key: Hashable, size: int | None = None) -> None:
+        """Marks `key` as used now, optionally updating its size in bytes."""
+        previous = self._entries.pop(key, None)
+        if size is None:
+            size = previous[1] if previous else 0
+        if previous:
+            self.total_bytes -= previous[1]
+        self._entries[key] = (time.monotonic(), size)
+        self.total_bytes += size
+
+    def discard(self, key: Hashable) -> None:
+        """Forgets `key` that was removed from the store by its owner."""
+        previous = self._entries.pop(key, None)
+        if previous:
+            self.total_bytes -= previous[1]
+        self._update_stats()
+
+    def evict(self) -> list[Hashable]:
+        """Removes and returns the keys that the store must drop."""
+        now = time.monotonic()
+        evicted = []
+        while self._entries:
+            key, (last_access, size) = next(iter(self._entries.items()))
+            if self.idle_ttl and now - last_access > self.idle_ttl:
+                reason = 'ttl'
+            elif self.max_entries and len(self._entries) > self.max_entries:
+                reason = 'entries'
+            elif (
+                self.max_bytes
+                and self.total_bytes > self.max_bytes
+                and len(self._entries) > 1
+            ):
+                reason = 'bytes'
+            else:
+                break
+            self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.stats.evictions[reason] += 1
+            evicted.append(key)
+        self._update_stats()
+        if evicted:
+            logger.info(
+                'Evicted %d entries from the %s store',
+                len(evicted),
+                self.stats.store,
+            )
+        return evicted
+
+    def _update_stats(self) -> None:
+        self.stats.entries = len(self._entries)
+        self.stats.bytes = self.total_bytes
+
+
+class BoundedTaskStore(TaskStore):
+    """In-memory TaskStore with idle-TTL and max-entries/max-bytes eviction.
+
+    Behaves like `InMemoryTaskStore` otherwise. Enforcing `max_bytes` takes a
+    JSON serialization of the task on every save, so it is off by default.
+    """
+
+    def __init__(
+        self,
+        idle_ttl: float = DEFAULT_IDLE_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.tasks: dict[str, Task] = {}
+        self.lock = asyncio.Lock()
+        self._index = LruIndex('tasks', idle_ttl, max_entries, max_bytes)
+
+    async def save(self, task: Task) -> None:
+        async with self.lock:
+            self.tasks[task.id] = task
+            size = len(task.model_dump_json()) if self._index.max_bytes else 0
+            self._index.touch(task.id, size)
+            self._evict()
+
+    async def get(self, task_id: str) -> Task | None:
+        async with self.lock:
+            self._evict()
+            task = self.tasks.get(task_id)
+            if task:
+                self._index.touch(task_id)
+            return task
+
+    async def delete(self, task_id: str) -> None:
+        async with self.lock:
+            if self.tasks.pop(task_id, None) is None:
+                logger.warning(
+                    'Attempted to delete nonexistent task with id: %s', task_id
+                )
+            self._index.discard(task_id)
+
+    def _evict(self) -> None:
+        for task_id in self._index.evict():
+            self.tasks.pop(task_id, None)
+
+
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    """Serves the store sizes and eviction counters in Prometheus format."""
+    lines = [
+        '# TYPE a2a_store_entries gauge',
+        *(
+            f'a2a_store_entries{{store="{s.store}"}} {s.entries}'
+            for s in _stats_registry
+        ),
+        '# TYPE a2a_store_bytes gauge',
+        *(
+            f'a2a_store_bytes{{store="{s.store}"}} {s.bytes}'
+            for s in _stats_registry
+        ),
+        '# TYPE a2a_store_evictions_total counter',
+        *(
+            f'a2a_store_evictions_total{{store="{s.store}",reason="{reason}"}} {count}'
+            for s in _stats_registry
+            for reason, count in s.evictions.items()
+        ),
+    ]
+    return PlainTextResponse('\n'.join(lines) + '\n')
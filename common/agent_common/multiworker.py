@@ -0,0 +1,375 @@
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import uuid
+import zlib
+
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+import httpx
+import uvicorn
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 1
+# Task ids remembered for routing tasks/* requests to the worker running them
+MAX_TRACKED_TASKS = 100_000
+# How often crashed workers are looked for and restarted
+WORKER_CHECK_INTERVAL_SECONDS = 1.0
+WORKER_STOP_TIMEOUT_SECONDS = 10.0
+
+MESSAGE_METHODS = ('message/send', 'message/stream')
+# Exit codes of workers that were asked to stop, as opposed to crashing
+_STOPPED_EXIT_CODES = (0, -signal.SIGINT, -signal.SIGTERM)
+_HOP_BY_HOP_HEADERS = {b'connection', b'keep-alive', b'transfer-encoding'}
+# The blank line that ends an SSE event, with any of the line endings
+_SSE_EVENT_SEPARATORS = (b'\r\n\r\n', b'\n\n', b'\r\r')
+
+
+def _spawn_context():
+    # The agents run as `python <agent dir>`, whose __main__ module spawned
+    # children cannot import by name. Without a spec they re-run it from its
+    # path instead, as for a plain script, so that its functions can be
+    # pickled as worker targets.
+    main_module = sys.modules['__main__']
+    if getattr(main_module.__spec__, 'name', None) == '__main__':
+        main_module.__spec__ = None
+    return multiprocessing.get_context('spawn')
+
+
+class WorkerPool:
+    """Server processes that each serve the agent on their own unix socket.
+
+    `worker_main(uds=...)` runs in every worker process. It must be
+    picklable, e.g. a `functools.partial` of a function of the main module.
+    """
+
+    def __init__(self, worker_main: Callable[..., None], count: int):
+        self.worker_main = worker_main
+        self.socket_dir = tempfile.mkdtemp(prefix='a2a-workers-')
+        self.sockets = [
+            os.path.join(self.socket_dir, f'worker-{index}.sock')
+            for index in range(count)
+        ]
+        self._context = _spawn_context()
+        self._processes: list[multiprocessing.process.BaseProcess] = []
+
+    def start(self) -> None:
+        self._processes = [self._start(index) for index in range(len(self.sockets))]
+
+    def restart_crashed(self) -> None:
+        for index, process in enumerate(self._processes):
+            if process.is_alive() or process.exitcode in _STOPPED_EXIT_CODES:
+                continue
+            logger.warning(
+                'Worker %d exited with code %s, restarting it',
+                index,
+                process.exitcode,
+            )
+            self._processes[index] = self._start(index)
+
+    def stop(self) -> None:
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            process.join(WORKER_STOP_TIMEOUT_SECONDS)
+            if process.is_alive():
+                process.kill()
+        shutil.rmtree(self.socket_dir, ignore_errors=True)
+
+    def _start(self, index: int) -> multiprocessing.process.BaseProcess:
+        process = self._context.Process(
+            target=self.worker_main,
+            kwargs={'uds': self.sockets[index]},
+            name=f'a2a-worker-{index}',
+            daemon=True,
+        )
+        process.start()
+        return process
+
+
+class StickyDispatcher:
+    """An ASGI app that proxies A2A requests to a pool of worker processes.
+
+    ADK sessions, LangGraph threads, running executions and their event
+    queues all live in worker memory, so every request of a conversation is
+    sent to the same worker: messages by a hash of their contextId (assigned
+    here when the client sends none) and tasks/* requests to the worker that
+    ran the task, as learnt from the message responses. Requests for a task
+    that is not tracked, e.g. after a restart of the dispatcher, go by a hash
+    of the task id instead, so they at least always reach the same worker.
+    Anything else, such as the agent card, goes to the workers in turn.
+    """
+
+    def __init__(self, pool: WorkerPool):
+        self.pool = pool
+        self._clients: list[httpx.AsyncClient] = []
+        self._task_workers: OrderedDict[str, int] = OrderedDict()
+        self._round_robin = itertools.count()
+        self._monitor: asyncio.Task | None = None
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            body = await _read_body(receive)
+            index, body, learn = self._route(scope, body)
+            await self._forward(index, scope, body, learn, receive, send)
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.pool.start()
+                self._clients = [
+                    httpx.AsyncClient(
+                        transport=httpx.AsyncHTTPTransport(uds=path),
+                        base_url='http://a2a-worker',
+                        timeout=None,
+                    )
+                    for path in self.pool.sockets
+                ]
+                self._monitor = asyncio.create_task(self._watch_workers())
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self._monitor.cancel()
+                for client in self._clients:
+                    await client.aclose()
+                await asyncio.to_thread(self.pool.stop)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _watch_workers(self) -> None:
+        while True:
+            await asyncio.sleep(WORKER_CHECK_INTERVAL_SECONDS)
+            self.pool.restart_crashed()
+
+    def _route(self, scope, body: bytes) -> tuple[int, bytes, bool]:
+        """Returns the worker for a request, its body and whether to learn task ids."""
+        request = None
+        if scope['method'] == 'POST':
+            try:
+                request = json.loads(body)
+            except ValueError:
+                pass
+        params = request.get('params') if isinstance(request, dict) else None
+        if isinstance(params, dict):
+            message = params.get('message')
+            if request.get('method') in MESSAGE_METHODS and isinstance(
+                message, dict
+            ):
+                if not message.get('contextId'):
+                    task_id = message.get('taskId')
+                    if task_id:
+                        # A task that is not tracked (any more) goes to the
+                        # same worker every time, which continues it from
+                        # the task store or reports it as not found.
+                        index = self._task_worker(task_id)
+                        if index is None:
+                            index = self._hash_worker(str(task_id))
+                        return index, body, True
+                    # Pin a new conversation to a worker by giving it a
+                    # context id up front.
+                    message['contextId'] = str(uuid.uuid4())
+                    body = json.dumps(request).encode()
+                return self._hash_worker(message['contextId']), body, True
+            task_id = params.get('id') or params.get('taskId')
+            if isinstance(task_id, str):
+                index = self._task_worker(task_id)
+                if index is None:
+                    index = self._hash_worker(task_id)
+                return index, body, False
+        return next(self._round_robin) % len(self._clients), body, False
+
+    def _hash_worker(self, key: str) -> int:
+        return zlib.crc32(key.encode()) % len(self._clients)
+
+    def _task_worker(self, task_id) -> int | None:
+        if not isinstance(task_id, str) or task_id not in self._task_workers:
+            return None
+        self._task_workers.move_to_end(task_id)
+        return self._task_workers[task_id]
+
+    def _remember_task(self, task_id: str, index: int) -> None:
+        self._task_workers[task_id] = index
+        self._task_workers.move_to_end(task_id)
+        if len(self._task_workers) > MAX_TRACKED_TASKS:
+            self._task_workers.popitem(last=False)
+
+    async def _forward(
+        self, index: int, scope, body: bytes, learn: bool, receive, send
+    ) -> None:
+        client = self._clients[index]
+        path = scope.get('raw_path') or scope['path'].encode()
+        if scope['query_string']:
+            path += b'?' + scope['query_string']
+        request = client.build_request(
+            scope['method'],
+            path.decode('latin-1'),
+            headers=[
+                (name, value)
+                for name, value in scope['headers']
+                if name not in (b'host', b'content-length')
+            ],
+            content=body,
+        )
+        try:
+            response = await client.send(request, stream=True)
+        except httpx.TransportError as e:
+            logger.warning('Worker %d is unavailable: %s', index, e)
+            await _send_unavailable(send)
+            return
+
+        async def relay() -> None:
+            await send(
+                {
+                    'type': 'http.response.start',
+                    'status': response.status_code,
+                    'headers': [
+                        (name.lower(), value)
+                        for name, value in response.headers.raw
+                        if name.lower() not in _HOP_BY_HOP_HEADERS
+                    ],
+                }
+            )
+            scanner = _TaskIdScanner(response) if learn else None
+            async for chunk in response.aiter_raw():
+                if scanner:
+                    if task_id := scanner.feed(chunk):
+                        self._remember_task(task_id, index)
+                    if scanner.done:
+                        scanner = None
+                await send(
+                    {'type': 'http.response.body', 'body': chunk, 'more_body': True}
+                )
+            if scanner and (task_id := scanner.finish()):
+                self._remember_task(task_id, index)
+            await send({'type': 'http.response.body', 'body': b''})
+
+        async def wait_for_disconnect() -> None:
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        # Stop relaying, and close the worker connection, as soon as the
+        # client goes away, e.g. in the middle of a message/stream.
+        relaying = asyncio.create_task(relay())
+        watching = asyncio.create_task(wait_for_disconnect())
+        try:
+            await asyncio.wait(
+                {relaying, watching}, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            relaying.cancel()
+            watching.cancel()
+            await response.aclose()
+        if relaying.done() and not relaying.cancelled():
+            relaying.result()
+
+
+class _TaskIdScanner:
+    """Finds the task id in a JSON-RPC or SSE response to a message request.
+
+    Of an SSE stream only the first event is looked at, which already names
+    the task; `done` is set once it is complete, with or without an id.
+    """
+
+    def __init__(self, response: httpx.Response):
+        self._sse = response.headers.get('content-type', '').startswith(
+            'text/event-stream'
+        )
+        self._buffer = bytearray()
+        self.done = False
+
+    def feed(self, chunk: bytes) -> str | None:
+        # A separator may straddle the previous chunk and this one.
+        start = max(0, len(self._buffer) - 3)
+        self._buffer += chunk
+        if not self._sse:
+            return None
+        ends = [
+            end
+            for end in (
+                self._buffer.find(separator, start)
+                for separator in _SSE_EVENT_SEPARATORS
+            )
+            if end >= 0
+        ]
+        if not ends:
+            return None
+        self.done = True
+        data = b'\n'.join(
+            line[5:].removeprefix(b' ')
+            for line in self._buffer[: min(ends)].splitlines()
+            if line.startswith(b'data:')
+        )
+        return _task_id_of(data)
+
+    def finish(self) -> str | None:
+        return None if self._sse else _task_id_of(self._buffer)
+
+
+def _task_id_of(data: bytes) -> str | None:
+    try:
+        result = json.loads(data).get('result')
+    except (ValueError, AttributeError):
+        return None
+    if not isinstance(result, dict):
+        return None
+    task_id = result.get('id') if result.get('kind') == 'task' else result.get('taskId')
+    return task_id if isinstance(task_id, str) else None
+
+
+async def _read_body(receive) -> bytes:
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return bytes(body)
+
+
+async def _send_unavailable(send) -> None:
+    await send(
+        {
+            'type': 'http.response.start',
+            'status': 503,
+            'headers': [(b'content-type', b'application/json')],
+        }
+    )
+    await send(
+        {'type': 'http.response.body', 'body': b'{"error": "worker unavailable"}'}
+    )
+
+
+def run_workers(
+    worker_main: Callable[..., None],
+    host: str,
+    port: int,
+    workers: int,
+    log_level: str = 'info',
+    middleware: Callable[[Any], Any] | None = None,
+) -> None:
+    """Serves the agent on host:port from `workers` processes.
+
+    A StickyDispatcher listens on host:port and keeps each conversation on
+    one of the worker processes started with `worker_main(uds=...)`.
+    `middleware`, if given, wraps the dispatcher into the ASGI app served,
+    e.g. to apply per-user limits once for all the workers.
+    """
+    app = StickyDispatcher(WorkerPool(worker_main, workers))
+    uvicorn.run(
+        middleware(app) if middleware else app,
+        host=host,
+        port=port,
+        log_level=log_level,
+    )
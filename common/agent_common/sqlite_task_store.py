@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import sqlite3
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from a2a.server.tasks.task_store import TaskStore
+from a2a.types import Task, TaskState
+
+
+logger = logging.getLogger(__name__)
+
+# How long `working` updates are buffered before being written in one batch
+DEFAULT_FLUSH_INTERVAL_SECONDS = 0.05
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    context_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    data TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+_UPSERT = """
+INSERT INTO tasks (id, context_id, state, updated_at, data)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    context_id = excluded.context_id,
+    state = excluded.state,
+    updated_at = excluded.updated_at,
+    data = excluded.data
+"""
+
+
+class SqliteTaskStore(TaskStore):
+    """A durable TaskStore on a local SQLite database in WAL mode.
+
+    Tasks survive restarts and can be read by every process sharing the
+    database file. Saves of `working` tasks, which happen for every
+    intermediate event, are buffered for `flush_interval` seconds and written
+    in one transaction; any other state is written through right away,
+    together with the buffered tasks. Buffered tasks are served from memory,
+    so a process always reads its own writes.
+
+    The blocking sqlite3 calls run on a dedicated thread that owns the
+    connection.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+    ) -> None:
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self._pending: dict[str, Task] = {}
+        self._flush_timer: asyncio.TimerHandle | None = None
+        self._flush_task: asyncio.Task | None = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='sqlite-task-store'
+        )
+        self._conn = self._executor.submit(self._connect).result()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # WAL with synchronous=NORMAL is durable across process crashes and
+        # only risks the last transactions on a power loss.
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=5000')
+        conn.executescript(_SCHEMA)
+        return conn
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, fn, *args
+        )
+
+    async def save(self, task: Task) -> None:
+        self._pending[task.id] = task
+        if task.status.state == TaskState.working and self.flush_interval > 0:
+            if self._flush_timer is None:
+                self._flush_timer = asyncio.get_running_loop().call_later(
+                    self.flush_interval, self._schedule_flush
+                )
+            return
+        await self.flush()
+
+    async def get(self, task_id: str) -> Task | None:
+        task = self._pending.get(task_id)
+        if task is not None:
+            return task
+        row = await self._run(self._select, task_id)
+        return Task.model_validate_json(row[0]) if row else None
+
+    async def delete(self, task_id: str) -> None:
+        self._pending.pop(task_id, None)
+        if not await self._run(self._delete, task_id):
+            logger.warning(
+                'Attempted to delete nonexistent task with id: %s', task_id
+            )
+
+    async def flush(self) -> None:
+        """Writes all buffered tasks in a single transaction."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if not self._pending:
+            return
+        tasks = list(self._pending.values())
+        self._pending.clear()
+        now = time.time()
+        rows = [
+            (
+                task.id,
+                task.contextId,
+                task.status.state.value,
+                now,
+                task.model_dump_json(exclude_none=True),
+            )
+            for task in tasks
+        ]
+        try:
+            await self._run(self._upsert, rows)
+        except BaseException:
+            # Keep the tasks buffered unless they were saved again meanwhile.
+            for task in tasks:
+                self._pending.setdefault(task.id, task)
+            raise
+
+    async def close(self) -> None:
+        """Flushes buffered tasks and closes the database."""
+        await self.flush()
+        await self._run(self._conn.close)
+        self._executor.shutdown()
+
+    def _schedule_flush(self) -> None:
+        self._flush_timer = None
+        self._flush_task = asyncio.create_task(self._flush_in_background())
+
+    async def _flush_in_background(self) -> None:
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception('Failed to write buffered tasks to %s', self.path)
+
+    def _upsert(self, rows: list[tuple]) -> None:
+        with self._conn:
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._conn.executemany(_UPSERT, rows)
+
+    def _select(self, task_id: str) -> tuple | None:
+        return self._conn.execute(
+            'SELECT data FROM tasks WHERE id = ?', (task_id,)
+        ).fetchone()
+
+    def _delete(self, task_id: str) -> bool:
+        with self._conn:
+            return (
+                self._conn.execute(
+                    'DELETE FROM tasks WHERE id = ?', (task_id,)
+                ).rowcount
+                > 0
+            )
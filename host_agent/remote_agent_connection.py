@@ -30,6 +30,7 @@ from a2a.types import (
     TaskStatusUpdateEvent,
 )
 from dotenv import load_dotenv
+from traffic_capture import get_recorder
 
 
 load_dotenv()
@@ -101,6 +102,12 @@ class RemoteAgentConnections:
         print(f'agent_url: {agent_url}')
 
         self._httpx_client = httpx.AsyncClient(timeout=30)
+        # Optionally record the A2A traffic, see traffic_capture.py
+        recorder = get_recorder()
+        if recorder:
+            self._httpx_client.event_hooks = recorder.event_hooks(
+                agent_card.name
+            )
         self._httpx_client.auth = AgentAuth(agent_card)
         self.agent_client = A2AClient(
             self._httpx_client, agent_card, url=agent_url
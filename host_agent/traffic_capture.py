@@ -0,0 +1,133 @@
+"""
+Copyright 2025 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import os
+import threading
+import time
+
+from typing import Any
+
+import httpx
+
+
+# Headers that must never end up in a capture file.
+REDACTED_HEADERS = {'authorization', 'proxy-authorization', 'cookie'}
+REDACTED_VALUE = 'REDACTED'
+
+_START_KEY = 'a2a_capture_start'
+
+
+class TrafficRecorder:
+    """Records host→agent A2A JSON-RPC exchanges as timestamped JSONL.
+
+    Each line holds the wall clock time the request was sent, the target
+    agent, the (redacted) request headers, the JSON-RPC request body, the HTTP
+    status and the observed latency. The file can be played back with
+    `traffic_replay.py`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def event_hooks(self, agent_name: str) -> dict[str, list]:
+        """Returns httpx event hooks that record traffic for `agent_name`."""
+
+        async def on_request(request: httpx.Request) -> None:
+            request.extensions[_START_KEY] = (time.time(), time.perf_counter())
+
+        async def on_response(response: httpx.Response) -> None:
+            start = response.request.extensions.get(_START_KEY)
+            if start is None:
+                return
+            streaming = response.headers.get('content-type', '').startswith(
+                'text/event-stream'
+            )
+            if not streaming:
+                # Reading the body here is what the caller does next anyway,
+                # httpx caches it for the subsequent `.json()` call.
+                await response.aread()
+            self.record(agent_name, response.request, response, start)
+
+        return {'request': [on_request], 'response': [on_response]}
+
+    def record(
+        self,
+        agent_name: str,
+        request: httpx.Request,
+        response: httpx.Response,
+        start: tuple[float, float],
+    ) -> None:
+        wall_start, perf_start = start
+        try:
+            body = json.loads(request.content) if request.content else None
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            body = None
+        # Only the JSON-RPC error is kept from the response, results may carry
+        # user data that is not needed to reproduce the load.
+        rpc_error = None
+        if response.is_stream_consumed:
+            try:
+                payload = response.json()
+                if isinstance(payload, dict):
+                    rpc_error = payload.get('error')
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                pass
+
+        entry: dict[str, Any] = {
+            'ts': wall_start,
+            'agent': agent_name,
+            'url': str(request.url),
+            'method': body.get('method') if isinstance(body, dict) else None,
+            'headers': redact_headers(request.headers),
+            'request': body,
+            'status': response.status_code,
+            'latency_ms': round((time.perf_counter() - perf_start) * 1000, 3),
+            'rpc_error': rpc_error,
+        }
+        line = json.dumps(entry, separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def redact_headers(headers: httpx.Headers) -> dict[str, str]:
+    """Returns a plain dict of the headers with credentials redacted."""
+    return {
+        key: REDACTED_VALUE if key.lower() in REDACTED_HEADERS else value
+        for key, value in headers.items()
+    }
+
+
+_recorder: TrafficRecorder | None = None
+
+
+def get_recorder() -> TrafficRecorder | None:
+    """Returns the process wide recorder if `A2A_CAPTURE_FILE` is set."""
+    global _recorder
+    path = os.getenv('A2A_CAPTURE_FILE')
+    if not path:
+        return None
+    if _recorder is None:
+        _recorder = TrafficRecorder(path)
+        print(f'Capturing A2A traffic to {path}')
+    return _recorder
@@ -0,0 +1,321 @@
+"""
+Copyright 2025 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Replays A2A traffic captured with `A2A_CAPTURE_FILE` against an agent server.
+
+    # Same pace as production
+    python traffic_replay.py replay capture.jsonl --target http://localhost:10001
+    # 5x faster, only the weather agent traffic
+    python traffic_replay.py replay capture.jsonl --agent 'Weather Agent' --speed 5
+    # Closed loop with 16 requests in flight, ignoring the recorded timing
+    python traffic_replay.py replay capture.jsonl --concurrency 16 -o new.jsonl
+    # Latency / error rate diff between two builds
+    python traffic_replay.py compare old.jsonl new.jsonl
+"""
+
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+from collections import defaultdict
+from collections.abc import Iterator
+from typing import Any
+
+import click
+import httpx
+
+from traffic_capture import REDACTED_HEADERS, REDACTED_VALUE
+
+
+# Headers httpx computes itself and that must not be replayed verbatim.
+SKIPPED_HEADERS = {'host', 'content-length', 'transfer-encoding', 'connection'}
+ID_KEYS = ('taskId', 'contextId', 'messageId')
+
+
+def load_capture(path: str, agent: str | None = None) -> list[dict[str, Any]]:
+    """Loads the captured records, ordered by the time they were sent."""
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get('request') is None:
+                continue
+            if agent and record.get('agent') != agent:
+                continue
+            records.append(record)
+    records.sort(key=lambda r: r['ts'])
+    return records
+
+
+class IdRemapper:
+    """Consistently maps recorded task/context/message ids to fresh ones.
+
+    Replaying the recorded ids against a server that already saw them would
+    hit finished tasks, fresh ids keep the conversation shape intact.
+    """
+
+    def __init__(self):
+        self._ids: dict[str, str] = {}
+
+    def _map(self, value: str) -> str:
+        if value not in self._ids:
+            self._ids[value] = str(uuid.uuid4())
+        return self._ids[value]
+
+    def remap(self, body: dict[str, Any]) -> dict[str, Any]:
+        body = json.loads(json.dumps(body))
+        if 'id' in body and isinstance(body['id'], str):
+            body['id'] = self._map(body['id'])
+        params = body.get('params') or {}
+        if isinstance(params.get('id'), str):
+            params['id'] = self._map(params['id'])
+        message = params.get('message') or {}
+        for key in ID_KEYS:
+            if isinstance(message.get(key), str):
+                message[key] = self._map(message[key])
+        return body
+
+
+def build_headers(record: dict[str, Any], token: str | None) -> dict[str, str]:
+    headers = {}
+    for key, value in (record.get('headers') or {}).items():
+        if key.lower() in SKIPPED_HEADERS:
+            continue
+        if key.lower() in REDACTED_HEADERS and value == REDACTED_VALUE:
+            if key.lower() == 'authorization' and token:
+                headers[key] = f'Bearer {token}'
+            continue
+        headers[key] = value
+    return headers
+
+
+def rpc_error(payload: Any) -> str | None:
+    """The error label of a JSON-RPC response, None if it succeeded."""
+    if isinstance(payload, dict) and payload.get('error'):
+        return f"rpc_{payload['error'].get('code')}"
+    return None
+
+
+def sse_payloads(content: bytes) -> Iterator[Any]:
+    """Yields the JSON data of each event of a server-sent event stream."""
+    data: list[str] = []
+    for line in [*content.decode().splitlines(), '']:
+        if not line:
+            # A blank line ends the event.
+            if data:
+                yield json.loads('\n'.join(data))
+                data = []
+        elif line.startswith('data:'):
+            data.append(line.removeprefix('data:').removeprefix(' '))
+
+
+async def send_one(
+    client: httpx.AsyncClient,
+    url: str,
+    body: dict[str, Any],
+    headers: dict[str, str],
+) -> dict[str, Any]:
+    """Sends one JSON-RPC request and returns its result record."""
+    result: dict[str, Any] = {
+        'method': body.get('method'),
+        'status': None,
+        'error': None,
+    }
+    start = time.perf_counter()
+    try:
+        async with client.stream('POST', url, json=body, headers=headers) as response:
+            result['status'] = response.status_code
+            result['ttfb_ms'] = (time.perf_counter() - start) * 1000
+            content = await response.aread()
+        if response.status_code >= 400:
+            result['error'] = f'http_{response.status_code}'
+        elif response.headers.get('content-type', '').startswith(
+            'application/json'
+        ):
+            result['error'] = rpc_error(json.loads(content))
+        elif response.headers.get('content-type', '').startswith(
+            'text/event-stream'
+        ):
+            # SSE streams report JSON-RPC errors as an event
+            result['error'] = next(
+                filter(None, map(rpc_error, sse_payloads(content))), None
+            )
+    except httpx.TimeoutException:
+        result['error'] = 'timeout'
+    except httpx.RequestError as e:
+        result['error'] = type(e).__name__
+    except json.JSONDecodeError:
+        result['error'] = 'invalid_json'
+    result['latency_ms'] = (time.perf_counter() - start) * 1000
+    return result
+
+
+async def replay(
+    records: list[dict[str, Any]],
+    target: str | None,
+    speed: float,
+    concurrency: int | None,
+    token: str | None,
+    fresh_ids: bool,
+    timeout: float,
+) -> list[dict[str, Any]]:
+    remapper = IdRemapper() if fresh_ids else None
+    results: list[dict[str, Any]] = []
+    first_ts = records[0]['ts'] if records else 0.0
+    # Closed loop mode caps the requests in flight, open loop mode follows
+    # the recorded arrival times scaled by `speed`.
+    semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+    limits = httpx.Limits(max_connections=concurrency or 100)
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+
+        async def run(record: dict[str, Any]) -> None:
+            offset = record['ts'] - first_ts
+            if semaphore is None:
+                delay = offset / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            body = record['request']
+            if remapper:
+                body = remapper.remap(body)
+            url = target or record['url']
+            headers = build_headers(record, token)
+            if semaphore is None:
+                result = await send_one(client, url, body, headers)
+            else:
+                async with semaphore:
+                    result = await send_one(client, url, body, headers)
+            result['offset_s'] = offset
+            result['agent'] = record.get('agent')
+            results.append(result)
+
+        await asyncio.gather(*(run(record) for record in records))
+    results.sort(key=lambda r: r['offset_s'])
+    return results
+
+
+def percentile(values: list[float], pct: int) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[pct - 1]
+
+
+def summarize(results: list[dict[str, Any]]) -> dict[str, dict[str, float]]:
+    """Groups the results per JSON-RPC method plus an `all` row."""
+    groups: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    for result in results:
+        groups[result.get('method') or 'unknown'].append(result)
+        groups['all'].append(result)
+    summary = {}
+    for method, items in sorted(groups.items()):
+        latencies = sorted(r['latency_ms'] for r in items)
+        errors = sum(1 for r in items if r.get('error'))
+        summary[method] = {
+            'count': len(items),
+            'errors': errors,
+            'error_rate': errors / len(items),
+            'p50_ms': percentile(latencies, 50),
+            'p90_ms': percentile(latencies, 90),
+            'p99_ms': percentile(latencies, 99),
+            'max_ms': latencies[-1],
+        }
+    return summary
+
+
+def print_summary(summary: dict[str, dict[str, float]]) -> None:
+    print(
+        f'{"method":<24}{"count":>8}{"err%":>8}'
+        f'{"p50 ms":>10}{"p90 ms":>10}{"p99 ms":>10}{"max ms":>10}'
+    )
+    for method, row in summary.items():
+        print(
+            f'{method:<24}{row["count"]:>8}{row["error_rate"] * 100:>8.1f}'
+            f'{row["p50_ms"]:>10.1f}{row["p90_ms"]:>10.1f}'
+            f'{row["p99_ms"]:>10.1f}{row["max_ms"]:>10.1f}'
+        )
+
+
+def load_results(path: str) -> list[dict[str, Any]]:
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@click.group()
+def cli():
+    """Capture replay and comparison tool for A2A agent servers."""
+
+
+@cli.command('replay')
+@click.argument('capture', type=click.Path(exists=True, dir_okay=False))
+@click.option('--target', help='Agent URL to send to, defaults to the recorded URL.')
+@click.option('--agent', help='Only replay traffic recorded for this agent name.')
+@click.option('--speed', default=1.0, type=float, help='Replay speed factor, 2 is twice as fast.')
+@click.option('--concurrency', type=int, help='Fixed number of requests in flight, ignores the recorded timing.')
+@click.option('--token', envvar='A2A_REPLAY_TOKEN', help='Bearer token used in place of the redacted one.')
+@click.option('--fresh-ids/--keep-ids', default=True, help='Remap task, context and message ids.')
+@click.option('--timeout', default=120.0, type=float, help='Per request timeout in seconds.')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='Write per request results as JSONL.')
+def replay_command(capture, target, agent, speed, concurrency, token, fresh_ids, timeout, output):
+    """Replays CAPTURE and reports latency distribution and error rate."""
+    if speed <= 0:
+        raise click.BadParameter('speed must be positive', param_hint='--speed')
+    records = load_capture(capture, agent)
+    if not records:
+        raise click.ClickException('No replayable records found.')
+    mode = f'concurrency={concurrency}' if concurrency else f'speed={speed}x'
+    print(f'Replaying {len(records)} requests ({mode})...')
+    started = time.perf_counter()
+    results = asyncio.run(
+        replay(records, target, speed, concurrency, token, fresh_ids, timeout)
+    )
+    elapsed = time.perf_counter() - started
+    print(f'Done in {elapsed:.1f}s ({len(results) / elapsed:.2f} req/s)')
+    print_summary(summarize(results))
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(result) + '\n')
+
+
+@cli.command('compare')
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False))
+@click.argument('candidate', type=click.Path(exists=True, dir_okay=False))
+def compare_command(baseline, candidate):
+    """Diffs two replay result files, e.g. from two builds."""
+    before = summarize(load_results(baseline))
+    after = summarize(load_results(candidate))
+    print(
+        f'{"method":<24}{"metric":<12}{"baseline":>12}{"candidate":>12}{"delta":>10}'
+    )
+    for method in sorted(before.keys() | after.keys()):
+        if method not in before or method not in after:
+            side = 'baseline' if method in before else 'candidate'
+            print(f'{method:<24}only in {side}')
+            continue
+        for metric in ('error_rate', 'p50_ms', 'p90_ms', 'p99_ms'):
+            old, new = before[method][metric], after[method][metric]
+            delta = f'{(new - old) / old * 100:+.1f}%' if old else 'n/a'
+            print(f'{method:<24}{metric:<12}{old:>12.3f}{new:>12.3f}{delta:>10}')
+
+
+if __name__ == '__main__':
+    cli()
@@ -1,5 +1,10 @@
+import asyncio
+import base64
+import binascii
 import logging
+import uuid
 
+from contextlib import aclosing
 from typing import TYPE_CHECKING
 
 from a2a.server.agent_execution import AgentExecutor
@@ -8,16 +13,20 @@ from a2a.server.events.event_queue import EventQueue
 from a2a.server.tasks import TaskUpdater
 from a2a.types import (
     AgentCard,
+    Artifact,
     FilePart,
     FileWithBytes,
     FileWithUri,
     Part,
+    TaskArtifactUpdateEvent,
+    TaskNotCancelableError,
     TaskState,
     TextPart,
-    UnsupportedOperationError,
 )
 from a2a.utils.errors import ServerError
+from agent_common.blob_store import get_blob_store
 from google.adk import Runner
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.genai import types
 
 
@@ -30,16 +39,26 @@ logger.setLevel(logging.DEBUG)
 
 # Constants
 DEFAULT_USER_ID = 'self'
+# How long a cancel request waits for the running execution to unwind
+CANCEL_GRACE_SECONDS = 5.0
 
 
 class QuoteExecutor(AgentExecutor):
     """An AgentExecutor that runs an ADK-based Agent for quote."""
 
-    def __init__(self, runner: Runner, card: AgentCard):
+    def __init__(
+        self, runner: Runner, card: AgentCard, stream_partial: bool = False
+    ):
         self.runner = runner
         self._card = card
-        # Track active sessions for potential cancellation
-        self._active_sessions: set[str] = set()
+        # Stream partial model output (SSE run mode) as artifact chunks
+        self._run_config = RunConfig(
+            streaming_mode=(
+                StreamingMode.SSE if stream_partial else StreamingMode.NONE
+            )
+        )
+        # Running executions by task id, so that they can be cancelled
+        self._running_tasks: dict[str, tuple[asyncio.Task, TaskUpdater]] = {}
 
     async def _process_request(
         self,
@@ -52,23 +71,44 @@ class QuoteExecutor(AgentExecutor):
         # (it may be the same as the one passed in if it already exists)
         session_id = session_obj.id
 
-        # Track this session as active
-        self._active_sessions.add(session_id)
-
-        try:
-            async for event in self.runner.run_async(
+        # Partial text is appended to this artifact as it arrives and then
+        # replaced by the complete final response.
+        artifact_id = str(uuid.uuid4())
+        streamed = False
+        # aclosing() unwinds the ADK run, including an in-flight tool call,
+        # as soon as the execution is cancelled.
+        async with aclosing(
+            self.runner.run_async(
                 session_id=session_id,
                 user_id=DEFAULT_USER_ID,
                 new_message=new_message,
-            ):
+                run_config=self._run_config,
+            )
+        ) as events:
+            async for event in events:
+                if event.partial:
+                    chunk = [
+                        convert_genai_part_to_a2a(part, task_updater.context_id)
+                        for part in (event.content.parts if event.content else [])
+                        if part.text
+                    ]
+                    if chunk:
+                        logger.debug('Yielding partial response')
+                        await self._add_artifact_chunk(
+                            task_updater, artifact_id, chunk, append=streamed
+                        )
+                        streamed = True
+                    continue
                 if event.is_final_response():
                     parts = [
-                        convert_genai_part_to_a2a(part)
+                        convert_genai_part_to_a2a(part, task_updater.context_id)
                         for part in event.content.parts
                         if (part.text or part.file_data or part.inline_data)
                     ]
                     logger.debug('Yielding final response: %s', parts)
-                    await task_updater.add_artifact(parts)
+                    await self._add_artifact_chunk(
+                        task_updater, artifact_id, parts, last_chunk=True
+                    )
                     await task_updater.update_status(
                         TaskState.completed, final=True
                     )
@@ -79,7 +119,7 @@ class QuoteExecutor(AgentExecutor):
                         TaskState.working,
                         message=task_updater.new_agent_message(
                             [
-                                convert_genai_part_to_a2a(part)
+                                convert_genai_part_to_a2a(part, task_updater.context_id)
                                 for part in event.content.parts
                                 if (
                                     part.text
@@ -91,9 +131,6 @@ class QuoteExecutor(AgentExecutor):
                     )
                 else:
                     logger.debug('Skipping event')
-        finally:
-            # Remove from active sessions when done
-            self._active_sessions.discard(session_id)
 
     async def execute(
         self,
@@ -102,41 +139,82 @@ class QuoteExecutor(AgentExecutor):
     ):
         # Run the agent until either complete or the task is suspended.
         updater = TaskUpdater(event_queue, context.task_id, context.context_id)
-        # Immediately notify that the task is submitted.
-        if not context.current_task:
-            await updater.update_status(TaskState.submitted)
-        await updater.update_status(TaskState.working)
-        await self._process_request(
-            types.UserContent(
-                parts=[
-                    convert_a2a_part_to_genai(part)
+        self._running_tasks[context.task_id] = (asyncio.current_task(), updater)
+        try:
+            # Immediately notify that the task is submitted.
+            if not context.current_task:
+                await updater.update_status(TaskState.submitted)
+            await updater.update_status(TaskState.working)
+            try:
+                parts = [
+                    convert_a2a_part_to_genai(part, context.context_id)
                     for part in context.message.parts
-                ],
-            ),
-            context.context_id,
-            updater,
-        )
+                ]
+            except ValueError as e:
+                # e.g. a blob URL that expired or is another conversation's
+                await updater.failed(
+                    message=updater.new_agent_message(
+                        [Part(root=TextPart(text=str(e)))]
+                    )
+                )
+                return
+            await self._process_request(
+                types.UserContent(parts=parts),
+                context.context_id,
+                updater,
+            )
+        finally:
+            self._running_tasks.pop(context.task_id, None)
         logger.debug('[quote] execute exiting')
 
     async def cancel(self, context: RequestContext, event_queue: EventQueue):
         """Cancel the execution for the given context.
 
-        Currently logs the cancellation attempt as the underlying ADK runner
-        doesn't support direct cancellation of ongoing tasks.
+        Cancels the running ADK invocation, including any in-flight tool call,
+        and reports the task as canceled.
         """
-        session_id = context.context_id
-        if session_id in self._active_sessions:
-            logger.info(
-                f'Cancellation requested for active quote session: {session_id}'
-            )
-            # TODO: Implement proper cancellation when ADK supports it
-            self._active_sessions.discard(session_id)
-        else:
+        running = self._running_tasks.pop(context.task_id, None)
+        if running is None or running[0].done():
             logger.debug(
-                f'Cancellation requested for inactive quote session: {session_id}'
+                f'Cancellation requested for inactive quote task: {context.task_id}'
             )
+            raise ServerError(error=TaskNotCancelableError())
+
+        logger.info(f'Cancelling active quote task: {context.task_id}')
+        task, updater = running
+        # Stopped first, as it could still publish its own final status
+        # while canceled is published.
+        task.cancel()
+        await asyncio.wait({task}, timeout=CANCEL_GRACE_SECONDS)
+        if task.done() and not task.cancelled():
+            # It finished before the cancellation reached it.
+            raise ServerError(error=TaskNotCancelableError())
+        # Published on the queue of the running execution, so both its
+        # subscribers and the queue tapped for this cancel request see it.
+        await updater.update_status(TaskState.canceled, final=True)
 
-        raise ServerError(error=UnsupportedOperationError())
+    async def _add_artifact_chunk(
+        self,
+        task_updater: TaskUpdater,
+        artifact_id: str,
+        parts: list[Part],
+        append: bool = False,
+        last_chunk: bool = False,
+    ) -> None:
+        """Publishes a chunk of the response artifact.
+
+        Unlike `TaskUpdater.add_artifact`, this sets `append` and `lastChunk`
+        so that streaming clients can assemble the artifact incrementally.
+        """
+        await task_updater.event_queue.enqueue_event(
+            TaskArtifactUpdateEvent(
+                taskId=task_updater.task_id,
+                contextId=task_updater.context_id,
+                append=append,
+                lastChunk=last_chunk,
+                artifact=Artifact(artifactId=artifact_id, parts=parts),
+            )
+        )
 
     async def _upsert_session(self, session_id: str) -> 'Session':
         """Retrieves a session if it exists, otherwise creates a new one.
@@ -157,43 +235,58 @@ class QuoteExecutor(AgentExecutor):
         return session
 
 
-def convert_a2a_part_to_genai(part: Part) -> types.Part:
+def convert_a2a_part_to_genai(part: Part, context_id: str) -> types.Part:
     """Convert a single A2A Part type into a Google Gen AI Part type.
 
     Args:
         part: The A2A Part to convert
+        context_id: The conversation the part was sent in
 
     Returns:
         The equivalent Google Gen AI Part
 
     Raises:
-        ValueError: If the part type is not supported
+        ValueError: If the part type is not supported, or the part refers
+            to a blob that is not one of this conversation
     """
     part = part.root
     if isinstance(part, TextPart):
         return types.Part(text=part.text)
     if isinstance(part, FilePart):
         if isinstance(part.file, FileWithUri):
+            blob_store = get_blob_store()
+            if blob_store.owns(part.file.uri):
+                # Spilled blobs are inlined straight from the memory-mapped
+                # view rather than fetched back over HTTP.
+                return types.Part(
+                    inline_data=types.Blob(
+                        data=bytes(blob_store.view(part.file.uri, context_id)),
+                        mime_type=part.file.mimeType,
+                    )
+                )
             return types.Part(
                 file_data=types.FileData(
-                    file_uri=part.file.uri, mime_type=part.file.mime_type
+                    file_uri=part.file.uri, mime_type=part.file.mimeType
                 )
             )
         if isinstance(part.file, FileWithBytes):
             return types.Part(
                 inline_data=types.Blob(
-                    data=part.file.bytes, mime_type=part.file.mime_type
+                    # a2b_base64 accepts the str as is, saving an ASCII copy
+                    data=binascii.a2b_base64(part.file.bytes),
+                    mime_type=part.file.mimeType,
                 )
             )
         raise ValueError(f'Unsupported file type: {type(part.file)}')
     raise ValueError(f'Unsupported part type: {type(part)}')
 
 
-def convert_genai_part_to_a2a(part: types.Part) -> Part:
+def convert_genai_part_to_a2a(part: types.Part, context_id: str) -> Part:
     """Convert a single Google Gen AI Part type into an A2A Part type.
 
     Args:
         part: The Google Gen AI Part to convert
+        context_id: The conversation the part is sent in
 
     Returns:
         The equivalent A2A Part
@@ -207,15 +300,28 @@ def convert_genai_part_to_a2a(part: types.Part) -> Part:
         return FilePart(
             file=FileWithUri(
                 uri=part.file_data.file_uri,
-                mime_type=part.file_data.mime_type,
+                mimeType=part.file_data.mime_type,
             )
         )
     if part.inline_data:
+        blob_store = get_blob_store()
+        if blob_store.should_spill(len(part.inline_data.data)):
+            # Large payloads are handed off as a URL the client can fetch
+            # instead of being base64 encoded into every event and kept in
+            # the task store.
+            return Part(
+                root=FilePart(
+                    file=FileWithUri(
+                        uri=blob_store.put(part.inline_data.data, context_id),
+                        mimeType=part.inline_data.mime_type,
+                    )
+                )
+            )
         return Part(
             root=FilePart(
                 file=FileWithBytes(
-                    bytes=part.inline_data.data,
-                    mime_type=part.inline_data.mime_type,
+                    bytes=base64.b64encode(part.inline_data.data).decode(),
+                    mimeType=part.inline_data.mime_type,
                 )
             )
         )
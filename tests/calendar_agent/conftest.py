@@ -0,0 +1,69 @@
+"""Fixtures of the calendar agent tests.
+
+The agent is a plain script directory, run with `uv run .`, whose modules
+import each other by bare name, so its directory is put on `sys.path`. The
+fakes the agent ships for local runs stand in for Google and the identity
+provider, served in process through `httpx.ASGITransport`.
+"""
+
+import sys
+
+from pathlib import Path
+
+import httpx
+import pytest
+
+
+AGENT_DIR = Path(__file__).resolve().parents[2] / 'calendar_agent'
+if str(AGENT_DIR) not in sys.path:
+    sys.path.append(str(AGENT_DIR))
+
+import fake_calendar_api  # noqa: E402
+import fake_identity_provider  # noqa: E402
+
+
+ISSUER = 'http://idp.test'
+CALENDAR_API_URL = 'http://calendar.test' + fake_calendar_api.API_PREFIX
+
+
+class IdentityProvider:
+    """A fake identity provider and an HTTP client of it."""
+
+    def __init__(self):
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(
+                app=fake_identity_provider.create_app(ISSUER)
+            ),
+            base_url=ISSUER,
+        )
+
+    async def token(self, **form: str) -> str:
+        """Issues an access token, see `fake_identity_provider`."""
+        response = await self.client.post('/token', data=form)
+        response.raise_for_status()
+        return response.json()['access_token']
+
+    async def stats(self) -> dict[str, int]:
+        """The number of validation calls by endpoint."""
+        return (await self.client.get('/_stats')).json()
+
+
+@pytest.fixture
+def identity_provider() -> IdentityProvider:
+    return IdentityProvider()
+
+
+@pytest.fixture
+def fake_calendar() -> fake_calendar_api.FakeCalendar:
+    return fake_calendar_api.FakeCalendar()
+
+
+@pytest.fixture
+def calendar_api(fake_calendar) -> httpx.AsyncClient:
+    """An HTTP client of the fake Calendar API serving `fake_calendar`."""
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(
+            app=fake_calendar_api.create_app(fake_calendar)
+        ),
+        base_url=CALENDAR_API_URL,
+    )
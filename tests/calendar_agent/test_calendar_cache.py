@@ -0,0 +1,225 @@
+import asyncio
+
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from calendar_agent import calendar_agent as tools
+from calendar_cache import CalendarSyncCache, IntervalIndex
+from calendar_client import CalendarClient
+from event_projection import EVENT_FIELDS
+
+
+DAY = {'time_min': '2024-09-17T00:00:00Z', 'time_max': '2024-09-18T00:00:00Z'}
+
+
+def event(summary: str, start: str, end: str) -> dict:
+    return {
+        'summary': summary,
+        'start': {'dateTime': start},
+        'end': {'dateTime': end},
+    }
+
+
+def summaries(events: list[dict]) -> list[str]:
+    return [event['summary'] for event in events]
+
+
+@pytest.fixture
+def cache(calendar_api) -> CalendarSyncCache:
+    return CalendarSyncCache(
+        CalendarClient(client=calendar_api), fields=EVENT_FIELDS, fresh_for=60
+    )
+
+
+def test_window_is_synced_once_then_served_locally(fake_calendar, cache):
+    fake_calendar.put(
+        'primary', event('Standup', '2024-09-17T09:00:00Z', '2024-09-17T09:15:00Z')
+    )
+    fake_calendar.put(
+        'primary', event('Lunch', '2024-09-17T12:00:00Z', '2024-09-17T13:00:00Z')
+    )
+
+    async def scenario():
+        return [
+            await cache.list_events('token', 'alice', limit=10, **DAY)
+            for _ in range(2)
+        ]
+
+    first, second = asyncio.run(scenario())
+
+    assert summaries(first) == summaries(second) == ['Standup', 'Lunch']
+    assert (cache.full_syncs, cache.delta_syncs, cache.local_hits) == (1, 0, 1)
+    assert fake_calendar.stats == {'full': 1}
+
+
+def test_stale_window_fetches_only_the_changes(fake_calendar, cache):
+    cache.fresh_for = 0
+    standup = fake_calendar.put(
+        'primary', event('Standup', '2024-09-17T09:00:00Z', '2024-09-17T09:15:00Z')
+    )
+
+    async def scenario():
+        before = await cache.list_events('token', 'alice', limit=10, **DAY)
+        fake_calendar.put('primary', {**standup, 'status': 'cancelled'})
+        fake_calendar.put(
+            'primary', event('Review', '2024-09-17T15:00:00Z', '2024-09-17T16:00:00Z')
+        )
+        after = await cache.list_events('token', 'alice', limit=10, **DAY)
+        return before, after
+
+    before, after = asyncio.run(scenario())
+
+    assert summaries(before) == ['Standup']
+    assert summaries(after) == ['Review']
+    assert fake_calendar.stats == {'full': 1, 'delta': 1}
+
+
+def test_new_token_of_the_user_revalidates_the_cache(fake_calendar, cache):
+    fake_calendar.put(
+        'primary', event('Standup', '2024-09-17T09:00:00Z', '2024-09-17T09:15:00Z')
+    )
+
+    async def scenario():
+        for token in ('old-token', 'new-token', 'new-token'):
+            await cache.list_events(token, 'alice', limit=10, **DAY)
+
+    asyncio.run(scenario())
+
+    # The cache outlives the token, but the new one is checked before use.
+    assert (cache.full_syncs, cache.delta_syncs, cache.local_hits) == (1, 1, 1)
+    assert fake_calendar.stats == {'full': 1, 'delta': 1}
+
+
+def test_calendar_the_token_cannot_read_is_dropped(fake_calendar, cache):
+    fake_calendar.put(
+        'team', event('Planning', '2024-09-17T10:00:00Z', '2024-09-17T11:00:00Z')
+    )
+
+    async def scenario():
+        await cache.list_events('old-token', 'alice', 'team', limit=10, **DAY)
+        shared = fake_calendar.events.pop('team')
+        with pytest.raises(httpx.HTTPStatusError):
+            await cache.list_events('new-token', 'alice', 'team', limit=10, **DAY)
+        fake_calendar.events['team'] = shared
+        return await cache.list_events('new-token', 'alice', 'team', limit=10, **DAY)
+
+    assert summaries(asyncio.run(scenario())) == ['Planning']
+    assert cache.full_syncs == 2
+
+
+def test_users_do_not_share_cached_calendars(fake_calendar, cache):
+    fake_calendar.put(
+        'primary', event('Standup', '2024-09-17T09:00:00Z', '2024-09-17T09:15:00Z')
+    )
+
+    async def scenario():
+        for user in ('alice', 'bob'):
+            await cache.list_events('token', user, limit=10, **DAY)
+
+    asyncio.run(scenario())
+
+    assert cache.full_syncs == 2
+
+
+def test_index_looks_back_by_the_longest_remaining_event():
+    index = IntervalIndex()
+    index.upsert(
+        {'id': 'trip', **event('Trip', '2024-09-10T00:00:00Z', '2024-09-20T00:00:00Z')}
+    )
+    for hour in ('09', '12'):
+        start, end = f'2024-09-17T{hour}:00:00Z', f'2024-09-17T{hour}:30:00Z'
+        index.upsert({'id': f'meeting-{hour}', **event('Meeting', start, end)})
+    window = (1726563600.0, 1726574400.0)  # 2024-09-17 09:00 to 12:00 UTC
+
+    assert [e['id'] for e in index.overlapping(*window)] == ['trip', 'meeting-09']
+    index.remove('trip')
+    assert [e['id'] for e in index.overlapping(*window)] == ['meeting-09']
+    assert index._max_duration == 30 * 60
+
+
+def call_tool(tool, *args) -> list[dict]:
+    state = {'calendar_access_token': 'token', 'calendar_user': 'alice'}
+    return asyncio.run(tool(*args, tool_context=SimpleNamespace(state=state)))
+
+
+@pytest.mark.parametrize(
+    ('start_time', 'end_time'),
+    [
+        ('2024-09-17T00:00:00', '2024-09-18T00:00:00'),
+        ('2024-09-17', '2024-09-18'),
+        ('2024-09-17T02:00:00+02:00', '2024-09-18T02:00:00+02:00'),
+        ('2024-09-17T00:00:00Z', '2024-09-18T00:00:00Z'),
+    ],
+)
+def test_tool_accepts_dates_and_offsets(
+    fake_calendar, cache, monkeypatch, start_time, end_time
+):
+    monkeypatch.setattr(tools, 'get_calendar_cache', lambda: cache)
+    fake_calendar.put(
+        'primary', event('Standup', '2024-09-17T09:00:00Z', '2024-09-17T09:15:00Z')
+    )
+
+    events = call_tool(tools.list_calendar_events, start_time, end_time, 10)
+
+    assert [event['title'] for event in events] == ['Standup']
+
+
+@pytest.mark.parametrize(
+    ('start_time', 'end_time'),
+    [('tomorrow', '2024-09-18'), ('2024-09-18', '2024-09-17')],
+)
+def test_tools_report_an_invalid_time_range(
+    cache, monkeypatch, start_time, end_time
+):
+    monkeypatch.setattr(tools, 'get_calendar_cache', lambda: cache)
+
+    single = call_tool(tools.list_calendar_events, start_time, end_time, 10)
+    several = call_tool(
+        tools.list_events_in_calendars,
+        ['primary', 'team'],
+        start_time,
+        end_time,
+        10,
+    )
+
+    for result in (single, several):
+        assert len(result) == 1
+        assert result[0]['error'].startswith('Invalid time range')
+    assert cache.full_syncs == 0
+
+
+def test_tool_reports_an_unreachable_api(monkeypatch):
+    def refuse(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError('connection refused', request=request)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(refuse))
+    cache = CalendarSyncCache(CalendarClient(client=client))
+    monkeypatch.setattr(tools, 'get_calendar_cache', lambda: cache)
+
+    events = call_tool(tools.list_calendar_events, '2024-09-17', '2024-09-18', 10)
+
+    assert events == [
+        {'error': 'Failed to list calendar events: connection refused'}
+    ]
+
+
+def test_tool_reports_the_calendars_that_failed(fake_calendar, cache, monkeypatch):
+    monkeypatch.setattr(tools, 'get_calendar_cache', lambda: cache)
+    fake_calendar.put(
+        'primary', event('Standup', '2024-09-17T09:00:00Z', '2024-09-17T09:15:00Z')
+    )
+
+    # The fake only knows the calendars it has events for, besides primary.
+    events = call_tool(
+        tools.list_events_in_calendars,
+        ['primary', 'missing'],
+        '2024-09-17',
+        '2024-09-18',
+        10,
+    )
+
+    assert [event.get('title') for event in events] == ['Standup', None]
+    assert events[1]['calendarId'] == 'missing'
+    assert '404' in events[1]['error']
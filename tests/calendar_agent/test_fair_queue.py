@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from fair_queue import FairQueue, parse_weights
+
+
+async def admission_order(queue: FairQueue, users: list[str]) -> list[str]:
+    """Queues an execution per user behind a running one, in this order."""
+    order = []
+
+    async def execution(user: str) -> None:
+        async with queue.slot(user):
+            order.append(user)
+            await asyncio.sleep(0)
+
+    async with queue.slot('first'):
+        executions = [asyncio.create_task(execution(user)) for user in users]
+        # Let every execution queue up before the slot is released.
+        await asyncio.sleep(0)
+    await asyncio.gather(*executions)
+    return order
+
+
+def test_queued_executions_of_a_user_only_delay_their_own():
+    queue = FairQueue(max_concurrent=1)
+
+    order = asyncio.run(
+        admission_order(queue, ['alice', 'alice', 'alice', 'bob'])
+    )
+
+    assert order == ['alice', 'bob', 'alice', 'alice']
+    assert (queue.running, queue._last_finish) == (0, {})
+
+
+def test_user_of_weight_two_gets_twice_the_share():
+    queue = FairQueue(max_concurrent=1, weights={'alice': 2})
+
+    order = asyncio.run(
+        admission_order(queue, ['alice'] * 4 + ['bob'] * 2)
+    )
+
+    assert order == ['alice', 'alice', 'bob', 'alice', 'alice', 'bob']
+
+
+def test_waiter_cancelled_after_the_handover_releases_the_slot():
+    queue = FairQueue(max_concurrent=1)
+    entered = []
+
+    async def execution() -> None:
+        async with queue.slot('bob'):
+            entered.append('bob')
+
+    async def scenario():
+        async with queue.slot('alice'):
+            waiter = asyncio.create_task(execution())
+            await asyncio.sleep(0)
+        # The slot is handed to bob, who is cancelled before taking it.
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(scenario())
+
+    assert entered == []
+    assert queue.running == 0
+
+
+def test_weights_are_parsed_by_user():
+    assert parse_weights(' alice=2, bob=0.5,') == {'alice': 2.0, 'bob': 0.5}
+    assert parse_weights(None) == {}
+
+
+@pytest.mark.parametrize('spec', ['alice=0', 'alice=-1', 'alice=inf', 'alice=nan'])
+def test_weights_must_be_positive(spec):
+    with pytest.raises(ValueError, match='alice'):
+        parse_weights(spec)
@@ -0,0 +1,275 @@
+import asyncio
+import time
+
+import httpx
+import oauth2_middleware
+import pytest
+
+from oauth2_middleware import (
+    INVALID_TOKEN_CACHE_SECONDS,
+    IntrospectionValidator,
+    JwksValidator,
+    OAuth2CallContextBuilder,
+    OAuth2Middleware,
+    TokenInfoValidator,
+    TokenValidator,
+)
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from .conftest import ISSUER
+
+
+AUDIENCE = 'calendar-agent'
+
+
+async def whoami(scope, receive, send):
+    user = scope['user']
+    call_context = OAuth2CallContextBuilder().build(Request(scope))
+    await JSONResponse(
+        {
+            'user': user.display_name if user.is_authenticated else None,
+            'scopes': scope['auth'].scopes,
+            'a2a_user': call_context.user.user_name,
+        }
+    )(scope, receive, send)
+
+
+def bearer(token: str) -> dict[str, str]:
+    return {'Authorization': f'Bearer {token}'}
+
+
+def agent_client(validator: TokenValidator, **options) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(
+            app=OAuth2Middleware(whoami, validator, **options)
+        ),
+        base_url='http://agent.test',
+    )
+
+
+def tokeninfo(identity_provider) -> TokenInfoValidator:
+    return TokenInfoValidator(
+        f'{ISSUER}/tokeninfo', AUDIENCE, client=identity_provider.client
+    )
+
+
+class Clock:
+    """Stands in for the `time` module of the middleware."""
+
+    def __init__(self):
+        self.offset = 0.0
+
+    def time(self) -> float:
+        return time.time() + self.offset
+
+    def monotonic(self) -> float:
+        return time.monotonic() + self.offset
+
+    def advance(self, seconds: float) -> None:
+        self.offset += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(oauth2_middleware, 'time', clock)
+    return clock
+
+
+def test_token_validator_is_abstract():
+    with pytest.raises(TypeError):
+        TokenValidator()
+
+
+def test_valid_token_is_validated_once(identity_provider):
+    async def scenario():
+        token = await identity_provider.token(sub='alice', scope='calendar')
+        async with agent_client(tokeninfo(identity_provider)) as client:
+            # Concurrent first requests share one validation.
+            responses = await asyncio.gather(
+                *(client.get('/', headers=bearer(token)) for _ in range(5))
+            )
+            responses.append(await client.get('/', headers=bearer(token)))
+        return responses, await identity_provider.stats()
+
+    responses, stats = asyncio.run(scenario())
+
+    assert [response.status_code for response in responses] == [200] * 6
+    assert responses[0].json() == {
+        'user': 'alice@example.com',
+        'scopes': ['calendar'],
+        'a2a_user': 'alice',
+    }
+    assert stats == {'tokeninfo': 1}
+
+
+def test_tokens_without_subject_do_not_share_an_identity(identity_provider):
+    async def scenario():
+        tokens = [await identity_provider.token(sub='') for _ in range(2)]
+        async with agent_client(tokeninfo(identity_provider)) as client:
+            return [
+                (await client.get('/', headers=bearer(token))).json()
+                for token in tokens + tokens[:1]
+            ]
+
+    first, second, first_again = asyncio.run(scenario())
+
+    assert first['a2a_user'].startswith('token:')
+    assert first['a2a_user'] != second['a2a_user']
+    assert first_again['a2a_user'] == first['a2a_user']
+
+
+def test_rejected_token_is_remembered_briefly(identity_provider, clock):
+    async def scenario():
+        statuses = []
+        async with agent_client(tokeninfo(identity_provider)) as client:
+            for _ in range(2):
+                response = await client.get('/', headers=bearer('bogus'))
+                statuses.append(response.status_code)
+            validations = (await identity_provider.stats())['tokeninfo']
+            clock.advance(INVALID_TOKEN_CACHE_SECONDS + 1)
+            response = await client.get('/', headers=bearer('bogus'))
+            statuses.append(response.status_code)
+        return statuses, validations, await identity_provider.stats()
+
+    statuses, validations, stats = asyncio.run(scenario())
+
+    assert statuses == [401, 401, 401]
+    assert validations == 1
+    assert stats == {'tokeninfo': 2}
+
+
+def test_validation_is_cached_until_the_token_expires(identity_provider, clock):
+    async def scenario():
+        token = await identity_provider.token(expires_in='60')
+        validations = []
+        async with agent_client(tokeninfo(identity_provider)) as client:
+            for seconds in (0, 30, 31):
+                clock.advance(seconds)
+                response = await client.get('/', headers=bearer(token))
+                assert response.status_code == 200
+                validations.append((await identity_provider.stats())['tokeninfo'])
+        return validations
+
+    assert asyncio.run(scenario()) == [1, 1, 2]
+
+
+def test_validation_is_cached_for_the_cache_ttl(identity_provider, clock):
+    async def scenario():
+        token = await identity_provider.token()
+        validations = []
+        async with agent_client(tokeninfo(identity_provider), cache_ttl=10) as client:
+            for seconds in (0, 5, 6):
+                clock.advance(seconds)
+                await client.get('/', headers=bearer(token))
+                validations.append((await identity_provider.stats())['tokeninfo'])
+        return validations
+
+    assert asyncio.run(scenario()) == [1, 1, 2]
+
+
+def test_token_for_another_audience_is_rejected(identity_provider):
+    async def scenario():
+        token = await identity_provider.token(aud='another-client')
+        async with agent_client(tokeninfo(identity_provider)) as client:
+            return await client.get('/', headers=bearer(token))
+
+    response = asyncio.run(scenario())
+
+    assert response.status_code == 401
+    assert response.json()['reason'] == 'token was issued for another client'
+
+
+def test_introspection(identity_provider):
+    validator = IntrospectionValidator(
+        f'{ISSUER}/introspect', client=identity_provider.client
+    )
+
+    async def scenario():
+        token = await identity_provider.token(sub='bob')
+        async with agent_client(validator) as client:
+            valid = [
+                await client.get('/', headers=bearer(token)) for _ in range(2)
+            ]
+            inactive = await client.get('/', headers=bearer('bogus'))
+        return valid, inactive, await identity_provider.stats()
+
+    valid, inactive, stats = asyncio.run(scenario())
+
+    assert [response.json()['user'] for response in valid] == [
+        'bob@example.com'
+    ] * 2
+    assert inactive.status_code == 401
+    assert stats == {'introspect': 2}
+
+
+def test_jwt_is_validated_with_the_cached_key_set(identity_provider):
+    validator = JwksValidator(
+        f'{ISSUER}/jwks.json', ISSUER, AUDIENCE, client=identity_provider.client
+    )
+
+    async def scenario():
+        tokens = [
+            await identity_provider.token(sub=sub, format='jwt')
+            for sub in ('alice', 'bob')
+        ]
+        foreign = await identity_provider.token(aud='another-client', format='jwt')
+        async with agent_client(validator) as client:
+            responses = [
+                await client.get('/', headers=bearer(token)) for token in tokens
+            ]
+            rejected = await client.get('/', headers=bearer(foreign))
+        return responses, rejected, await identity_provider.stats()
+
+    responses, rejected, stats = asyncio.run(scenario())
+
+    assert [response.json()['user'] for response in responses] == [
+        'alice@example.com',
+        'bob@example.com',
+    ]
+    assert rejected.status_code == 401
+    assert stats == {'jwks': 1}
+
+
+def test_missing_scope_is_forbidden(identity_provider):
+    async def scenario():
+        token = await identity_provider.token(scope='profile')
+        async with agent_client(
+            tokeninfo(identity_provider), required_scopes=['calendar']
+        ) as client:
+            return await client.get('/', headers=bearer(token))
+
+    assert asyncio.run(scenario()).status_code == 403
+
+
+def test_public_paths_and_missing_tokens(identity_provider):
+    async def scenario():
+        async with agent_client(tokeninfo(identity_provider)) as client:
+            card = await client.get('/.well-known/agent.json')
+            anonymous = await client.get('/')
+        return card, anonymous, await identity_provider.stats()
+
+    card, anonymous, stats = asyncio.run(scenario())
+
+    assert card.status_code == 200
+    assert card.json()['user'] is None
+    assert anonymous.status_code == 401
+    assert anonymous.headers['WWW-Authenticate'] == 'Bearer'
+    assert stats == {}
+
+
+def test_unreachable_issuer_is_unavailable():
+    def refuse(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError('connection refused', request=request)
+
+    validator = TokenInfoValidator(
+        f'{ISSUER}/tokeninfo',
+        client=httpx.AsyncClient(transport=httpx.MockTransport(refuse)),
+    )
+
+    async def scenario():
+        async with agent_client(validator) as client:
+            return await client.get('/', headers=bearer('token'))
+
+    assert asyncio.run(scenario()).status_code == 503
@@ -0,0 +1,63 @@
+import asyncio
+
+import httpx
+
+from oauth2_middleware import OAuth2Middleware, TokenInfoValidator
+from rate_limit import RateLimitMiddleware, TokenBucketLimiter
+from starlette.responses import PlainTextResponse
+
+from .conftest import ISSUER
+
+
+async def ok(scope, receive, send):
+    await PlainTextResponse('ok')(scope, receive, send)
+
+
+def limited_client(identity_provider) -> httpx.AsyncClient:
+    """A client of an app allowing one request per user, then one a minute."""
+    app = OAuth2Middleware(
+        RateLimitMiddleware(ok, TokenBucketLimiter(rate=1 / 60, burst=1)),
+        TokenInfoValidator(f'{ISSUER}/tokeninfo', client=identity_provider.client),
+    )
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url='http://agent.test'
+    )
+
+
+async def statuses(client: httpx.AsyncClient, tokens: list[str]) -> list[int]:
+    return [
+        (
+            await client.get('/', headers={'Authorization': f'Bearer {token}'})
+        ).status_code
+        for token in tokens
+    ]
+
+
+def test_users_are_limited_by_subject(identity_provider):
+    async def scenario():
+        alice = await identity_provider.token(sub='alice')
+        # Another token of the same subject shares the bucket.
+        alice_again = await identity_provider.token(sub='alice')
+        bob = await identity_provider.token(sub='bob')
+        async with limited_client(identity_provider) as client:
+            return await statuses(client, [alice, bob, alice_again])
+
+    assert asyncio.run(scenario()) == [200, 200, 429]
+
+
+def test_tokens_without_subject_are_limited_apart(identity_provider):
+    async def scenario():
+        first = await identity_provider.token(sub='')
+        second = await identity_provider.token(sub='')
+        async with limited_client(identity_provider) as client:
+            return await statuses(client, [first, second, first])
+
+    assert asyncio.run(scenario()) == [200, 200, 429]
+
+
+def test_limited_response_says_when_to_retry():
+    limiter = TokenBucketLimiter(rate=0.5, burst=2)
+
+    assert [limiter.acquire('alice') for _ in range(2)] == [0.0, 0.0]
+    assert 1.9 < limiter.acquire('alice') <= 2.0
+    assert limiter.acquire('bob') == 0.0
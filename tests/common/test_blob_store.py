@@ -0,0 +1,75 @@
+import asyncio
+
+import httpx
+import pytest
+
+from agent_common import blob_store as blob_store_module
+from agent_common.blob_store import ROUTE, BlobStore, blob_endpoint
+from starlette.applications import Starlette
+from starlette.routing import Route
+
+
+BASE_URL = 'http://agent.test/'
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch) -> BlobStore:
+    monkeypatch.delenv('A2A_BLOB_SECRET', raising=False)
+    store = BlobStore(root=str(tmp_path), threshold=1, base_url=BASE_URL)
+    monkeypatch.setattr(blob_store_module, '_blob_store', store)
+    return store
+
+
+def fetch(*urls: str) -> list[httpx.Response]:
+    app = Starlette(routes=[Route(ROUTE, blob_endpoint, methods=['GET'])])
+
+    async def scenario():
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url=BASE_URL
+        ) as client:
+            return [await client.get(url) for url in urls]
+
+    return asyncio.run(scenario())
+
+
+def test_signed_url_is_served(store):
+    (response,) = fetch(store.put(b'payload', 'context'))
+
+    assert (response.status_code, response.content) == (200, b'payload')
+
+
+def test_unsigned_or_altered_urls_are_refused(store):
+    url = store.put(b'payload', 'context')
+    other = store.put(b'other', 'context')
+    path, _, query = url.partition('?')
+
+    responses = fetch(
+        path,
+        f'{other.partition("?")[0]}?{query}',
+        url.replace('expires=', 'expires=1'),
+    )
+
+    assert [response.status_code for response in responses] == [403, 403, 403]
+
+
+def test_url_expires(store, monkeypatch):
+    url = store.put(b'payload', 'context')
+    now = blob_store_module.time.time()
+    monkeypatch.setattr(
+        blob_store_module.time, 'time', lambda: now + store.ttl + 1
+    )
+
+    (response,) = fetch(url)
+
+    assert response.status_code == 403
+
+
+def test_stores_sharing_a_directory_share_the_secret(store, monkeypatch):
+    url = store.put(b'payload', 'context')
+    # As the store of another worker process, serving the URL
+    other = BlobStore(root=str(store.root), base_url=BASE_URL)
+    monkeypatch.setattr(blob_store_module, '_blob_store', other)
+
+    (response,) = fetch(url)
+
+    assert response.status_code == 200
@@ -0,0 +1,14 @@
+"""Fixtures of the host agent tests.
+
+The agent is a plain script directory whose modules import each other by
+bare name, so its directory is put on `sys.path`.
+"""
+
+import sys
+
+from pathlib import Path
+
+
+AGENT_DIR = Path(__file__).resolve().parents[2] / 'host_agent'
+if str(AGENT_DIR) not in sys.path:
+    sys.path.append(str(AGENT_DIR))
@@ -0,0 +1,48 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from traffic_replay import send_one
+
+
+def sse(*payloads: dict) -> bytes:
+    return ''.join(f'data: {json.dumps(payload)}\n\n' for payload in payloads).encode()
+
+
+def replay_one(response: httpx.Response) -> dict:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda _: response))
+    body = {'jsonrpc': '2.0', 'id': 1, 'method': 'message/stream'}
+    return asyncio.run(send_one(client, 'http://agent.test/', body, {}))
+
+
+STREAM = {'content-type': 'text/event-stream'}
+FAILURE = {'jsonrpc': '2.0', 'id': 1, 'error': {'code': -32001}}
+REPLY = {
+    'jsonrpc': '2.0',
+    'id': 1,
+    'result': {
+        'kind': 'status-update',
+        'status': {'state': 'completed'},
+        # Words and keys of the reply itself are not errors.
+        'metadata': {'error': 'none', 'text': 'No "error" found'},
+    },
+}
+
+
+@pytest.mark.parametrize(
+    ('response', 'error'),
+    [
+        (httpx.Response(200, headers=STREAM, content=sse(REPLY)), None),
+        (
+            httpx.Response(200, headers=STREAM, content=sse(REPLY, FAILURE)),
+            'rpc_-32001',
+        ),
+        (httpx.Response(200, json=REPLY), None),
+        (httpx.Response(200, json={'error': {'code': -32600}}), 'rpc_-32600'),
+        (httpx.Response(503), 'http_503'),
+    ],
+)
+def test_errors_are_read_from_the_json_rpc_responses(response, error):
+    assert replay_one(response)['error'] == error
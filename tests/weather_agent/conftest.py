@@ -0,0 +1,25 @@
+"""Fixtures of the weather agent tests.
+
+The agent is a plain script directory whose modules import each other by
+bare name, so its directory is put on `sys.path`.
+"""
+
+import sys
+
+from pathlib import Path
+
+import pytest
+
+
+AGENT_DIR = Path(__file__).resolve().parents[2] / 'weather_agent'
+if str(AGENT_DIR) not in sys.path:
+    sys.path.append(str(AGENT_DIR))
+
+from gazetteer import Gazetteer  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def gazetteer():
+    gazetteer = Gazetteer()
+    yield gazetteer
+    gazetteer.close()
@@ -0,0 +1,44 @@
+import pytest
+
+
+SEATTLE = (47.6062, -122.3321)
+
+
+def rounded(location):
+    return location and tuple(round(degrees, 4) for degrees in location)
+
+
+@pytest.mark.parametrize(
+    ('city', 'state'),
+    [
+        ('Seattle', 'WA'),
+        ('seattle', ' wa '),
+        ('Seatle', 'WA'),
+        ('Seattlee', 'WA'),
+        ('Seatlte', 'WA'),
+    ],
+)
+def test_city_and_near_typos_are_found(gazetteer, city, state):
+    assert rounded(gazetteer.lookup(city, state)) == SEATTLE
+
+
+@pytest.mark.parametrize(
+    ('city', 'state'),
+    [
+        # Not bundled, and one letter short of Milton, WA.
+        ('Hamilton', 'WA'),
+        ('Eattle', 'WA'),
+        ('Seattle', 'OR'),
+        ('Saettel', 'WA'),
+        ('', 'WA'),
+    ],
+)
+def test_other_names_are_left_to_the_geocoder(gazetteer, city, state):
+    assert gazetteer.lookup(city, state) is None
+
+
+def test_abbreviations_are_spelled_out(gazetteer):
+    assert gazetteer.lookup('St. Louis', 'MO') == gazetteer.lookup(
+        'Saint Louis', 'MO'
+    )
+    assert gazetteer.lookup('St. Louis', 'MO') is not None
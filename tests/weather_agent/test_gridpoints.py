@@ -0,0 +1,62 @@
+import asyncio
+
+import httpx
+import pytest
+import weather_mcp
+
+from gridpoints import GridpointCache
+from response_cache import ResponseCache
+
+
+FORECAST_URL = 'https://api.weather.gov/gridpoints/SEW/124,67/forecast'
+MOVED_URL = 'https://api.weather.gov/gridpoints/SEW/125,68/forecast'
+
+
+@pytest.fixture
+def gridpoints(tmp_path):
+    gridpoints = GridpointCache(tmp_path / 'gridpoints.db', max_points=2)
+    yield gridpoints
+    gridpoints.close()
+
+
+def test_points_beyond_the_memory_bound_are_read_from_disk(gridpoints):
+    for i in range(3):
+        gridpoints.store_point(47.0 + i, -122.0, FORECAST_URL)
+
+    assert len(gridpoints._points) == 2
+    assert gridpoints.forecast_url(47.0, -122.0) == FORECAST_URL
+    # Reading the first point back made the second the least recently used.
+    assert list(gridpoints._points) == ['49.0000,-122.0000', '47.0000,-122.0000']
+
+
+def test_discard_forgets_every_point_of_the_url(gridpoints, tmp_path):
+    gridpoints.store_point(47.6062, -122.3321, FORECAST_URL)
+    gridpoints.store_point(47.6097, -122.3331, FORECAST_URL)
+    gridpoints.store_point(47.0, -122.0, MOVED_URL)
+
+    gridpoints.discard(FORECAST_URL)
+    reopened = GridpointCache(tmp_path / 'gridpoints.db')
+
+    for cache in (gridpoints, reopened):
+        assert cache.forecast_url(47.6062, -122.3321) is None
+        assert cache.forecast_url(47.6097, -122.3331) is None
+        assert cache.forecast_url(47.0, -122.0) == MOVED_URL
+    reopened.close()
+
+
+@pytest.mark.parametrize(('status', 'discarded'), [(404, True), (503, False)])
+def test_only_a_missing_forecast_is_discarded(
+    gridpoints, monkeypatch, status, discarded
+):
+    def nws(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(status, json={'status': status})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(nws))
+    monkeypatch.setattr(weather_mcp, 'nws_cache', ResponseCache(client))
+    monkeypatch.setattr(weather_mcp, 'gridpoints', gridpoints)
+    gridpoints.store_point(47.6062, -122.3321, FORECAST_URL)
+
+    result = asyncio.run(weather_mcp.get_forecast_periods(47.6062, -122.3321))
+
+    assert result == 'Failed to retrieve detailed forecast data from NWS.'
+    assert (gridpoints.forecast_url(47.6062, -122.3321) is None) == discarded
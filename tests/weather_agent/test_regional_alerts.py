@@ -0,0 +1,39 @@
+import asyncio
+
+import httpx
+import pytest
+import weather_mcp
+
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def nws_requests(monkeypatch) -> list[httpx.Request]:
+    requests = []
+
+    def nws(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={'features': []})
+
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(nws), base_url=weather_mcp.BASE_URL
+    )
+    monkeypatch.setattr(weather_mcp, 'nws_cache', ResponseCache(client))
+    return requests
+
+
+@pytest.mark.parametrize(
+    'point', ['91,0', '-90.5,10', '47.6,181', '0,-180.01', 'nan,0']
+)
+def test_point_out_of_range_is_rejected(nws_requests, point):
+    result = asyncio.run(weather_mcp.get_regional_alerts(point=point))
+
+    assert result.startswith('Invalid point. Latitude must be between -90 and 90')
+    assert nws_requests == []
+
+
+def test_point_in_range_is_queried(nws_requests):
+    result = asyncio.run(weather_mcp.get_regional_alerts(point='47.61,-122.33'))
+
+    assert result == 'No active weather alerts found for 47.6100,-122.3300.'
+    assert nws_requests[0].url.params['point'] == '47.6100,-122.3300'
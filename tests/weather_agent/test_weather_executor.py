@@ -0,0 +1,61 @@
+import asyncio
+
+from a2a.server.agent_execution.context import RequestContext
+from a2a.server.events.event_queue import EventQueue
+from a2a.server.tasks import TaskUpdater
+from a2a.types import TaskState, TaskStatusUpdateEvent
+from a2a.utils.errors import ServerError
+from weather_executor import WeatherExecutor
+
+
+def final_states(queue: EventQueue) -> list[TaskState]:
+    states = []
+    while not queue.queue.empty():
+        event = queue.queue.get_nowait()
+        if isinstance(event, TaskStatusUpdateEvent) and event.final:
+            states.append(event.status.state)
+    return states
+
+
+async def cancel_execution(completes: bool) -> tuple[list[TaskState], bool]:
+    """Cancels a running execution, which `completes` instead if asked to.
+
+    Returns:
+        The final states published, and whether the cancel was accepted.
+    """
+    executor = WeatherExecutor(runner=None, card=None)
+    queue = EventQueue()
+    updater = TaskUpdater(queue, 'task-1', 'context-1')
+
+    async def execution():
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            if not completes:
+                raise
+            # Past the point of no return, e.g. publishing its response.
+            await updater.complete()
+
+    task = asyncio.create_task(execution())
+    executor._running_tasks['task-1'] = (task, updater)
+    await asyncio.sleep(0)
+    context = RequestContext(None, task_id='task-1', context_id='context-1')
+    try:
+        await executor.cancel(context, queue)
+    except ServerError:
+        return final_states(queue), False
+    return final_states(queue), True
+
+
+def test_cancel_publishes_canceled_once_the_execution_stopped():
+    assert asyncio.run(cancel_execution(completes=False)) == (
+        [TaskState.canceled],
+        True,
+    )
+
+
+def test_execution_that_completes_is_not_canceled_too():
+    assert asyncio.run(cancel_execution(completes=True)) == (
+        [TaskState.completed],
+        False,
+    )
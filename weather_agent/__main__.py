@@ -1,3 +1,4 @@
+import functools
 import logging
 import os
 
@@ -6,12 +7,26 @@ import uvicorn
 
 from a2a.server.apps import A2AStarletteApplication
 from a2a.server.request_handlers import DefaultRequestHandler
-from a2a.server.tasks import InMemoryTaskStore
 from a2a.types import (
     AgentCapabilities,
     AgentCard,
     AgentSkill,
 )
+from agent_common.blob_store import ROUTE, blob_endpoint, get_blob_store
+from agent_common.bounded_adk_services import (
+    BoundedArtifactService,
+    BoundedMemoryService,
+    BoundedSessionService,
+)
+from agent_common.bounded_store import (
+    DEFAULT_IDLE_TTL_SECONDS,
+    DEFAULT_MAX_BYTES,
+    DEFAULT_MAX_ENTRIES,
+    BoundedTaskStore,
+    metrics_endpoint,
+)
+from agent_common.multiworker import DEFAULT_WORKERS, run_workers
+from agent_common.sqlite_task_store import SqliteTaskStore
 from weather_agent import (
     create_weather_agent,
 )
@@ -19,10 +34,7 @@ from weather_executor import (
     WeatherExecutor,
 )
 from dotenv import load_dotenv
-from google.adk.artifacts import InMemoryArtifactService
-from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
 
 
 load_dotenv()
@@ -33,7 +45,17 @@ DEFAULT_HOST = 'localhost'
 DEFAULT_PORT = 10001
 
 
-def main(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+def main(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    stream_partial: bool = False,
+    store_ttl: float = DEFAULT_IDLE_TTL_SECONDS,
+    store_max_entries: int = DEFAULT_MAX_ENTRIES,
+    store_max_bytes: int = DEFAULT_MAX_BYTES,
+    task_db: str | None = None,
+    workers: int = DEFAULT_WORKERS,
+    uds: str | None = None,
+):
     # Verify an API key is set.
     # Not required if using Vertex AI APIs.
     if os.getenv('GOOGLE_GENAI_USE_VERTEXAI') != 'TRUE' and not os.getenv(
@@ -44,6 +66,25 @@ def main(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
             'GOOGLE_GENAI_USE_VERTEXAI is not TRUE.'
         )
 
+    if workers > 1:
+        # Every worker runs this function again, on its own unix socket.
+        run_workers(
+            functools.partial(
+                main,
+                host,
+                port,
+                stream_partial,
+                store_ttl,
+                store_max_entries,
+                store_max_bytes,
+                task_db,
+            ),
+            host,
+            port,
+            workers,
+        )
+        return
+
     skill = AgentSkill(
         id='weather_search',
         name='Search weather',
@@ -63,33 +104,116 @@ def main(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
         skills=[skill],
     )
 
+    # Every in-memory store evicts idle and least recently used entries, so
+    # that memory stays flat on a long running server.
+    store_limits = {
+        'idle_ttl': store_ttl,
+        'max_entries': store_max_entries,
+        'max_bytes': store_max_bytes,
+    }
     adk_agent = create_weather_agent()
     runner = Runner(
         app_name=agent_card.name,
         agent=adk_agent,
-        artifact_service=InMemoryArtifactService(),
-        session_service=InMemorySessionService(),
-        memory_service=InMemoryMemoryService(),
+        artifact_service=BoundedArtifactService(**store_limits),
+        session_service=BoundedSessionService(**store_limits),
+        memory_service=BoundedMemoryService(**store_limits),
     )
-    agent_executor = WeatherExecutor(runner, agent_card)
+    agent_executor = WeatherExecutor(
+        runner, agent_card, stream_partial=stream_partial
+    )
+
+    if task_db:
+        # Durable tasks, shared by every server process using the same file
+        task_store = SqliteTaskStore(task_db)
+    else:
+        task_store = BoundedTaskStore(**store_limits)
 
     request_handler = DefaultRequestHandler(
-        agent_executor=agent_executor, task_store=InMemoryTaskStore()
+        agent_executor=agent_executor, task_store=task_store
     )
 
     a2a_app = A2AStarletteApplication(
         agent_card=agent_card, http_handler=request_handler
     )
 
-    uvicorn.run(a2a_app.build(), host=host, port=port)
+    app = a2a_app.build()
+    app.add_route('/metrics', metrics_endpoint, methods=['GET'])
+    # Large file parts are handed to clients as URLs of this route
+    get_blob_store().base_url = agent_card.url
+    app.add_route(ROUTE, blob_endpoint, methods=['GET'])
+    if task_db:
+        app.add_event_handler('shutdown', task_store.close)
+
+    uvicorn.run(app, host=host, port=port, uds=uds)
 
 
 @click.command()
 @click.option('--host', 'host', default=DEFAULT_HOST)
 @click.option('--port', 'port', default=DEFAULT_PORT)
-def cli(host: str, port: int):
-    main(host, port)
+@click.option(
+    '--stream-partial',
+    'stream_partial',
+    is_flag=True,
+    envvar='A2A_STREAM_PARTIAL',
+    help='Stream partial model output as artifact chunks over message/stream.',
+)
+@click.option(
+    '--store-ttl',
+    'store_ttl',
+    default=DEFAULT_IDLE_TTL_SECONDS,
+    envvar='A2A_STORE_TTL',
+    help='Seconds after which idle tasks, sessions and artifacts are evicted.',
+)
+@click.option(
+    '--store-max-entries',
+    'store_max_entries',
+    default=DEFAULT_MAX_ENTRIES,
+    envvar='A2A_STORE_MAX_ENTRIES',
+    help='Maximum number of entries per in-memory store, 0 for no limit.',
+)
+@click.option(
+    '--store-max-bytes',
+    'store_max_bytes',
+    default=DEFAULT_MAX_BYTES,
+    envvar='A2A_STORE_MAX_BYTES',
+    help='Maximum size in bytes per in-memory store, 0 for no limit.',
+)
+@click.option(
+    '--task-db',
+    'task_db',
+    default=None,
+    envvar='A2A_TASK_DB',
+    help='Keep tasks in this SQLite database instead of in memory.',
+)
+@click.option(
+    '--workers',
+    'workers',
+    default=DEFAULT_WORKERS,
+    envvar='A2A_WORKERS',
+    help='Server processes to run; each conversation stays on one of them.',
+)
+def cli(
+    host: str,
+    port: int,
+    stream_partial: bool,
+    store_ttl: float,
+    store_max_entries: int,
+    store_max_bytes: int,
+    task_db: str | None,
+    workers: int,
+):
+    main(
+        host,
+        port,
+        stream_partial,
+        store_ttl,
+        store_max_entries,
+        store_max_bytes,
+        task_db,
+        workers,
+    )
 
 
 if __name__ == '__main__':
-    main()
+    cli()
@@ -0,0 +1,87 @@
+"""Builds data/us_places.bin, the offline gazetteer used by weather_mcp.py.
+
+The places are the US cities of GeoNames (CC BY 4.0), as packaged by
+geonamescache, which is only needed to run this script:
+
+    uv run --with geonamescache build_gazetteer.py --min-population 5000
+"""
+
+import array
+import sys
+
+from pathlib import Path
+
+import click
+import geonamescache
+
+from gazetteer import DEFAULT_PATH, HEADER, MAGIC, VERSION, normalize_name
+
+
+DEFAULT_MIN_POPULATION = 5000
+
+
+def build(path: Path, min_population: int) -> int:
+    cities = geonamescache.GeonamesCache(
+        min_city_population=min(min_population, 1000)
+    ).get_cities()
+    places = {}
+    for city in cities.values():
+        if city["countrycode"] != "US" or city["population"] < min_population:
+            continue
+        key = (normalize_name(city["name"]), city["admin1code"])
+        # The most populous place wins when one name is used twice in a state.
+        if key not in places or city["population"] > places[key]["population"]:
+            places[key] = city
+    # "New York" for "New York City", unless a place is already named so.
+    for (name, state), city in list(places.items()):
+        if name.endswith(" city"):
+            places.setdefault((name.removesuffix(" city"), state), city)
+    # By name, then by decreasing population, as Gazetteer.lookup expects
+    ordered = sorted(
+        places.items(),
+        key=lambda item: (item[0][0].encode(), -item[1]["population"]),
+    )
+
+    names = bytearray()
+    offsets = array.array("I", [0])
+    latitudes = array.array("f")
+    longitudes = array.array("f")
+    populations = array.array("I")
+    states = bytearray()
+    for (name, state), city in ordered:
+        names += name.encode()
+        offsets.append(len(names))
+        latitudes.append(city["latitude"])
+        longitudes.append(city["longitude"])
+        populations.append(city["population"])
+        states += state.encode("ascii")[:2].ljust(2)
+
+    columns = (offsets, latitudes, longitudes, populations)
+    if sys.byteorder != "little":
+        for column in columns:
+            column.byteswap()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(ordered), len(names)))
+        for column in columns:
+            file.write(column.tobytes())
+        file.write(states)
+        file.write(names)
+    return len(ordered)
+
+
+@click.command()
+@click.option("--output", "output", default=str(DEFAULT_PATH))
+@click.option(
+    "--min-population",
+    "min_population",
+    default=DEFAULT_MIN_POPULATION,
+    help="Leave out smaller places, which are geocoded online instead.",
+)
+def cli(output: str, min_population: int):
+    count = build(Path(output), min_population)
+    click.echo(f"Wrote {count} places to {output}")
+
+
+if __name__ == "__main__":
+    cli()
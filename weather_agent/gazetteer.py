@@ -0,0 +1,153 @@
+import bisect
+import mmap
+import struct
+import unicodedata
+
+from pathlib import Path
+
+
+DEFAULT_PATH = Path(__file__).parent / "data" / "us_places.bin"
+MAGIC = b"USGZ"
+VERSION = 1
+# magic, version, number of places, size of the names blob
+HEADER = struct.Struct("<4sIII")
+# Abbreviations spelled out, so that "St. Louis" and "Saint Louis" match
+_ABBREVIATIONS = {"st": "saint", "ste": "sainte", "ft": "fort", "mt": "mount"}
+
+
+def _within_one_edit(a: bytes, b: bytes) -> bool:
+    """Whether two names differ by one typo at most.
+
+    A typo is an inserted, deleted or replaced character, or two adjacent
+    characters swapped.
+    """
+    if abs(len(a) - len(b)) > 1:
+        return False
+    # Skip the common prefix and suffix, what is left must be one edit.
+    prefix = 0
+    while prefix < min(len(a), len(b)) and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while (
+        suffix < min(len(a), len(b)) - prefix
+        and a[len(a) - 1 - suffix] == b[len(b) - 1 - suffix]
+    ):
+        suffix += 1
+    a_rest, b_rest = a[prefix : len(a) - suffix], b[prefix : len(b) - suffix]
+    if len(a_rest) <= 1 and len(b_rest) <= 1:
+        return True
+    return len(a_rest) == len(b_rest) == 2 and a_rest == b_rest[::-1]
+
+
+def normalize_name(name: str) -> str:
+    """Case folds a place name and strips its accents and punctuation."""
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    words = (
+        "".join(
+            c if c.isalnum() else " "
+            for c in decomposed
+            if not unicodedata.combining(c) and c != "."
+        )
+        .split()
+    )
+    return " ".join(_ABBREVIATIONS.get(word, word) for word in words)
+
+
+class _SortedNames:
+    """A sequence view of the names blob, for bisect."""
+
+    def __init__(self, blob: memoryview, offsets: memoryview):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> bytes:
+        return bytes(self._blob[self._offsets[index] : self._offsets[index + 1]])
+
+
+class Gazetteer:
+    """An offline index of US places, memory-mapped from a column file.
+
+    The file, written by build_gazetteer.py, holds the places sorted by
+    normalized name, and by decreasing population for the same name, as
+    columns: name offsets, latitudes, longitudes, populations and state
+    codes, then the names. Columns are used in place through memoryviews,
+    so loading only maps the file; lookups bisect the sorted names.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_PATH):
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, version, count, names_size = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} gazetteer")
+        offset = HEADER.size
+
+        def column(fmt: str, itemsize: int, length: int) -> memoryview:
+            nonlocal offset
+            data = view[offset : offset + itemsize * length]
+            offset += itemsize * length
+            return data.cast(fmt) if fmt != "B" else data
+
+        offsets = column("I", 4, count + 1)
+        self.latitudes = column("f", 4, count)
+        self.longitudes = column("f", 4, count)
+        self.populations = column("I", 4, count)
+        self.states = column("B", 2, count)
+        self.names = _SortedNames(view[offset : offset + names_size], offsets)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def state_of(self, index: int) -> str:
+        return bytes(self.states[2 * index : 2 * index + 2]).decode("ascii")
+
+    def lookup(self, city: str, state: str) -> tuple[float, float] | None:
+        """Returns the latitude and longitude of a city, None if unknown.
+
+        The most populous place of that name in the state is taken. A name
+        that is not found is matched to a name of the state one typo away,
+        with the same first letter, so that a place missing from the file
+        ("Hamilton") is left to the geocoder rather than taken for another
+        ("Milton").
+        """
+        name = normalize_name(city).encode()
+        state = state.strip().upper()
+        index = self._find(name, state)
+        if index is None:
+            index = self._find_close(name, state)
+        if index is None:
+            return None
+        return float(self.latitudes[index]), float(self.longitudes[index])
+
+    def _find(self, name: bytes, state: str) -> int | None:
+        index = bisect.bisect_left(self.names, name)
+        while index < len(self.names) and self.names[index] == name:
+            if self.state_of(index) == state:
+                return index
+            index += 1
+        return None
+
+    def _find_close(self, name: bytes, state: str) -> int | None:
+        if not name:
+            return None
+        # The names of the same first letter are a contiguous range.
+        low = bisect.bisect_left(self.names, name[:1])
+        high = bisect.bisect_left(self.names, bytes([name[0] + 1]))
+        best = None
+        for index in range(low, high):
+            if (
+                self.state_of(index) == state
+                and _within_one_edit(name, self.names[index])
+                and (best is None or self.populations[index] > self.populations[best])
+            ):
+                best = index
+        return best
+
+    def close(self) -> None:
+        self.names = None
+        self.latitudes = self.longitudes = self.populations = self.states = None
+        self._mmap.close()
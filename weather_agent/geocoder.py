@@ -0,0 +1,130 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from pathlib import Path
+
+from geopy.geocoders.base import Geocoder
+
+
+# Nominatim's usage policy allows at most one request per second
+DEFAULT_MIN_INTERVAL_SECONDS = 1.0
+# Places that were not found are looked up again after this long
+NOT_FOUND_TTL_SECONDS = 24 * 3600.0
+GEOCODE_TIMEOUT = 10.0
+
+
+def default_cache_path() -> Path:
+    return Path(
+        os.getenv("WEATHER_GEOCODE_DB")
+        or Path(tempfile.gettempdir()) / "a2a-weather" / "geocode.db"
+    )
+
+
+def normalize_place(city: str, state: str) -> str:
+    """The cache key of a city: case folded, single spaced, with its state."""
+    return f"{' '.join(city.split()).casefold()}|{state.strip().upper()}"
+
+
+class RateGovernor:
+    """Spaces out calls to at most one per `min_interval` seconds."""
+
+    def __init__(self, min_interval: float = DEFAULT_MIN_INTERVAL_SECONDS):
+        self.min_interval = min_interval
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            delay = self._next_slot - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_slot = time.monotonic() + self.min_interval
+
+
+class CachedGeocoder:
+    """Geocodes US cities off the event loop, with a persistent cache.
+
+    Results, including places that were not found, are kept in a SQLite
+    database and in memory, so a repeated lookup is a dictionary lookup.
+    Misses are sent to the geocoder in a worker thread, spaced out by a
+    RateGovernor, and concurrent misses for the same place share one
+    request.
+    """
+
+    def __init__(
+        self,
+        geolocator: Geocoder,
+        path: str | os.PathLike | None = None,
+        min_interval: float = DEFAULT_MIN_INTERVAL_SECONDS,
+    ):
+        self.geolocator = geolocator
+        self.path = Path(path) if path else default_cache_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.governor = RateGovernor(min_interval)
+        # Key -> ((latitude, longitude) or None if not found, time stored)
+        self._memory: dict[str, tuple[tuple[float, float] | None, float]] = {}
+        self._pending: dict[str, asyncio.Future] = {}
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocodes ("
+            " key TEXT PRIMARY KEY, latitude REAL, longitude REAL,"
+            " updated_at REAL NOT NULL) WITHOUT ROWID"
+        )
+        for key, latitude, longitude, updated_at in self._conn.execute(
+            "SELECT key, latitude, longitude, updated_at FROM geocodes"
+        ):
+            point = None if latitude is None else (latitude, longitude)
+            self._memory[key] = (point, updated_at)
+
+    async def geocode(self, city: str, state: str) -> tuple[float, float] | None:
+        """Returns the latitude and longitude of a US city, None if not found.
+
+        Raises:
+            geopy.exc.GeopyError: If the geocoding service failed.
+        """
+        key = normalize_place(city, state)
+        cached = self._memory.get(key)
+        if cached is not None:
+            point, updated_at = cached
+            if point is not None or time.time() - updated_at < NOT_FOUND_TTL_SECONDS:
+                return point
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._lookup(key, city, state))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _lookup(
+        self, key: str, city: str, state: str
+    ) -> tuple[float, float] | None:
+        await self.governor.wait()
+        return await asyncio.to_thread(self._geocode_and_store, key, city, state)
+
+    def _geocode_and_store(
+        self, key: str, city: str, state: str
+    ) -> tuple[float, float] | None:
+        location = self.geolocator.geocode(
+            f"{' '.join(city.split())}, {state.strip().upper()}, USA",
+            timeout=GEOCODE_TIMEOUT,
+        )
+        point = None if location is None else (location.latitude, location.longitude)
+        updated_at = time.time()
+        with self._db_lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?)",
+                (key, *(point or (None, None)), updated_at),
+            )
+        self._memory[key] = (point, updated_at)
+        return point
+
+    def close(self) -> None:
+        with self._db_lock:
+            self._conn.close()
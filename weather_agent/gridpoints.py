@@ -0,0 +1,216 @@
+import json
+import math
+import os
+import sqlite3
+import tempfile
+import time
+
+from collections import OrderedDict
+from pathlib import Path
+
+
+# The office/grid of a point practically never changes
+GRIDPOINT_TTL_SECONDS = 30 * 24 * 3600.0
+# Points kept in memory, least recently used first out; the others are
+# read back from disk when asked for
+DEFAULT_MAX_POINTS = 10_000
+# Size of the spatial hash buckets, in degrees; NWS grid cells are 2.5 km
+BUCKET_DEGREES = 0.05
+
+
+def default_cache_path() -> Path:
+    return Path(
+        os.getenv("WEATHER_GRIDPOINT_DB")
+        or Path(tempfile.gettempdir()) / "a2a-weather" / "gridpoints.db"
+    )
+
+
+def point_key(latitude: float, longitude: float) -> str:
+    """The cache key of a point: rounded to the 4 decimals NWS uses."""
+    return f"{latitude:.4f},{longitude:.4f}"
+
+
+def _bucket(latitude: float, longitude: float) -> tuple[int, int]:
+    return (
+        math.floor(latitude / BUCKET_DEGREES),
+        math.floor(longitude / BUCKET_DEGREES),
+    )
+
+
+def _contains(ring: list[list[float]], latitude: float, longitude: float) -> bool:
+    """Whether a GeoJSON ring of [longitude, latitude] pairs holds a point."""
+    inside = False
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+        if (y1 > latitude) != (y2 > latitude) and longitude < (x2 - x1) * (
+            latitude - y1
+        ) / (y2 - y1) + x1:
+            inside = not inside
+    return inside
+
+
+class _Cell:
+    """A forecast grid cell, with the bounding box of its polygon."""
+
+    __slots__ = ("forecast_url", "ring", "south", "west", "north", "east")
+
+    def __init__(self, forecast_url: str, ring: list[list[float]]):
+        self.forecast_url = forecast_url
+        self.ring = ring
+        self.west = min(x for x, _ in ring)
+        self.east = max(x for x, _ in ring)
+        self.south = min(y for _, y in ring)
+        self.north = max(y for _, y in ring)
+
+    def buckets(self):
+        south_west = _bucket(self.south, self.west)
+        north_east = _bucket(self.north, self.east)
+        for i in range(south_west[0], north_east[0] + 1):
+            for j in range(south_west[1], north_east[1] + 1):
+                yield i, j
+
+    def contains(self, latitude: float, longitude: float) -> bool:
+        return (
+            self.south <= latitude <= self.north
+            and self.west <= longitude <= self.east
+            and _contains(self.ring, latitude, longitude)
+        )
+
+
+class GridpointCache:
+    """Remembers the NWS forecast URL of points, on disk and in memory.
+
+    `/points/{lat},{lon}` is only needed to find the forecast URL of the
+    grid cell a point falls in. The URLs are kept by point, rounded to 4
+    decimals, for GRIDPOINT_TTL_SECONDS. The polygons of the grid cells,
+    which come with each forecast, are kept too, in a spatial hash, so a
+    new point inside a known cell needs no `/points` lookup at all.
+
+    At most `max_points` points are kept in memory, the most recently used.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike | None = None,
+        ttl: float = GRIDPOINT_TTL_SECONDS,
+        max_points: int = DEFAULT_MAX_POINTS,
+    ):
+        self.path = Path(path) if path else default_cache_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_points = max_points
+        # Point key -> (forecast URL, time stored), least recently used first
+        self._points: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        # Forecast URL -> (cell, time stored)
+        self._cells: dict[str, tuple[_Cell, float]] = {}
+        # Spatial hash bucket -> forecast URLs of the cells overlapping it
+        self._buckets: dict[tuple[int, int], set[str]] = {}
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS points ("
+            " key TEXT PRIMARY KEY, forecast_url TEXT NOT NULL,"
+            " updated_at REAL NOT NULL) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS points_by_forecast_url"
+            " ON points (forecast_url)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cells ("
+            " forecast_url TEXT PRIMARY KEY, ring TEXT NOT NULL,"
+            " updated_at REAL NOT NULL) WITHOUT ROWID"
+        )
+        expired = time.time() - ttl
+        with self._conn:
+            self._conn.execute("DELETE FROM points WHERE updated_at < ?", (expired,))
+            self._conn.execute("DELETE FROM cells WHERE updated_at < ?", (expired,))
+        for key, forecast_url, updated_at in self._conn.execute(
+            "SELECT key, forecast_url, updated_at FROM points"
+            " ORDER BY updated_at DESC LIMIT ?",
+            (max_points,),
+        ):
+            self._points[key] = (forecast_url, updated_at)
+            self._points.move_to_end(key, last=False)
+        for forecast_url, ring, updated_at in self._conn.execute(
+            "SELECT forecast_url, ring, updated_at FROM cells"
+        ):
+            self._index_cell(_Cell(forecast_url, json.loads(ring)), updated_at)
+
+    def forecast_url(self, latitude: float, longitude: float) -> str | None:
+        """Returns the cached forecast URL of a point, None if unknown."""
+        now = time.time()
+        key = point_key(latitude, longitude)
+        cached = self._points.get(key)
+        if cached is None:
+            cached = self._conn.execute(
+                "SELECT forecast_url, updated_at FROM points WHERE key = ?", (key,)
+            ).fetchone()
+        if cached is not None and now - cached[1] < self.ttl:
+            self._remember(key, cached)
+            return cached[0]
+        for forecast_url in self._buckets.get(_bucket(latitude, longitude), ()):
+            cell, updated_at = self._cells[forecast_url]
+            if now - updated_at < self.ttl and cell.contains(latitude, longitude):
+                return forecast_url
+        return None
+
+    def store_point(self, latitude: float, longitude: float, forecast_url: str) -> None:
+        """Stores the forecast URL found by `/points` for a point."""
+        key = point_key(latitude, longitude)
+        updated_at = time.time()
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO points VALUES (?, ?, ?)",
+                (key, forecast_url, updated_at),
+            )
+        self._remember(key, (forecast_url, updated_at))
+
+    def store_cell(self, forecast_url: str, geometry: dict | None) -> None:
+        """Stores the grid cell polygon, the geometry of a forecast."""
+        if not geometry or geometry.get("type") != "Polygon":
+            return
+        ring = geometry.get("coordinates", [[]])[0]
+        if len(ring) < 3:
+            return
+        known = self._cells.get(forecast_url)
+        if known is not None and time.time() - known[1] < self.ttl / 2:
+            return
+        cell = _Cell(forecast_url, [[float(x), float(y)] for x, y, *_ in ring])
+        updated_at = time.time()
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cells VALUES (?, ?, ?)",
+                (forecast_url, json.dumps(cell.ring), updated_at),
+            )
+        self._index_cell(cell, updated_at)
+
+    def discard(self, forecast_url: str) -> None:
+        """Forgets a forecast URL that is gone, with its points and cell."""
+        for key in [k for k, (url, _) in self._points.items() if url == forecast_url]:
+            del self._points[key]
+        known = self._cells.pop(forecast_url, None)
+        if known is not None:
+            for bucket in known[0].buckets():
+                self._buckets.get(bucket, set()).discard(forecast_url)
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM points WHERE forecast_url = ?", (forecast_url,)
+            )
+            self._conn.execute(
+                "DELETE FROM cells WHERE forecast_url = ?", (forecast_url,)
+            )
+
+    def _remember(self, key: str, point: tuple[str, float]) -> None:
+        self._points[key] = point
+        self._points.move_to_end(key)
+        while len(self._points) > self.max_points:
+            self._points.popitem(last=False)
+
+    def _index_cell(self, cell: _Cell, updated_at: float) -> None:
+        self._cells[cell.forecast_url] = (cell, updated_at)
+        for bucket in cell.buckets():
+            self._buckets.setdefault(bucket, set()).add(cell.forecast_url)
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,167 @@
+import asyncio
+import email.utils
+import time
+
+from collections import OrderedDict
+from typing import Any
+
+import httpx
+
+
+# Responses kept, least recently used first out
+DEFAULT_MAX_ENTRIES = 512
+# How long a stale response may be served while it is revalidated, or when
+# revalidation fails, unless the response says otherwise
+DEFAULT_STALE_SECONDS = 300.0
+
+
+def _directives(cache_control: str) -> dict[str, str | None]:
+    directives = {}
+    for item in cache_control.split(","):
+        name, _, value = item.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') if value else None
+    return directives
+
+
+def _seconds(value: str | None) -> float | None:
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _http_date(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class _Entry:
+    __slots__ = ("data", "etag", "last_modified", "fresh_until", "stale_until")
+
+    def __init__(self, data: Any, etag: str | None, last_modified: str | None):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fresh_until = 0.0
+        self.stale_until = 0.0
+
+
+class ResponseCache:
+    """Caches JSON GET responses as an HTTP cache would.
+
+    Freshness comes from Cache-Control max-age, less the Age header, or
+    from Expires. Stale responses are revalidated with If-None-Match and
+    If-Modified-Since, and a 304 just renews them. For the response's
+    stale-while-revalidate time, or `stale_seconds`, a stale response is
+    served at once while it is revalidated in the background, and it is
+    also served when revalidation fails. Concurrent requests for the same
+    URL share one upstream request.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        stale_seconds: float = DEFAULT_STALE_SECONDS,
+    ):
+        self.client = client
+        self.max_entries = max_entries
+        self.stale_seconds = stale_seconds
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._pending: dict[str, asyncio.Future] = {}
+
+    async def get(self, url: str) -> Any:
+        """Returns the decoded JSON body of a GET of `url`.
+
+        Raises:
+            httpx.HTTPError: If the request failed and nothing usable was
+                cached.
+            json.JSONDecodeError: If the response was not valid JSON.
+        """
+        now = time.monotonic()
+        entry = self._entries.get(url)
+        if entry is not None:
+            self._entries.move_to_end(url)
+            if now < entry.fresh_until:
+                return entry.data
+            if now < entry.stale_until:
+                # Served stale; the revalidation runs on its own.
+                self._fetch(url)
+                return entry.data
+        try:
+            return await asyncio.shield(self._fetch(url))
+        except (httpx.HTTPError, ValueError):
+            entry = self._entries.get(url)
+            if entry is not None and time.monotonic() < entry.stale_until:
+                return entry.data
+            raise
+
+    def _fetch(self, url: str) -> asyncio.Future:
+        pending = self._pending.get(url)
+        if pending is None:
+            pending = asyncio.ensure_future(self._revalidate(url))
+            self._pending[url] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(url, None))
+            # Nobody may await a background revalidation.
+            pending.add_done_callback(
+                lambda future: future.cancelled() or future.exception()
+            )
+        return pending
+
+    async def _revalidate(self, url: str) -> Any:
+        entry = self._entries.get(url)
+        headers = {}
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        response = await self.client.get(url, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            self._store(url, entry, response)
+            return entry.data
+        response.raise_for_status()
+        entry = _Entry(
+            response.json(),
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+        self._store(url, entry, response)
+        return entry.data
+
+    def _store(self, url: str, entry: _Entry, response: httpx.Response) -> None:
+        directives = _directives(response.headers.get("Cache-Control", ""))
+        if "no-store" in directives:
+            self._entries.pop(url, None)
+            return
+        now = time.monotonic()
+        lifetime = _seconds(directives.get("max-age"))
+        if lifetime is not None:
+            lifetime -= _seconds(response.headers.get("Age")) or 0.0
+        else:
+            expires = _http_date(response.headers.get("Expires"))
+            date = _http_date(response.headers.get("Date")) or time.time()
+            lifetime = expires - date if expires is not None else 0.0
+        if "no-cache" in directives:
+            lifetime = 0.0
+        stale = _seconds(directives.get("stale-while-revalidate"))
+        if "must-revalidate" in directives:
+            stale = 0.0
+        entry.fresh_until = now + max(0.0, lifetime)
+        entry.stale_until = entry.fresh_until + (
+            self.stale_seconds if stale is None else stale
+        )
+        if response.status_code == 304:
+            # A 304 may carry new validators.
+            entry.etag = response.headers.get("ETag", entry.etag)
+            entry.last_modified = response.headers.get(
+                "Last-Modified", entry.last_modified
+            )
+        self._entries[url] = entry
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -1,6 +1,44 @@
+import os
 
 from google.adk.agents import LlmAgent
+from google.adk.tools.mcp_tool.mcp_session_manager import (
+    SseConnectionParams,
+    StreamableHTTPConnectionParams,
+)
 from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StdioServerParameters
+from mcp.client.stdio import get_default_environment
+
+
+def weather_mcp_connection_params() -> (
+    SseConnectionParams | StreamableHTTPConnectionParams | StdioServerParameters
+):
+    """Connects to the shared weather MCP server at WEATHER_MCP_URL, if set.
+
+    Otherwise weather_mcp.py is spawned over stdio for this agent alone.
+    A URL ending in /sse uses the SSE transport, any other one streamable
+    HTTP (served at /mcp by `python weather_mcp.py --transport
+    streamable-http`).
+    """
+    url = os.getenv("WEATHER_MCP_URL")
+    if url:
+        if url.rstrip("/").endswith("/sse"):
+            return SseConnectionParams(url=url)
+        return StreamableHTTPConnectionParams(url=url)
+    return StdioServerParameters(
+        command="python",
+        args=["./weather_mcp.py", "--transport", "stdio"],
+        # The server only inherits a minimal environment, plus
+        # its own settings, such as WEATHER_GEOCODE_DB.
+        env={
+            **get_default_environment(),
+            **{
+                name: value
+                for name, value in os.environ.items()
+                if name.startswith("WEATHER_")
+            },
+        },
+    )
+
 
 def create_weather_agent() -> LlmAgent:
     """Constructs the ADK agent."""
@@ -8,13 +46,8 @@ def create_weather_agent() -> LlmAgent:
         model="gemini-2.5-flash-preview-04-17",
         name="weather_agent",
         description="An agent that can help questions about weather",
-        instruction="""You are a specialized weather forecast assistant. Your primary function is to utilize the provided tools to retrieve and relay weather information in response to user queries. You must rely exclusively on these tools for data and refrain from inventing information. Ensure that all responses include the detailed output from the tools used and are formatted in Markdown""",
+        instruction="""You are a specialized weather forecast assistant. Your primary function is to utilize the provided tools to retrieve and relay weather information in response to user queries. You must rely exclusively on these tools for data and refrain from inventing information. When asked about several locations, get all their forecasts with a single get_forecasts call. Ensure that all responses include the detailed output from the tools used and are formatted in Markdown""",
         tools=[
-            MCPToolset(
-                connection_params=StdioServerParameters(
-                    command="python",
-                    args=["./weather_mcp.py"],
-                ),
-            )
+            MCPToolset(connection_params=weather_mcp_connection_params())
         ],
     )
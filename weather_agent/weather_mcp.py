@@ -1,12 +1,19 @@
+import asyncio
 import json
+import re
 
 from typing import Any
 
+import click
 import httpx
 
+from gazetteer import Gazetteer
+from geocoder import CachedGeocoder
 from geopy.exc import GeocoderServiceError, GeocoderTimedOut
 from geopy.geocoders import Nominatim
+from gridpoints import GridpointCache
 from mcp.server.fastmcp import FastMCP
+from response_cache import ResponseCache
 
 
 # Initialize FastMCP server
@@ -16,7 +23,13 @@ mcp = FastMCP("weather")
 BASE_URL = "https://api.weather.gov"
 USER_AGENT = "weather-agent"
 REQUEST_TIMEOUT = 20.0
-GEOCODE_TIMEOUT = 10.0  # Timeout for geocoding requests
+# Locations of one get_forecasts call, and how many are fetched at once
+MAX_BATCH_LOCATIONS = 20
+MAX_CONCURRENT_LOCATIONS = 8
+# Alert filters NWS applies server side, in its own spelling
+ALERT_SEVERITIES = ("Extreme", "Severe", "Moderate", "Minor", "Unknown")
+ALERT_URGENCIES = ("Immediate", "Expected", "Future", "Past", "Unknown")
+ZONE_PATTERN = re.compile(r"^[A-Z]{2}[CZ]\d{3}$")
 
 # --- Shared HTTP Client ---
 http_client = httpx.AsyncClient(
@@ -25,10 +38,20 @@ http_client = httpx.AsyncClient(
     timeout=REQUEST_TIMEOUT,
     follow_redirects=True,
 )
+# Forecasts and alerts as long as NWS says they are fresh, revalidated after
+nws_cache = ResponseCache(http_client)
 
 # --- Geocoding Setup ---
 # Initialize the geocoder (Nominatim requires a unique user_agent)
 geolocator = Nominatim(user_agent=USER_AGENT)
+# Cached on disk, off the event loop and within Nominatim's 1 request/s
+geocoder = CachedGeocoder(geolocator)
+# Bundled US places, so most cities are found without going online
+gazetteer = Gazetteer()
+
+# --- Gridpoint Cache ---
+# Forecast URLs of points and grid cells, so most forecasts skip /points
+gridpoints = GridpointCache()
 
 
 async def get_weather_response(endpoint: str) -> dict[str, Any] | None:
@@ -41,9 +64,8 @@ async def get_weather_response(endpoint: str) -> dict[str, Any] | None:
         The response from the NWS API, or None if an error occurs.
     """
     try:
-        response = await http_client.get(endpoint)
-        response.raise_for_status()  # Raises HTTPStatusError for 4xx/5xx responses
-        return response.json()
+        # Raises HTTPStatusError for 4xx/5xx responses, unless served from cache
+        return await nws_cache.get(endpoint)
     except httpx.HTTPStatusError:
         # Specific HTTP errors (like 404 Not Found, 500 Server Error)
         return None
@@ -119,52 +141,179 @@ async def get_alerts(state: str) -> str:
     return "\n---\n".join(alerts)
 
 
+def parse_alert_filter(
+    values: list[str] | None, allowed: tuple[str, ...]
+) -> list[str] | str:
+    """Normalizes severity or urgency values; a message if one is unknown."""
+    parsed = []
+    for value in values or ():
+        name = str(value).strip().capitalize()
+        if name not in allowed:
+            return f"Unknown value '{value}'. Use one of: {', '.join(allowed)}."
+        if name not in parsed:
+            parsed.append(name)
+    return sorted(parsed, key=allowed.index)
+
+
+def format_alert_group(features: list[dict[str, Any]]) -> str:
+    """Formats alerts with the same text once, with all of their areas."""
+    areas = []
+    for feature in features:
+        for area in feature.get("properties", {}).get("areaDesc", "").split("; "):
+            if area and area not in areas:
+                areas.append(area)
+    first = features[0]
+    return format_alert(
+        {"properties": {**first.get("properties", {}), "areaDesc": "; ".join(areas)}}
+    )
+
+
 @mcp.tool()
-async def get_forecast(latitude: float, longitude: float) -> str:
-    """Get the weather forecast for a specific location using latitude and longitude.
+async def get_regional_alerts(
+    states: list[str] | None = None,
+    zone: str | None = None,
+    point: str | None = None,
+    severity: list[str] | None = None,
+    urgency: list[str] | None = None,
+) -> str:
+    """Get active weather alerts for several US states, a forecast zone or a point, in one request.
+
+    Give exactly one of states, zone or point.
 
     Args:
-        latitude: The latitude of the location (e.g., 34.05).
-        longitude: The longitude of the location (e.g., -118.25).
+        states: Two-letter US state codes (e.g., ["WA", "OR", "CA"]).
+        zone: An NWS forecast or county zone (e.g., WAZ558).
+        point: A "latitude,longitude" location (e.g., "47.61,-122.33").
+        severity: Only alerts of these severities: Extreme, Severe, Moderate, Minor, Unknown.
+        urgency: Only alerts of these urgencies: Immediate, Expected, Future, Past, Unknown.
+    """
+    # Input validation and normalization; NWS takes one kind of area
+    if sum(area is not None and area != [] for area in (states, zone, point)) != 1:
+        return "Please provide exactly one of: a list of states, a zone or a point."
+    params = {}
+    if states is not None:
+        codes = sorted({str(state).strip().upper() for state in states})
+        if not all(len(code) == 2 and code.isalpha() for code in codes):
+            return "Invalid input. Please provide two-letter US state codes (e.g., CA)."
+        params["area"] = ",".join(codes)
+        label = ", ".join(codes)
+    elif zone is not None:
+        zone_id = zone.strip().upper()
+        if not ZONE_PATTERN.match(zone_id):
+            return "Invalid zone. Please provide an NWS zone ID (e.g., WAZ558)."
+        params["zone"] = label = zone_id
+    else:
+        location = parse_location(point)
+        if location is None or isinstance(location[0], str):
+            return "Invalid point. Please provide 'latitude,longitude' (e.g., 47.61,-122.33)."
+        if not (-90 <= location[0] <= 90 and -180 <= location[1] <= 180):
+            return "Invalid point. Latitude must be between -90 and 90, Longitude between -180 and 180."
+        params["point"] = label = f"{location[0]:.4f},{location[1]:.4f}"
+    for name, values, allowed in (
+        ("severity", severity, ALERT_SEVERITIES),
+        ("urgency", urgency, ALERT_URGENCIES),
+    ):
+        parsed = parse_alert_filter(values, allowed)
+        if isinstance(parsed, str):
+            return parsed
+        if parsed:
+            params[name] = ",".join(parsed)
+
+    # Sorted and in a fixed order, so equal questions share a cache entry
+    query = "&".join(f"{name}={value}" for name, value in params.items())
+    data = await get_weather_response(f"/alerts/active?{query}")
+
+    if data is None:
+        # Error occurred during request
+        return f"Failed to retrieve weather alerts for {label}."
+
+    # One alert per id, then one entry per text issued for several zones
+    groups: dict[tuple[str, str], list[dict[str, Any]]] = {}
+    seen = set()
+    for feature in data.get("features") or ():
+        alert_id = feature.get("id") or feature.get("properties", {}).get("id")
+        if alert_id is not None:
+            if alert_id in seen:
+                continue
+            seen.add(alert_id)
+        props = feature.get("properties", {})
+        key = (props.get("event", ""), props.get("description", ""))
+        groups.setdefault(key, []).append(feature)
+    if not groups:
+        return f"No active weather alerts found for {label}."
+
+    count = sum(len(features) for features in groups.values())
+    alerts = [format_alert_group(features) for features in groups.values()]
+    return f"{count} active alerts for {label}:\n" + "\n---\n".join(alerts)
+
+
+async def get_forecast_periods(
+    latitude: float, longitude: float
+) -> list[dict[str, Any]] | str:
+    """Fetches the NWS forecast periods of a location.
+
+    Returns:
+        The forecast periods, or a message saying what went wrong.
     """
     # Input validation
     if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
         return "Invalid latitude or longitude provided. Latitude must be between -90 and 90, Longitude between -180 and 180."
 
-    # NWS API requires latitude,longitude format with up to 4 decimal places
-    point_endpoint = f"/points/{latitude:.4f},{longitude:.4f}"
-    points_data = await get_weather_response(point_endpoint)
+    # Cached for the point, or for the grid cell the point falls in
+    forecast_url = gridpoints.forecast_url(latitude, longitude)
+
+    if forecast_url is None:
+        # NWS API requires latitude,longitude format with up to 4 decimal places
+        point_endpoint = f"/points/{latitude:.4f},{longitude:.4f}"
+        points_data = await get_weather_response(point_endpoint)
 
-    if points_data is None or "properties" not in points_data:
-        return f"Unable to retrieve NWS gridpoint information for {latitude:.4f},{longitude:.4f}."
+        if points_data is None or "properties" not in points_data:
+            return f"Unable to retrieve NWS gridpoint information for {latitude:.4f},{longitude:.4f}."
 
-    # Extract forecast URLs from the gridpoint data
-    forecast_url = points_data["properties"].get("forecast")
+        # Extract forecast URLs from the gridpoint data
+        forecast_url = points_data["properties"].get("forecast")
 
-    if not forecast_url:
-        return f"Could not find the NWS forecast endpoint for {latitude:.4f},{longitude:.4f}."
+        if not forecast_url:
+            return f"Could not find the NWS forecast endpoint for {latitude:.4f},{longitude:.4f}."
+
+        gridpoints.store_point(latitude, longitude, forecast_url)
 
     # Make the request to the specific forecast URL
-    forecast_data = None
     try:
-        response = await http_client.get(forecast_url)
-        response.raise_for_status()
-        forecast_data = response.json()
-    except httpx.HTTPStatusError:
-        pass  # Error handled by returning None below
-    except httpx.RequestError:
-        pass  # Error handled by returning None below
-    except json.JSONDecodeError:
-        pass  # Error handled by returning None below
+        forecast_data = await nws_cache.get(forecast_url)
+    except httpx.HTTPStatusError as e:
+        # The grid has moved: look its points up again next time. Other
+        # failures are transient and keep the cached URL.
+        if e.response.status_code == httpx.codes.NOT_FOUND:
+            gridpoints.discard(forecast_url)
+        forecast_data = None
     except Exception:
-        pass  # Error handled by returning None below
+        # Timeouts, connection and JSON errors, as in get_weather_response
+        forecast_data = None
 
     if forecast_data is None or "properties" not in forecast_data:
         return "Failed to retrieve detailed forecast data from NWS."
 
+    # The forecast geometry is the grid cell, shared by every point in it
+    gridpoints.store_cell(forecast_url, forecast_data.get("geometry"))
+
     periods = forecast_data["properties"].get("periods")
     if not periods:
         return "No forecast periods found for this location from NWS."
+    return periods
+
+
+@mcp.tool()
+async def get_forecast(latitude: float, longitude: float) -> str:
+    """Get the weather forecast for a specific location using latitude and longitude.
+
+    Args:
+        latitude: The latitude of the location (e.g., 34.05).
+        longitude: The longitude of the location (e.g., -118.25).
+    """
+    periods = await get_forecast_periods(latitude, longitude)
+    if isinstance(periods, str):
+        return periods
 
     # Format the first 5 periods
     forecasts = [format_forecast_period(period) for period in periods[:5]]
@@ -172,14 +321,11 @@ async def get_forecast(latitude: float, longitude: float) -> str:
     return "\n---\n".join(forecasts)
 
 
-# --- NEW: get_forecast_by_city Tool ---
-@mcp.tool()
-async def get_forecast_by_city(city: str, state: str) -> str:
-    """Get the weather forecast for a specific US city and state by first finding its coordinates.
+async def locate_city(city: str, state: str) -> tuple[float, float] | str:
+    """Finds the coordinates of a US city.
 
-    Args:
-        city: The name of the city (e.g., "Los Angeles", "New York").
-        state: The two-letter US state code (e.g., CA, NY). Case-insensitive.
+    Returns:
+        The latitude and longitude, or a message saying what went wrong.
     """
     # --- Input Validation ---
     if not city or not isinstance(city, str):
@@ -194,14 +340,13 @@ async def get_forecast_by_city(city: str, state: str) -> str:
 
     city_name = city.strip()
     state_code = state.strip().upper()
-    # Construct a query likely to yield a US result
-    query = f"{city_name}, {state_code}, USA"
 
     # --- Geocoding ---
-    location = None
+    location = gazetteer.lookup(city_name, state_code)
     try:
-        # Synchronous geocode call
-        location = geolocator.geocode(query, timeout=GEOCODE_TIMEOUT)
+        if location is None:
+            # Not bundled: cached, or looked up in a worker thread
+            location = await geocoder.geocode(city_name, state_code)
 
     except GeocoderTimedOut:
         return f"Could not get coordinates for '{city_name}, {state_code}': The location service timed out."
@@ -215,18 +360,120 @@ async def get_forecast_by_city(city: str, state: str) -> str:
     if location is None:
         return f"Could not find coordinates for '{city_name}, {state_code}'. Please check the spelling or try a nearby city."
 
-    latitude = location.latitude
-    longitude = location.longitude
+    return location
+
+
+# --- NEW: get_forecast_by_city Tool ---
+@mcp.tool()
+async def get_forecast_by_city(city: str, state: str) -> str:
+    """Get the weather forecast for a specific US city and state by first finding its coordinates.
+
+    Args:
+        city: The name of the city (e.g., "Los Angeles", "New York").
+        state: The two-letter US state code (e.g., CA, NY). Case-insensitive.
+    """
+    location = await locate_city(city, state)
+    if isinstance(location, str):
+        return location
+
+    latitude, longitude = location
 
     # --- Reuse existing forecast logic with obtained coordinates ---
     return await get_forecast(latitude, longitude)
 
 
+def parse_location(location: str) -> tuple[float, float] | tuple[str, str] | None:
+    """Parses "latitude,longitude" or "City, ST"; None if it is neither."""
+    first, _, second = location.rpartition(",")
+    if not first:
+        return None
+    try:
+        return float(first), float(second)
+    except ValueError:
+        return first.strip(), second.strip()
+
+
+def format_compact_period(period: dict[str, Any]) -> str:
+    """Formats a forecast period on one line, for comparing locations."""
+    return (
+        f"{period.get('name', 'Unknown Period')}: "
+        f"{period.get('temperature', 'N/A')}°{period.get('temperatureUnit', 'F')}, "
+        f"wind {period.get('windSpeed', 'N/A')} {period.get('windDirection', '')}, "
+        f"{period.get('shortForecast', 'N/A')}"
+    )
+
+
+async def get_location_forecast(location: str, periods: int) -> str:
+    """Geocodes one location of get_forecasts and formats its forecast."""
+    parsed = parse_location(location)
+    if parsed is None:
+        return f"{location}: Expected 'City, ST' or 'latitude,longitude'."
+    if isinstance(parsed[0], str):
+        coordinates = await locate_city(*parsed)
+        if isinstance(coordinates, str):
+            return f"{location}: {coordinates}"
+    else:
+        coordinates = parsed
+    forecast = await get_forecast_periods(*coordinates)
+    if isinstance(forecast, str):
+        return f"{location}: {forecast}"
+    lines = [format_compact_period(period) for period in forecast[:periods]]
+    return "\n".join([f"{location}:", *(f"  {line}" for line in lines)])
+
+
+@mcp.tool()
+async def get_forecasts(locations: list[str], periods: int = 2) -> str:
+    """Get short weather forecasts for several US locations at once, to compare them.
+
+    Args:
+        locations: Up to 20 locations, each either "City, ST" (e.g., "Seattle, WA") or "latitude,longitude" (e.g., "34.05,-118.25").
+        periods: How many forecast periods to give per location (e.g., 2 for today and tonight), 1 to 14.
+    """
+    if not locations or not isinstance(locations, list):
+        return "Please provide a list of locations."
+    if len(locations) > MAX_BATCH_LOCATIONS:
+        return f"Please ask for at most {MAX_BATCH_LOCATIONS} locations at once."
+    periods = min(max(periods, 1), 14)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_LOCATIONS)
+
+    async def bounded(location: str) -> str:
+        async with semaphore:
+            try:
+                return await get_location_forecast(str(location).strip(), periods)
+            except Exception:
+                # One location failing must not fail the others
+                return f"{location}: An unexpected error occurred."
+
+    forecasts = await asyncio.gather(*(bounded(location) for location in locations))
+    return "\n\n".join(forecasts)
+
+
 # --- Server Execution & Shutdown ---
 async def shutdown_event():
-    """Gracefully close the httpx client."""
+    """Gracefully close the httpx client, the caches and the gazetteer."""
     await http_client.aclose()
+    geocoder.close()
+    gridpoints.close()
+    gazetteer.close()
+
+
+@click.command()
+@click.option(
+    "--transport",
+    "transport",
+    type=click.Choice(["stdio", "sse", "streamable-http"]),
+    default="stdio",
+    envvar="WEATHER_MCP_TRANSPORT",
+    help="stdio serves the agent that spawned it; sse or streamable-http serve "
+    "every agent worker pointed at WEATHER_MCP_URL, with shared caches.",
+)
+@click.option("--host", "host", default="localhost", envvar="WEATHER_MCP_HOST")
+@click.option("--port", "port", default=10110, envvar="WEATHER_MCP_PORT")
+def cli(transport: str, host: str, port: int):
+    mcp.settings.host = host
+    mcp.settings.port = port
+    mcp.run(transport=transport)
 
 
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
+    cli()